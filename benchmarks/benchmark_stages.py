@@ -0,0 +1,282 @@
+"""Per-stage benchmarks for the EmergenWorld generators.
+
+Times the public stages of TerrainGenerator, PlanetarySystem and
+ClimateSystem at several world sizes with fixed seeds, and compares the
+timings with a stored JSON baseline. Run from the repository root:
+
+    python -m benchmarks.benchmark_stages --save        # record a baseline
+    python -m benchmarks.benchmark_stages               # compare with it
+
+Every measurement builds the stage's inputs afresh (untimed), then times the
+stage itself; the best of ``--repeat`` runs is kept. Peak memory comes from
+one more run under tracemalloc (see ``src.world_generation.instrumentation``).
+The script exits with status 1 if a stage got slower than the baseline by
+more than ``--threshold`` or if the baseline has none of the measurements,
+and with status 2 if there is no baseline file (unless ``--save`` is given).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.world_generation import (TerrainGenerator, PlanetarySystem,
+                                  ClimateSystem)
+from src.world_generation.instrumentation import Profiler
+
+SEED = 42
+SIZES = (128, 256, 512, 1024)
+
+# Each stage first runs once untimed at this size, so that compilation and
+# first-call costs do not end up in the first measurement
+WARMUP_SIZE = 32
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Timing differences below this many seconds are treated as noise
+MIN_DIFFERENCE = 0.01
+
+
+def _terrain(size: int, *stages: str) -> TerrainGenerator:
+    """Terrain generator with the given stages already run."""
+    terrain = TerrainGenerator(size=size, seed=SEED)
+    for stage in stages:
+        getattr(terrain, stage)()
+    return terrain
+
+
+def _climate_inputs(size: int) -> dict:
+    """Keyword arguments of a ClimateSystem for a generated world."""
+    # The heightmap is normalized to [0, 1], so the oceans come from the
+    # water stage
+    terrain = _terrain(size, "generate_heightmap")
+    heightmap, water_mask = terrain.generate_water_bodies()
+    return {
+        "terrain_heightmap": heightmap,
+        "water_mask": water_mask,
+        "planetary_system": PlanetarySystem(world_size=size),
+        "world_size": size,
+        "random_seed": SEED,
+    }
+
+
+def _climate_init(size: int) -> Callable[[], object]:
+    """Construction of a ClimateSystem for a generated world."""
+    inputs = _climate_inputs(size)
+    return lambda: ClimateSystem(**inputs)
+
+
+def _climate_update(size: int) -> Callable[[], object]:
+    """Midsummer noon update of a ClimateSystem."""
+    climate = ClimateSystem(**_climate_inputs(size))
+    return lambda: climate.update_climate(172, 12.0)
+
+
+# Setup functions per stage: each builds the inputs for one world size and
+# returns the call to time. Names match the spans of the instrumentation.
+STAGES: Dict[str, Callable[[int], Callable[[], object]]] = {
+    "TerrainGenerator.create_continental_mask":
+        lambda size: _terrain(size).create_continental_mask,
+    "TerrainGenerator.generate_heightmap":
+        lambda size: _terrain(size).generate_heightmap,
+    "TerrainGenerator.add_mountains":
+        lambda size: _terrain(size, "generate_heightmap").add_mountains,
+    "TerrainGenerator.apply_erosion":
+        lambda size: _terrain(size, "generate_heightmap",
+                              "add_mountains").apply_erosion,
+    "TerrainGenerator.add_rivers":
+        lambda size: _terrain(size, "generate_heightmap",
+                              "add_mountains").add_rivers,
+    "TerrainGenerator.add_lakes":
+        lambda size: _terrain(size, "generate_heightmap", "add_mountains",
+                              "add_rivers").add_lakes,
+    "PlanetarySystem.advance_time":
+        lambda size: PlanetarySystem(world_size=size).advance_time,
+    "ClimateSystem.__init__": _climate_init,
+    "ClimateSystem.update_climate": _climate_update,
+}
+
+
+def measure(stage: str, size: int, repeat: int, memory: bool) -> dict:
+    """Benchmark one stage at one world size.
+
+    Args:
+        stage: Stage name (key of STAGES)
+        size: World size
+        repeat: Number of timed runs
+        memory: Also measure the peak traced memory
+
+    Returns:
+        Dictionary with the best wall time in seconds and, if measured, the
+        peak memory in bytes and the NumPy buffers the stage retained
+    """
+    seconds = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            run = STAGES[stage](size)
+            start = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - start)
+    result = {"seconds": min(seconds)}
+
+    if memory:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run = STAGES[stage](size)
+            with Profiler(memory=True, arrays=True) as profiler:
+                run()
+        entry = profiler.stats().get(stage, {})
+        result["peak_bytes"] = entry.get("peak_bytes", 0)
+        result["retained_arrays"] = entry.get("retained_arrays", 0)
+    return result
+
+
+def run_benchmarks(stages: List[str], sizes: List[int], repeat: int,
+                   memory: bool) -> dict:
+    """Benchmark stages at several world sizes.
+
+    Args:
+        stages: Stage names
+        sizes: World sizes
+        repeat: Number of timed runs per measurement
+        memory: Also measure the peak traced memory
+
+    Returns:
+        Results in the baseline file format
+    """
+    results: Dict[str, Dict[str, dict]] = {}
+    for stage in stages:
+        with contextlib.redirect_stdout(io.StringIO()):
+            STAGES[stage](WARMUP_SIZE)()
+        for size in sizes:
+            result = measure(stage, size, repeat, memory)
+            results.setdefault(stage, {})[str(size)] = result
+            line = f"{stage:<42} {size:>5}  {result['seconds']:>9.3f} s"
+            if "peak_bytes" in result:
+                line += f"  {result['peak_bytes'] / 2**20:>8.1f} MiB"
+            print(line, flush=True)
+
+    return {
+        "seed": SEED,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Find the stages that got slower than the baseline.
+
+    Args:
+        current: Results of this run
+        baseline: Stored baseline results
+        threshold: Allowed relative slowdown (0.25 allows 25%)
+
+    Returns:
+        Descriptions of the regressions
+    """
+    regressions = []
+    for stage, sizes in current["results"].items():
+        for size, result in sizes.items():
+            reference = baseline["results"].get(stage, {}).get(size)
+            if reference is None:
+                continue
+            before, after = reference["seconds"], result["seconds"]
+            if (after > before * (1.0 + threshold)
+                    and after - before > MIN_DIFFERENCE):
+                regressions.append(
+                    f"{stage} at {size}: {after:.3f} s vs. {before:.3f} s "
+                    f"baseline (+{(after / before - 1.0) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks and check them against the baseline."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the world generation stages")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="World sizes (default: 128 256 512 1024)")
+    parser.add_argument("--stages", type=str, nargs="+", default=None,
+                        help="Only run stages whose name contains one of "
+                             "these")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timed runs per measurement, the best is kept "
+                             "(default: 3)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the tracemalloc memory measurement")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE,
+                        help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true",
+                        help="Store the results as the new baseline")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Also write the results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline "
+                             "(default: 0.25)")
+    args = parser.parse_args(argv)
+
+    stages = [stage for stage in STAGES
+              if args.stages is None
+              or any(pattern in stage for pattern in args.stages)]
+    if not stages:
+        parser.error(f"No stage matches {args.stages}")
+    if not args.save and not os.path.exists(args.baseline):
+        # Without a baseline there is nothing to check the timings against
+        parser.error(f"No baseline at {args.baseline}, run with --save to "
+                     f"record one")
+
+    current = run_benchmarks(stages, args.sizes, args.repeat,
+                             not args.no_memory)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+
+    if args.save:
+        # Keep the baseline entries of stages and sizes not run this time
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                stored = json.load(f)
+            for stage, sizes in current["results"].items():
+                stored["results"].setdefault(stage, {}).update(sizes)
+            current["results"] = stored["results"]
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != current["machine"]:
+        print(f"Warning: baseline was recorded on {baseline.get('machine')}")
+
+    missing = [f"{stage} at {size}"
+               for stage, sizes in current["results"].items()
+               for size in sizes
+               if size not in baseline["results"].get(stage, {})]
+    if missing:
+        print(f"Not in the baseline (run with --save to add them): "
+              f"{', '.join(missing)}")
+        if len(missing) == sum(map(len, current["results"].values())):
+            return 1
+
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print("No stage slower than the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
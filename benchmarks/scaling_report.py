@@ -0,0 +1,317 @@
+"""Asymptotic scaling and memory report for the full world pipeline.
+
+Runs terrain generation, the planetary system and the climate system at a
+series of world sizes under the instrumentation profiler, then fits an
+empirical complexity exponent to the wall time of every instrumented method
+(t ~ size^k, where size is the grid side, so k = 2 is linear in the number
+of cells). Run from the repository root:
+
+    python -m benchmarks.scaling_report --sizes 32 64 128 --target 4096
+
+A method is flagged when it scales worse than quadratically in the grid
+side, or when its time extrapolated to the target size exceeds the time
+budget. Peak resident memory (RSS) is sampled in the background and
+reported per method at the largest size. Without ``/proc/self/statm`` the
+samples come from psutil if it is installed; the process-wide peak uses
+the ``resource`` module where it exists (Unix) and psutil elsewhere.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.world_generation import (TerrainGenerator, PlanetarySystem,
+                                  ClimateSystem)
+from src.world_generation.instrumentation import Profiler
+
+SEED = 42
+SIZES = (32, 64, 128)
+
+# The pipeline first runs once at this size, so that compilation and
+# first-call costs do not bend the fit at the smallest size
+WARMUP_SIZE = 32
+
+# Exponents above 2 + tolerance are reported as super-quadratic
+EXPONENT_TOLERANCE = 0.25
+
+# Methods faster than this (seconds, at the largest size) are too noisy
+# to flag
+MIN_SECONDS = 0.005
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _psutil_memory():
+    """psutil memory info of this process, None if psutil is missing."""
+    try:
+        import psutil  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return psutil.Process().memory_info()
+
+
+def current_rss() -> Optional[int]:
+    """Resident memory of this process in bytes, None if unavailable."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    info = _psutil_memory()
+    return None if info is None else info.rss
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident memory of this process so far in bytes, None if unknown.
+
+    The ``resource`` module only exists on Unix, so it is imported here
+    and psutil is used where it is missing.
+    """
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        info = _psutil_memory()
+        if info is None:
+            return None
+        # Windows keeps the peak working set; elsewhere only the current
+        # RSS is known
+        return getattr(info, "peak_wset", info.rss)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Samples the resident memory in a background thread."""
+
+    def __init__(self, profiler: Profiler, interval: float = 0.005):
+        """Initialize the sampler.
+
+        Args:
+            profiler: Profiler whose clock timestamps the samples
+            interval: Seconds between samples
+        """
+        self.profiler = profiler
+        self.interval = interval
+        self.times: List[float] = []
+        self.rss: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rss = current_rss()
+            if rss is None:
+                return
+            self.times.append(self.profiler.now())
+            self.rss.append(rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def peak(self, start: float, end: float) -> Optional[int]:
+        """Largest sample between two profiler times (µs), None if none.
+
+        The samples just outside the interval are included, so that spans
+        shorter than the sampling interval still get a value.
+        """
+        if not self.times:
+            return None
+        times = np.asarray(self.times)
+        first = max(int(np.searchsorted(times, start)) - 1, 0)
+        last = min(int(np.searchsorted(times, end)) + 1, len(times))
+        return int(max(self.rss[first:last]))
+
+
+def run_pipeline(size: int) -> None:
+    """Generate terrain, planet and climate for one world size."""
+    terrain = TerrainGenerator(size=size, seed=SEED)
+    terrain.generate_complete_terrain()
+    # The heightmap is normalized to [0, 1], so the oceans come from the
+    # water stage
+    _, water_mask = terrain.generate_water_bodies()
+
+    planet = PlanetarySystem(world_size=size)
+    planet.update_all()
+    planet.advance_time(1.0)
+
+    climate = ClimateSystem(terrain.heightmap, water_mask, planet,
+                            world_size=size, random_seed=SEED)
+    climate.update_climate(172, 12.0)
+
+
+def profile_size(size: int) -> Dict[str, dict]:
+    """Profile the pipeline at one world size.
+
+    Args:
+        size: World size
+
+    Returns:
+        Dictionary mapping method names to their call count, total seconds
+        and peak RSS in bytes (None if it could not be sampled)
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        with Profiler() as profiler, RssSampler(profiler) as sampler:
+            run_pipeline(size)
+
+    methods: Dict[str, dict] = {}
+    for name, entry in profiler.stats().items():
+        methods[name] = {"calls": entry["calls"], "seconds": entry["total"],
+                         "peak_rss": None}
+    for record in profiler.spans:
+        rss = sampler.peak(record["start"],
+                           record["start"] + record["duration"])
+        method = methods[record["name"]]
+        if rss is not None and (method["peak_rss"] is None
+                                or rss > method["peak_rss"]):
+            method["peak_rss"] = rss
+    return methods
+
+
+def fit_exponent(sizes: List[int], seconds: List[float]) -> Optional[float]:
+    """Least-squares slope of log(time) over log(size), None if undetermined."""
+    points = [(s, t) for s, t in zip(sizes, seconds) if t > 0]
+    if len(points) < 2:
+        return None
+    x, y = np.log([p[0] for p in points]), np.log([p[1] for p in points])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def scaling_report(sizes: List[int], target: int, budget: float) -> dict:
+    """Profile the pipeline at several sizes and fit the method scaling.
+
+    Args:
+        sizes: World sizes, at least two
+        target: World size to extrapolate the timings to
+        budget: Time budget in seconds per method at the target size
+
+    Returns:
+        Report with the measurements, exponents, projections and flags of
+        every method
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_pipeline(WARMUP_SIZE)
+
+    runs = {}
+    for size in sizes:
+        start = time.perf_counter()
+        runs[size] = profile_size(size)
+        print(f"Profiled size {size} in {time.perf_counter() - start:.1f} s",
+              flush=True)
+
+    largest = max(sizes)
+    methods = {}
+    for name in runs[largest]:
+        measured = [size for size in sizes if name in runs[size]]
+        seconds = [runs[size][name]["seconds"] for size in measured]
+        exponent = fit_exponent(measured, seconds)
+        last = runs[largest][name]["seconds"]
+
+        projected = None
+        flags = []
+        if exponent is not None:
+            projected = last * (target / largest) ** exponent
+            if last >= MIN_SECONDS:
+                if exponent > 2.0 + EXPONENT_TOLERANCE:
+                    flags.append("super-quadratic")
+                if projected > budget:
+                    flags.append("over budget")
+
+        methods[name] = {
+            "calls": {str(size): runs[size][name]["calls"]
+                      for size in measured},
+            "seconds": {str(size): t for size, t in zip(measured, seconds)},
+            "peak_rss": runs[largest][name]["peak_rss"],
+            "exponent": exponent,
+            "projected_seconds": projected,
+            "flags": flags,
+        }
+
+    return {
+        "sizes": list(sizes),
+        "target": target,
+        "budget": budget,
+        "peak_rss": peak_rss(),
+        "methods": dict(sorted(
+            methods.items(),
+            key=lambda item: -(item[1]["projected_seconds"] or 0))),
+    }
+
+
+def format_report(report: dict) -> str:
+    """Format a scaling report as a text table."""
+    largest = str(max(report["sizes"]))
+    names = list(report["methods"])
+    width = max([len(name) for name in names] + [6])
+    lines = [
+        f"Scaling over sizes {report['sizes']}, projected to "
+        f"{report['target']}x{report['target']} "
+        f"(budget {report['budget']:.0f} s)",
+        f"{'Method':<{width}}  {'s @' + largest:>10}  {'k':>5}  "
+        f"{'projected s':>12}  {'RSS MiB':>8}  flags",
+    ]
+    for name, method in report["methods"].items():
+        exponent = method["exponent"]
+        projected = method["projected_seconds"]
+        rss = method["peak_rss"]
+        lines.append(
+            f"{name:<{width}}  {method['seconds'].get(largest, 0.0):>10.3f}  "
+            f"{'-' if exponent is None else f'{exponent:.2f}':>5}  "
+            f"{'-' if projected is None else f'{projected:.1f}':>12}  "
+            f"{'-' if rss is None else f'{rss / 2**20:.0f}':>8}  "
+            f"{', '.join(method['flags'])}")
+    if report["peak_rss"] is not None:
+        lines.append(
+            f"Process peak RSS: {report['peak_rss'] / 2**20:.0f} MiB")
+
+    flagged = [name for name, method in report["methods"].items()
+               if method["flags"]]
+    lines.append(f"{len(flagged)} method(s) flagged")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the scaling report."""
+    parser = argparse.ArgumentParser(
+        description="Report how the world pipeline scales with world size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="World sizes to profile (default: 32 64 128)")
+    parser.add_argument("--target", type=int, default=4096,
+                        help="World size to project the timings to "
+                             "(default: 4096)")
+    parser.add_argument("--budget", type=float, default=600.0,
+                        help="Time budget per method at the target size in "
+                             "seconds (default: 600)")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(set(args.sizes))
+    if len(sizes) < 2:
+        parser.error("At least two sizes are needed to fit the scaling")
+
+    report = scaling_report(sizes, args.target, args.budget)
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
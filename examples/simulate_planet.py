@@ -43,18 +43,20 @@ def demonstrate_day_cycle(planet, steps=24):
 
     plt.tight_layout()
 
+    # Compute all frames of the day up front
+    hours_per_step = planet.day_length_hours / steps
+    frames = planet.advance_time_series_array(hours=hours_per_step,
+                                              steps=steps)
+
     # Function to update the plots for each frame
-    # pylint: disable=unused-argument
     def update(frame):
-        # Advance time by one hour
-        hours_per_step = planet.day_length_hours / steps
-        planet.advance_time(hours=hours_per_step)
-
-        # Update the plots
-        day_night_img.set_array(planet.day_night_mask)
-        solar_img.set_array(planet.solar_radiation)
+        # Show the precomputed frame
+        day_night_img.set_array(frames.day_night[frame])
+        solar_img.set_array(frames.radiation[frame])
 
-        # Update titles with current time
+        # Update titles with the frame's time
+        planet.current_day = frames.days[frame]
+        planet.current_hour = frames.hours[frame]
         ax1.set_title(f"Day/Night at {planet.get_formatted_date()}")
         ax2.set_title(f"Solar Radiation at {planet.get_formatted_date()}")
 
@@ -17,9 +17,18 @@ setup(
     install_requires=[
         "numpy",
         "matplotlib",
-        "opensimplex",
-        "ephem",
+        # noise.py uses the per-point routines of opensimplex.internals
+        "opensimplex>=0.4.3,<0.5",
+        "scipy",
+        "xarray",
+        "metpy",
+        "xclim",
+        "verde",
     ],
+    extras_require={
+        # Compiled kernels for the sequential terrain algorithms
+        "numba": ["numba"],
+    },
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Intended Audience :: Developers",
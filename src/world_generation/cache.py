@@ -0,0 +1,165 @@
+"""On-disk cache of terrain generation stages for EmergenWorld.
+
+Each pipeline stage is stored under a key that hashes everything its output
+depends on: the generator's seed and constructor arguments, the stage name
+and parameters, the stage's input arrays, and a cache version that is bumped
+whenever the stage code changes its results. Stages draw their randomness
+from per-stage streams derived from the seed, so no global random state is
+involved.
+Rerunning the pipeline after changing one stage's parameters reloads every
+earlier stage from disk and recomputes only the changed stage and the stages
+after it, whose inputs have changed too.
+
+Entries are pickled files in the cache directory. When the total size exceeds
+the configured limit the least recently used entries are deleted; a cache hit
+refreshes the entry's modification time, which records its last use.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Any, Optional
+
+import numpy as np
+
+# Default cache size limit (2 GiB)
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+
+ENTRY_SUFFIX = ".stage"
+
+# Version salted into every key. Bump it whenever a stage can produce a
+# different result from the same inputs, so entries written by older code
+# are never reused.
+CACHE_VERSION = 2
+
+
+def stage_key(*parts: Any) -> str:
+    """Hash stage inputs into a cache key.
+
+    Arrays are hashed by dtype, shape and contents; random generators by
+    their bit generator state; tuples, lists and dicts element by element;
+    anything else by its ``repr``. Every key also covers ``CACHE_VERSION``.
+
+    Args:
+        *parts: Values the stage output depends on
+
+    Returns:
+        Hexadecimal SHA-256 digest
+    """
+    digest = hashlib.sha256()
+
+    def update(value):
+        if isinstance(value, np.ndarray):
+            digest.update(f"array{value.dtype.str}{value.shape}".encode())
+            digest.update(np.ascontiguousarray(value).data)
+        elif isinstance(value, np.random.Generator):
+            update(value.bit_generator.state)
+        elif isinstance(value, (tuple, list)):
+            digest.update(f"{type(value).__name__}{len(value)}(".encode())
+            for item in value:
+                update(item)
+            digest.update(b")")
+        elif isinstance(value, dict):
+            digest.update(f"dict{len(value)}(".encode())
+            for name in sorted(value):
+                update(name)
+                update(value[name])
+            digest.update(b")")
+        else:
+            digest.update(repr(value).encode())
+        digest.update(b";")
+
+    update(CACHE_VERSION)
+    for part in parts:
+        update(part)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Size-limited LRU cache of stage results on disk."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_SIZE):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory holding the cache entries (created if needed)
+            max_bytes: Total size above which the least recently used
+                entries are evicted
+        """
+        if max_bytes < 0:
+            raise ValueError("max_bytes must not be negative")
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key: str) -> str:
+        """Return the file path of an entry."""
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Load an entry, marking it as recently used.
+
+        Args:
+            key: Entry key
+
+        Returns:
+            The stored value, or None if the entry does not exist
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as handle:
+                value = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store an entry and evict old entries beyond the size limit.
+
+        Args:
+            key: Entry key
+            value: Picklable value
+        """
+        # Write to a temporary file first so readers never see partial data
+        handle, temporary = tempfile.mkstemp(dir=self.directory,
+                                             suffix=".tmp")
+        with os.fdopen(handle, "wb") as stream:
+            pickle.dump(value, stream, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+    def size(self) -> int:
+        """Total size of all entries in bytes."""
+        return sum(os.path.getsize(path) for path, _ in self._entries())
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(os.path.getsize(path) for path, _ in entries)
+        for path, _ in entries:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    def clear(self) -> None:
+        """Delete every entry."""
+        for path, _ in self._entries():
+            os.remove(path)
+
+    def _entries(self):
+        """List (path, last use time) of every entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(ENTRY_SUFFIX):
+                path = os.path.join(self.directory, name)
+                entries.append((path, os.path.getmtime(path)))
+        return entries
@@ -13,9 +13,12 @@ import metpy.calc as mpcalc
 from metpy.units import units
 import xclim.indices as xcind
 import verde as vd
-from opensimplex import OpenSimplex
 from typing import Dict, List, Optional, Tuple, Union
 
+from .instrumentation import profiled
+from .noise import FractalNoise, grid_coordinates
+from .precision import DEFAULT_DTYPE, resolve_dtype
+
 
 class ClimateSystem:
     """Simulates climate patterns for the EmergenWorld simulation.
@@ -25,6 +28,7 @@ class ClimateSystem:
     water bodies, latitude, and planetary conditions.
     """
 
+    @profiled
     def __init__(
             self,
             terrain_heightmap: np.ndarray,
@@ -35,13 +39,14 @@ class ClimateSystem:
             seasonal_variation_strength: float = 1.0,
             random_seed: Optional[int] = None,
             fantasy_climate_features: Optional[Dict[str, float]] = None,
-            elevation_map: Optional[np.ndarray] = None
+            elevation_map: Optional[np.ndarray] = None,
+            dtype=DEFAULT_DTYPE
     ):
         """Initialize the ClimateSystem with configurable parameters.
 
         Args:
             terrain_heightmap: 2D array representing terrain elevation (0.0-1.0)
-            water_mask: 2D array indicating water bodies (1 for water, 0 for land)
+            water_mask: 2D array indicating water bodies (nonzero for water), kept as a boolean mask
             planetary_system: PlanetarySystem object with day/night and seasonal data
             world_size: Size of the world grid (should match terrain and planetary)
             base_temperature: Global average temperature in degrees Celsius
@@ -54,9 +59,11 @@ class ClimateSystem:
                 - 'aether_currents': Strength of supernatural wind patterns (0.0-1.0)
                 - 'reality_flux': Degree of climate unpredictability (0.0-1.0)
             elevation_map: Optional precalculated elevation in meters (if not provided, will calculate from heightmap)
+            dtype: Floating-point type of every climate field, float32 (default) or float64
         """
-        self.heightmap = terrain_heightmap
-        self.water_mask = water_mask
+        self.dtype = resolve_dtype(dtype)
+        self.heightmap = np.asarray(terrain_heightmap, dtype=self.dtype)
+        self.water_mask = np.asarray(water_mask) > 0
         self.planetary = planetary_system
         self.world_size = world_size
         self.base_temperature = base_temperature
@@ -67,7 +74,7 @@ class ClimateSystem:
         self.seed = random_seed if random_seed is not None else np.random.randint(0, 1000000)
     
         # Initialize noise generator for coherent noise patterns
-        self.noise_gen = OpenSimplex(seed=self.seed)
+        self.noise_gen = FractalNoise(seed=self.seed)
     
         # Default fantasy features if none provided
         if fantasy_climate_features is None:
@@ -81,8 +88,8 @@ class ClimateSystem:
             self.fantasy_features = fantasy_climate_features
     
         # Extract unique latitudes and longitudes
-        self.lats = self.planetary.latitudes[:, 0]  # Extract unique latitudes
-        self.lons = self.planetary.longitudes[0, :]  # Extract unique longitudes
+        self.lats = self.planetary.latitudes[:, 0].astype(self.dtype)  # Extract unique latitudes
+        self.lons = self.planetary.longitudes[0, :].astype(self.dtype)  # Extract unique longitudes
     
         # Create a proper coordinate grid for xarray
         self.lat_grid, self.lon_grid = np.meshgrid(self.lats, self.lons, indexing='ij')
@@ -95,7 +102,7 @@ class ClimateSystem:
         # Use provided elevation map or calculate from heightmap
         if elevation_map is not None:
             # Use custom elevation map (in meters)
-            actual_elevation = elevation_map
+            actual_elevation = np.asarray(elevation_map, dtype=self.dtype)
         else:
             # Apply custom elevation scaling with more moderate heights
             actual_elevation = np.zeros_like(self.heightmap)
@@ -116,12 +123,12 @@ class ClimateSystem:
         # Set up climate data using xarray for better scientific data handling
         self.climate_data = xr.Dataset(
             data_vars={
-                "temperature": (["y", "x"], np.zeros((world_size, world_size))),
-                "precipitation": (["y", "x"], np.zeros((world_size, world_size))),
-                "humidity": (["y", "x"], np.zeros((world_size, world_size))),
-                "pressure": (["y", "x"], np.ones((world_size, world_size)) * 1013.25),
-                "wind_u": (["y", "x"], np.zeros((world_size, world_size))),
-                "wind_v": (["y", "x"], np.zeros((world_size, world_size))),
+                "temperature": (["y", "x"], np.zeros((world_size, world_size), dtype=self.dtype)),
+                "precipitation": (["y", "x"], np.zeros((world_size, world_size), dtype=self.dtype)),
+                "humidity": (["y", "x"], np.zeros((world_size, world_size), dtype=self.dtype)),
+                "pressure": (["y", "x"], np.full((world_size, world_size), 1013.25, dtype=self.dtype)),
+                "wind_u": (["y", "x"], np.zeros((world_size, world_size), dtype=self.dtype)),
+                "wind_v": (["y", "x"], np.zeros((world_size, world_size), dtype=self.dtype)),
                 "elevation": (["y", "x"], actual_elevation),  # Use calculated elevation
                 "water": (["y", "x"], self.water_mask),
                 "coriolis": (["y", "x"], self.coriolis),
@@ -158,42 +165,46 @@ class ClimateSystem:
     def _get_simplex_noise(self, x, y, z=0.0, scale=1.0, octaves=1, persistence=0.5, lacunarity=2.0):
         """Generate coherent noise using OpenSimplex.
         
+        Coordinates may be scalars or broadcast-compatible arrays, so whole
+        fields can be generated in a single call.
+        
         Args:
-            x: X coordinate
-            y: Y coordinate
-            z: Z coordinate (default 0.0)
+            x: X coordinate(s)
+            y: Y coordinate(s)
+            z: Z coordinate(s) (default 0.0)
             scale: Noise scale factor
             octaves: Number of octaves for noise generation
             persistence: Persistence value for octaves
             lacunarity: Lacunarity value for octaves
             
         Returns:
-            Noise value in range [-1, 1]
+            Noise value(s) in range [-1, 1]
         """
         # Apply scaling
-        nx = x * scale
-        ny = y * scale
-        nz = z * scale
-        
-        # Generate noise with multiple octaves
-        value = 0.0
-        amplitude = 1.0
-        frequency = 1.0
-        max_value = 0.0
-        
-        for _ in range(octaves):
-            if hasattr(self.noise_gen, 'noise3d'):  # Newer versions of opensimplex
-                n = self.noise_gen.noise3d(nx * frequency, ny * frequency, nz * frequency)
-            else:  # Older versions of opensimplex
-                n = self.noise_gen.noise3(nx * frequency, ny * frequency, nz * frequency)
-                
-            value += n * amplitude
-            max_value += amplitude
-            amplitude *= persistence
-            frequency *= lacunarity
+        nx = np.asarray(x) * scale
+        ny = np.asarray(y) * scale
+        nz = np.asarray(z) * scale
         
-        # Normalize to [-1, 1]
-        return value / max_value
+        # Generate noise with multiple octaves, normalized to [-1, 1]
+        return self.noise_gen.fractal3(nx, ny, nz, octaves=octaves,
+                                       persistence=persistence,
+                                       lacunarity=lacunarity, normalize=True,
+                                       dtype=self.dtype)
+
+    def _store_field(self, name: str, values: np.ndarray) -> None:
+        """Replace a whole climate field, converting it to the configured dtype.
+
+        Existing variables keep their attributes (units).
+
+        Args:
+            name: Climate variable name
+            values: New values (e.g. float64 results of scipy, verde or xclim)
+        """
+        values = np.asarray(values, dtype=self.dtype)
+        if name in self.climate_data:
+            self.climate_data[name].values = values
+        else:
+            self.climate_data[name] = (["y", "x"], values)
 
     def _initialize_base_climate(self) -> None:
         """Initialize the base climate patterns before any simulation."""
@@ -218,6 +229,7 @@ class ClimateSystem:
         # Calculate derived climate variables and indices
         self._calculate_climate_indices()
     
+    @profiled
     def _generate_base_pressure(self) -> None:
         """Generate the base atmospheric pressure map using barometric formula and global circulation patterns."""
         # Get elevation in meters
@@ -280,17 +292,15 @@ class ClimateSystem:
 
         # Add random perturbations to create weather systems like highs and lows
         # Use OpenSimplex noise for spatially correlated pressure variations
-        noise = np.zeros((self.world_size, self.world_size))
         scale = 0.05  # Controls the spatial scale of the noise
-        for y in range(self.world_size):
-            for x in range(self.world_size):
-                noise[y, x] = self._get_simplex_noise(
-                    x, y, 0.0, 
-                    scale=scale,
-                    octaves=4, 
-                    persistence=0.5, 
-                    lacunarity=2.0
-                )
+        y, x = grid_coordinates(self.world_size, self.world_size)
+        noise = self._get_simplex_noise(
+            x, y, 0.0, 
+            scale=scale,
+            octaves=4, 
+            persistence=0.5, 
+            lacunarity=2.0
+        )
 
         # Scale noise to appropriate pressure variations (±5 hPa)
         noise = noise * 5.0
@@ -302,12 +312,13 @@ class ClimateSystem:
         pressure = np.clip(pressure, 870, 1090)
 
         # Update the dataset
-        self.climate_data["pressure"].values = pressure
+        self._store_field("pressure", pressure)
 
+    @profiled
     def _generate_base_temperature(self) -> None:
         """Generate the base temperature map based on latitude, elevation and complex climate factors."""
         # Create initial temperatures based on latitudinal gradients
-        temperatures = np.zeros((self.world_size, self.world_size))
+        temperatures = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
 
         # Implement a more realistic temperature model using real climate science
         for y in range(self.world_size):
@@ -366,7 +377,7 @@ class ClimateSystem:
         # Apply ocean influence using a proper ocean heat capacity model
         # Oceans have much higher heat capacity and moderate nearby land
         water_mask = self.climate_data.water.values
-        land_mask = 1 - water_mask
+        land_mask = ~water_mask
 
         # Calculate ocean temperature with reduced seasonal variation
         # Ocean temperatures typically lag seasonal changes by about 2 months
@@ -393,7 +404,7 @@ class ClimateSystem:
 
         # Land-sea temperature contrast - coastal moderation
         # Distance from coast affects temperature moderation
-        distance_to_water = ndimage.distance_transform_edt(land_mask)
+        distance_to_water = ndimage.distance_transform_edt(land_mask).astype(self.dtype)
         coastal_influence = np.exp(-distance_to_water / 20)  # Exponential decay of influence
 
         # Apply coastal moderation - land temps become more like ocean temps near coasts
@@ -435,8 +446,9 @@ class ClimateSystem:
                     temperatures[y, x] -= continental_effect[y, x] * latitude_factor * 0.5
 
         # Update the dataset
-        self.climate_data["temperature"].values = temperatures
+        self._store_field("temperature", temperatures)
 
+    @profiled
     def _generate_wind_patterns(self) -> None:
         """Generate wind patterns based on pressure gradients, Coriolis force, and thermal effects."""
         # Get pressure field and calculate gradients
@@ -468,8 +480,8 @@ class ClimateSystem:
         f = self.climate_data.coriolis.values
 
         # Initialize wind components
-        u_geo = np.zeros((self.world_size, self.world_size))
-        v_geo = np.zeros((self.world_size, self.world_size))
+        u_geo = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
+        v_geo = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
 
         # Air density (kg/m³) - decreases with height
         # Limit the density range to prevent unrealistic winds at extreme elevations
@@ -498,9 +510,9 @@ class ClimateSystem:
     
         # Create large-scale circulation pattern overlays based on latitude
         # This will enforce more realistic global wind patterns
-        trade_wind_u = np.zeros((self.world_size, self.world_size))
-        westerlies_u = np.zeros((self.world_size, self.world_size))
-        polar_u = np.zeros((self.world_size, self.world_size))
+        trade_wind_u = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
+        westerlies_u = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
+        polar_u = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
     
         for y in range(self.world_size):
             for x in range(self.world_size):
@@ -571,7 +583,7 @@ class ClimateSystem:
         # Near surface, friction reduces wind speed and causes cross-isobaric flow
         terrain_roughness = np.zeros_like(self.heightmap)
         water_mask = self.climate_data.water.values
-        land_mask = 1 - water_mask
+        land_mask = ~water_mask
 
         # Ocean has low roughness
         terrain_roughness[water_mask > 0] = 0.1
@@ -621,8 +633,8 @@ class ClimateSystem:
 
         # Sea-land breeze effect near coastlines
         distance_to_coast = np.minimum(
-            ndimage.distance_transform_edt(water_mask),
-            ndimage.distance_transform_edt(land_mask)
+            ndimage.distance_transform_edt(water_mask).astype(self.dtype),
+            ndimage.distance_transform_edt(land_mask).astype(self.dtype)
         )
         coastal_zone = distance_to_coast < 10
 
@@ -699,23 +711,24 @@ class ClimateSystem:
             v_final *= scale_factor
 
         # Update the dataset
-        self.climate_data["wind_u"].values = u_final
-        self.climate_data["wind_v"].values = v_final
+        self._store_field("wind_u", u_final)
+        self._store_field("wind_v", v_final)
 
+    @profiled
     def _generate_base_humidity(self) -> None:
         """Generate humidity based on temperature, pressure and water proximity."""
         # Initialize with evaporation from water bodies
-        humidity = np.zeros((self.world_size, self.world_size))
+        humidity = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
         
         # Water bodies have maximum humidity at surface
         water_mask = self.climate_data.water.values
         humidity[water_mask > 0] = 1.0
         
         # Land humidity depends on distance from water sources
-        land_mask = 1 - water_mask
+        land_mask = ~water_mask
         
         # Calculate distance from water using distance transform
-        distance_to_water = ndimage.distance_transform_edt(land_mask)
+        distance_to_water = ndimage.distance_transform_edt(land_mask).astype(self.dtype)
         
         # Calculate prevailing wind direction (coarse scale)
         u_wind = self.climate_data.wind_u.values
@@ -819,7 +832,7 @@ class ClimateSystem:
         humidity = np.clip(humidity, 0.0, 1.0)
         
         # Update the dataset
-        self.climate_data["humidity"].values = humidity
+        self._store_field("humidity", humidity)
 
     def _apply_orographic_humidity(self, humidity: np.ndarray) -> None:
         """Apply orographic effects to humidity based on wind patterns and terrain."""
@@ -860,6 +873,7 @@ class ClimateSystem:
                         effect = -orographic_effect[y, x] * slope_magnitude[y, x] * 5.0
                         humidity[y, x] = max(0.1, humidity[y, x] - effect)
 
+    @profiled
     def _generate_precipitation(self) -> None:
         """Generate precipitation patterns based on humidity, temperature, and atmospheric dynamics."""
         # Get required variables
@@ -869,7 +883,7 @@ class ClimateSystem:
         v_wind = self.climate_data.wind_v.values
         
         # Initialize precipitation array
-        precipitation = np.zeros((self.world_size, self.world_size))
+        precipitation = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
         
         # Basic precipitation model - precipitation proportional to humidity
         for y in range(self.world_size):
@@ -928,7 +942,7 @@ class ClimateSystem:
         
         # Apply local effects like lake-effect precipitation
         water_mask = self.climate_data.water.values
-        land_mask = 1 - water_mask
+        land_mask = ~water_mask
         
         # Lake effect snow/rain - enhanced precipitation downwind of lakes
         for y in range(self.world_size):
@@ -963,7 +977,7 @@ class ClimateSystem:
         precipitation = np.maximum(0.0, precipitation)
         
         # Update the dataset
-        self.climate_data["precipitation"].values = precipitation
+        self._store_field("precipitation", precipitation)
 
     def _apply_orographic_precipitation(self, precipitation: np.ndarray) -> None:
         """Apply orographic effects to precipitation with realistic physics."""
@@ -1055,6 +1069,7 @@ class ClimateSystem:
                     if self.water_mask[y, x] == 0:  # Only modify land
                         precipitation[y, x] *= 0.5
 
+    @profiled
     def _calculate_climate_indices(self) -> None:
         """Calculate various climate indices for analysis and biome determination."""
         # Create climate indices using xclim
@@ -1093,16 +1108,17 @@ class ClimateSystem:
             aridity = np.clip(aridity, 0.01, 5.0)  # Limit range for numerical stability
             
             # Store calculated indices in the climate dataset
-            self.climate_data["growing_degree_days"] = (["y", "x"], gdd.values)
-            self.climate_data["aridity_index"] = (["y", "x"], aridity)
+            self._store_field("growing_degree_days", gdd.values)
+            self._store_field("aridity_index", aridity)
             
             # Add bioclimatic temperature indices
-            self.climate_data["annual_mean_temp"] = (["y", "x"], temperature)
+            self._store_field("annual_mean_temp", temperature)
             
         except Exception as e:
             print(f"Warning: Could not calculate some climate indices: {e}")
             # Proceed without indices
 
+    @profiled
     def _apply_fantasy_climate_features(self) -> None:
         """Apply fantasy-specific climate elements based on configured parameters."""
         # Skip if no fantasy features are enabled
@@ -1594,6 +1610,18 @@ class ClimateSystem:
             # Radius adjusted by strength
             radius = int(flux['radius'] * strength)
             
+            # Generate noise pattern for this flux zone in one pass
+            # Use OpenSimplex noise for spatially coherent randomness
+            zone_y, zone_x = grid_coordinates(2 * radius + 1, 2 * radius + 1,
+                                              y - radius, x - radius)
+            zone_noise = self._get_simplex_noise(
+                zone_x, zone_y, self.seed * 0.1,
+                scale=0.1,
+                octaves=4,
+                persistence=0.5,
+                lacunarity=2.0
+            )
+            
             # Apply flux effects
             for dy in range(-radius, radius + 1):
                 for dx in range(-radius, radius + 1):
@@ -1607,15 +1635,7 @@ class ClimateSystem:
                             # Falloff effect based on distance
                             falloff = (1 - distance/radius)**1.5
                             
-                            # Generate noise pattern for this flux zone
-                            # Use OpenSimplex noise for spatially coherent randomness
-                            noise_val = self._get_simplex_noise(
-                                nx, ny, self.seed * 0.1,
-                                scale=0.1,
-                                octaves=4,
-                                persistence=0.5,
-                                lacunarity=2.0
-                            )
+                            noise_val = zone_noise[dy + radius, dx + radius]
                             
                             # Apply temperature chaos
                             temp_chaos = noise_val * flux['temp_range'] * falloff * strength
@@ -1658,6 +1678,7 @@ class ClimateSystem:
                                     self.climate_data["temperature"].values[ny, nx] = -40 * falloff + (1 - falloff) * self.climate_data["temperature"].values[ny, nx]
                                     self.climate_data["precipitation"].values[ny, nx] *= (3 * falloff + (1 - falloff))
 
+    @profiled
     def update_climate(self, day_of_year: int, hour_of_day: float) -> None:
         """Update climate based on planetary conditions, seasonal changes, and time of day.
         
@@ -1679,6 +1700,7 @@ class ClimateSystem:
         
         print(f"Updated climate for day {day_of_year}, hour {hour_of_day:.1f}")
 
+    @profiled
     def _update_seasonal_temperature(self, day_of_year: int) -> None:
         """Update temperature based on seasonal changes.
         
@@ -1688,12 +1710,19 @@ class ClimateSystem:
         # Get the base temperature map without seasonal variations
         base_temps = self.climate_data["temperature"].values.copy()
         
+        # Seasonal factors of all cells (-1 to 1)
+        seasonal_factors = self.planetary.get_seasonal_factor(self.lat_grid)
+        
+        # Distance of every land cell from the coast
+        land_mask = ~self.water_mask
+        distance_to_water = ndimage.distance_transform_edt(land_mask).astype(self.dtype)
+        
         for y in range(self.world_size):
             for x in range(self.world_size):
                 latitude = self.lat_grid[y, x]
                 
-                # Calculate seasonal factor for this latitude (-1 to 1)
-                seasonal_factor = self.planetary.get_seasonal_factor(latitude)
+                # Seasonal factor for this latitude (-1 to 1)
+                seasonal_factor = seasonal_factors[y, x]
                 
                 # Scale by seasonal variation strength
                 seasonal_factor *= self.seasonal_variation_strength
@@ -1709,10 +1738,7 @@ class ClimateSystem:
                     seasonal_temp_range = 30.0  # Very large variation
                 
                 # Continental areas have greater seasonal variation
-                land_mask = 1 - self.water_mask
-                if land_mask[y, x] > 0:
-                    # Calculate distance from coast
-                    distance_to_water = ndimage.distance_transform_edt(land_mask)
+                if land_mask[y, x]:
                     continental_factor = min(1.0, distance_to_water[y, x] / 50.0)
                     seasonal_temp_range *= (1.0 + continental_factor)
                 else:
@@ -1723,6 +1749,7 @@ class ClimateSystem:
                 temp_offset = seasonal_factor * seasonal_temp_range
                 self.climate_data["temperature"].values[y, x] = base_temps[y, x] + temp_offset
 
+    @profiled
     def _update_diurnal_temperature(self, hour_of_day: float) -> None:
         """Update temperature based on time of day.
         
@@ -1786,6 +1813,7 @@ class ClimateSystem:
                 # Apply the offset
                 self.climate_data["temperature"].values[y, x] = current_temp + temp_offset
 
+    @profiled
     def _update_seasonal_precipitation(self, day_of_year: int) -> None:
         """Update precipitation patterns based on seasonal changes.
         
@@ -1795,6 +1823,9 @@ class ClimateSystem:
         # Calculate position in the year (0 to 1)
         year_position = day_of_year / self.planetary.year_length_days
         
+        # Seasonal factors of all cells (-1 to 1)
+        seasonal_factors = self.planetary.get_seasonal_factor(self.lat_grid)
+        
         # Update precipitation based on latitude and season
         for y in range(self.world_size):
             for x in range(self.world_size):
@@ -1803,8 +1834,8 @@ class ClimateSystem:
                 
                 latitude = self.lat_grid[y, x]
                 
-                # Calculate seasonal factor (-1 to 1)
-                seasonal_factor = self.planetary.get_seasonal_factor(latitude)
+                # Seasonal factor (-1 to 1)
+                seasonal_factor = seasonal_factors[y, x]
                 
                 # Different seasonal precipitation patterns by latitude zone
                 if abs(latitude) < 10:  # Equatorial
@@ -1861,6 +1892,7 @@ class ClimateSystem:
         
         return has_water and has_land
 
+    @profiled
     def _update_seasonal_winds(self, day_of_year: int) -> None:
         """Update wind patterns based on seasonal changes.
         
@@ -1874,6 +1906,9 @@ class ClimateSystem:
         # Calculate ITCZ position (shifts north in northern summer, south in southern summer)
         itcz_shift = np.sin(2 * np.pi * year_position) * 15  # ±15° from equator
         
+        # Seasonal factors of all cells (-1 to 1)
+        seasonal_factors = self.planetary.get_seasonal_factor(self.lat_grid)
+        
         # Apply shifts to the wind patterns
         for y in range(self.world_size):
             for x in range(self.world_size):
@@ -1906,7 +1941,7 @@ class ClimateSystem:
                     
                 else:  # Polar regions
                     # Polar vortex strengthens in winter, weakens in summer
-                    seasonal_factor = self.planetary.get_seasonal_factor(latitude)
+                    seasonal_factor = seasonal_factors[y, x]
                     
                     # Negative factor = winter = stronger polar winds
                     season_strength = -seasonal_factor * self.seasonal_variation_strength
@@ -2419,7 +2454,7 @@ class ClimateSystem:
             ax = plt.gca()
         
         # Calculate baseline temperature from latitude and elevation only
-        baseline_temp = np.zeros((self.world_size, self.world_size))
+        baseline_temp = np.zeros((self.world_size, self.world_size), dtype=self.dtype)
         for y in range(self.world_size):
             for x in range(self.world_size):
                 latitude = self.lat_grid[y, x]
@@ -2507,7 +2542,7 @@ class ClimateSystem:
         }
         
         # Create an image for the climate map
-        climate_map = np.zeros((self.world_size, self.world_size, 3))
+        climate_map = np.zeros((self.world_size, self.world_size, 3), dtype=self.dtype)
         
         # Sample the climate types at the specified resolution
         step = max(1, resolution)
@@ -0,0 +1,422 @@
+"""Profiling and instrumentation for EmergenWorld pipelines.
+
+The stage methods of TerrainGenerator, PlanetarySystem and ClimateSystem are
+wrapped with ``profiled``, and the code that does countable work (erosion
+droplets, stage cache lookups, solar table builds) reports it with
+``count``. Both do nothing unless a ``Profiler`` is active:
+
+    with Profiler(memory=True) as profiler:
+        terrain.generate_complete_terrain()
+    print(profiler.report())
+    profiler.save_json("profile.json")
+    profiler.save_chrome_trace("trace.json")
+
+The Chrome trace opens in chrome://tracing or https://ui.perfetto.dev and
+shows every profiled call as a nested span with its counters.
+
+A disabled wrapper costs a single global lookup per call. With
+``memory=True`` every span also records its peak traced memory (tracemalloc,
+including the memory of nested spans). Tracing memory slows NumPy-heavy code
+down noticeably, so it is off by default.
+
+With ``arrays=True`` every span also records its retained arrays: the number
+of NumPy array buffers allocated during the span that are still alive when
+it returns, net of the older buffers it frees. Arrays allocated and freed
+within the span do not show up. It takes a tracemalloc snapshot at both
+ends of every span, whose cost grows with the number of live allocations,
+so it is a separate option.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Profiler currently collecting, None when instrumentation is disabled
+_active: Optional["Profiler"] = None
+
+# Reusable context manager returned by ``span`` while disabled
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class _Frame:
+    """Open span on a thread's span stack."""
+
+    __slots__ = ("name", "start", "memory", "peak", "buffers", "counters")
+
+    def __init__(self, name: str, start: int):
+        self.name = name
+        self.start = start
+        self.memory = 0
+        self.peak = 0
+        self.buffers = 0
+        self.counters: Dict[str, int] = {}
+
+
+class _Span:
+    """Context manager timing one span of a profiler."""
+
+    __slots__ = ("profiler", "name")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.profiler._open(self.name)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler._close()
+
+
+class Profiler:
+    """Collects spans and counters while it is active.
+
+    Spans are aggregated per name into call counts, wall time, peak memory
+    and retained array counts; the individual spans are kept for the Chrome
+    trace.
+    """
+
+    def __init__(self, memory: bool = False, arrays: bool = False):
+        """Initialize the profiler.
+
+        Args:
+            memory: Also trace memory with tracemalloc (peak bytes per span)
+            arrays: Also count the NumPy array buffers each span retains
+                (implies ``memory``)
+        """
+        self.memory = memory or arrays
+        self.arrays = arrays
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = 0
+        self._wall_time = 0.0
+        self._previous: Optional[Profiler] = None
+        self._started_tracing = False
+        # Memory traced before the last clear_traces (Python 3.8 only)
+        self._memory_offset = 0
+
+    # Activation
+
+    def start(self) -> "Profiler":
+        """Activate the profiler (restored to the previous one by ``stop``)."""
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._origin = time.perf_counter_ns()
+        self._previous = _active
+        _active = self
+        return self
+
+    def stop(self) -> None:
+        """Deactivate the profiler."""
+        global _active
+        self._wall_time += (time.perf_counter_ns() - self._origin) / 1e9
+        _active = self._previous
+        self._previous = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # Collection
+
+    def now(self) -> float:
+        """Microseconds since the profiler started (the time base of spans)."""
+        return (time.perf_counter_ns() - self._origin) / 1e3
+
+    def span(self, name: str) -> _Span:
+        """Context manager recording a named span."""
+        return _Span(self, name)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Add to a counter, and to the counters of the innermost span.
+
+        Args:
+            name: Counter name
+            amount: Amount to add
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+        stack = self._stack()
+        if stack:
+            counters = stack[-1].counters
+            counters[name] = counters.get(name, 0) + amount
+
+    def _stack(self) -> List[_Frame]:
+        """Span stack of the calling thread."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _open(self, name: str) -> None:
+        """Push a span onto the calling thread's stack."""
+        stack = self._stack()
+        frame = _Frame(name, 0)
+        if self.memory and tracemalloc.is_tracing():
+            # Hand the peak so far to the enclosing span, then measure
+            # this span's peak from a fresh baseline
+            current, peak = self._traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            self._reset_peak()
+            frame.memory = frame.peak = current
+            if self.arrays:
+                frame.buffers = _numpy_buffers()
+        stack.append(frame)
+        frame.start = time.perf_counter_ns()
+
+    def _close(self) -> None:
+        """Pop the innermost span and record it."""
+        end = time.perf_counter_ns()
+        stack = self._stack()
+        frame = stack.pop()
+
+        record: Dict[str, Any] = {
+            "name": frame.name,
+            "start": (frame.start - self._origin) / 1e3,
+            "duration": (end - frame.start) / 1e3,
+            "depth": len(stack),
+            "thread": threading.get_ident(),
+        }
+        if self.memory and tracemalloc.is_tracing():
+            _, peak = self._traced_memory()
+            frame.peak = max(frame.peak, peak)
+            record["peak_bytes"] = frame.peak - frame.memory
+            if self.arrays:
+                record["retained_arrays"] = max(
+                    0, _numpy_buffers() - frame.buffers)
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, frame.peak)
+            self._reset_peak()
+        if frame.counters:
+            record["counters"] = frame.counters
+
+        with self._lock:
+            self.spans.append(record)
+
+    def _traced_memory(self) -> Tuple[int, int]:
+        """Current and peak traced memory in bytes since tracing started."""
+        current, peak = tracemalloc.get_traced_memory()
+        return current + self._memory_offset, peak + self._memory_offset
+
+    def _reset_peak(self) -> None:
+        """Restart the peak measurement at the current traced memory.
+
+        ``tracemalloc.reset_peak`` is new in Python 3.9. Older versions
+        clear the traces instead and carry the memory traced so far as an
+        offset (frees of memory allocated before the clear go unseen, so
+        later readings can be slightly high, and the retained arrays of a
+        span only count those allocated after its last nested span).
+        """
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        else:
+            self._memory_offset += tracemalloc.get_traced_memory()[0]
+            tracemalloc.clear_traces()
+
+    # Results
+
+    @property
+    def wall_time(self) -> float:
+        """Seconds the profiler has been active."""
+        if _active is self or self._previous is not None:
+            return self._wall_time + (
+                time.perf_counter_ns() - self._origin) / 1e9
+        return self._wall_time
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Aggregate the spans per name.
+
+        Returns:
+            Dictionary mapping span names to their call count, total, mean
+            and maximum wall time in seconds and, when measured, the largest
+            peak memory in bytes and the total retained arrays
+        """
+        stats: Dict[str, Dict[str, float]] = {}
+        for record in self.spans:
+            seconds = record["duration"] / 1e6
+            entry = stats.setdefault(record["name"], {
+                "calls": 0, "total": 0.0, "max": 0.0})
+            entry["calls"] += 1
+            entry["total"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            if "peak_bytes" in record:
+                entry["peak_bytes"] = max(entry.get("peak_bytes", 0),
+                                          record["peak_bytes"])
+            if "retained_arrays" in record:
+                entry["retained_arrays"] = (entry.get("retained_arrays", 0)
+                                            + record["retained_arrays"])
+        for entry in stats.values():
+            entry["mean"] = entry["total"] / entry["calls"]
+        return dict(sorted(stats.items(), key=lambda item: -item[1]["total"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary of the run as a JSON-serializable dictionary."""
+        return {
+            "wall_time": self.wall_time,
+            "memory": self.memory,
+            "arrays": self.arrays,
+            "stats": self.stats(),
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def save_json(self, path: str) -> None:
+        """Write the summary (``to_dict``) as JSON.
+
+        Args:
+            path: Output file path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Spans and counters in the Chrome trace event format."""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        for record in sorted(self.spans, key=lambda r: r["start"]):
+            args = dict(record.get("counters", {}))
+            for name in ("peak_bytes", "retained_arrays"):
+                if name in record:
+                    args[name] = record[name]
+            events.append({
+                "name": record["name"], "cat": "emergenworld", "ph": "X",
+                "ts": record["start"], "dur": record["duration"],
+                "pid": pid, "tid": record["thread"], "args": args,
+            })
+
+        # Counter totals at the end of the run
+        end = max((r["start"] + r["duration"] for r in self.spans),
+                  default=0.0)
+        for name, value in sorted(self.counters.items()):
+            events.append({"name": name, "cat": "emergenworld", "ph": "C",
+                           "ts": end, "pid": pid, "args": {name: value}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save_chrome_trace(self, path: str) -> None:
+        """Write the spans as a Chrome trace (chrome://tracing, Perfetto).
+
+        Args:
+            path: Output file path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def report(self, limit: Optional[int] = None) -> str:
+        """Format the aggregated spans and counters as a text table.
+
+        Args:
+            limit: Only list the spans with the largest total time
+
+        Returns:
+            Report text
+        """
+        stats = list(self.stats().items())[:limit]
+        width = max([len(name) for name, _ in stats] + [5])
+        header = (f"{'Stage':<{width}}  {'calls':>7}  {'total s':>9}  "
+                  f"{'mean ms':>9}")
+        if self.memory:
+            header += f"  {'peak MiB':>9}"
+        if self.arrays:
+            # Arrays allocated in the span and still alive at its end
+            header += f"  {'retained arrays':>15}"
+        lines = [f"Profile of {self.wall_time:.3f} s", header]
+        for name, entry in stats:
+            line = (f"{name:<{width}}  {entry['calls']:>7d}  "
+                    f"{entry['total']:>9.3f}  {entry['mean'] * 1e3:>9.2f}")
+            if "peak_bytes" in entry:
+                line += f"  {entry['peak_bytes'] / 2**20:>9.1f}"
+            if "retained_arrays" in entry:
+                line += f"  {entry['retained_arrays']:>15d}"
+            lines.append(line)
+        if self.counters:
+            lines.append("Counters")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"  {name}: {value}")
+        return "\n".join(lines)
+
+
+def _numpy_buffers() -> int:
+    """Number of NumPy data buffers currently traced by tracemalloc."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)])
+    return len(snapshot.traces)
+
+
+def active_profiler() -> Optional[Profiler]:
+    """Return the active profiler, or None when instrumentation is off."""
+    return _active
+
+
+def span(name: str):
+    """Context manager recording a span with the active profiler, if any.
+
+    Args:
+        name: Span name
+
+    Returns:
+        Context manager
+    """
+    profiler = _active
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name)
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Add to a counter of the active profiler, if any.
+
+    Args:
+        name: Counter name
+        amount: Amount to add
+    """
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, amount)
+
+
+def profiled(func: Optional[Callable] = None, *,
+             name: Optional[str] = None) -> Callable:
+    """Decorator recording every call of a function as a span.
+
+    Usable bare (``@profiled``) or with a span name
+    (``@profiled(name="terrain.erosion")``); the default name is the
+    function's qualified name, e.g. ``TerrainGenerator.apply_erosion``.
+
+    Args:
+        func: Function to wrap
+        name: Span name
+
+    Returns:
+        Wrapped function, or a decorator if ``func`` is omitted
+    """
+    def decorate(func: Callable) -> Callable:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.span(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate if func is None else decorate(func)
@@ -0,0 +1,952 @@
+"""Compiled kernels for the sequential terrain algorithms of EmergenWorld.
+
+Droplet erosion, river random walks and lake flood fills depend on the
+order of each step, so they cannot be expressed as whole-array NumPy
+operations. They are written here once as plain Python functions over NumPy
+arrays and exposed through two interchangeable backends:
+
+- ``"numba"``: the functions compiled with numba at import time (with
+  on-disk caching, so later imports only load the cached machine code)
+- ``"python"``: the very same functions run by the interpreter
+
+All randomness is drawn by the caller and passed in as arrays, so both
+backends produce identical results for a fixed seed.
+"""
+
+import math
+import types
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # Fall back to plain Python loops
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):  # pylint: disable=unused-argument
+        """Return functions unchanged when numba is not installed."""
+        def wrapper(func):
+            return func
+        return wrapper
+
+
+BACKENDS = ("numba", "python")
+
+# Maximum number of cells a single droplet travels
+DROPLET_PATH_LENGTH = 30
+
+# Newton iterations of the implicit stream-power solver (n != 1)
+STREAM_POWER_NEWTON_STEPS = 20
+
+# Number of punch-through attempts and their search radius in river walks
+PUNCH_THROUGH_ATTEMPTS = 5
+PUNCH_THROUGH_RADIUS = 5
+
+
+def droplet_erosion(heightmap, flow_dir, drops, erosion_strength):
+    """Simulate water droplets eroding and depositing sediment in place.
+
+    Args:
+        heightmap: 2D float64 heightmap, modified in place
+        flow_dir: (size, size, 2) int64 array of (dy, dx) flow directions
+        drops: (n, 2) int64 array of droplet start positions as (y, x)
+        erosion_strength: Strength of the erosion effect
+    """
+    size = heightmap.shape[0]
+    path_y = np.empty(DROPLET_PATH_LENGTH, dtype=np.int64)
+    path_x = np.empty(DROPLET_PATH_LENGTH, dtype=np.int64)
+
+    for d in range(drops.shape[0]):
+        y = drops[d, 0]
+        x = drops[d, 1]
+
+        # Skip ocean areas
+        if heightmap[y, x] < 0:
+            continue
+
+        # Water carries sediment
+        sediment = 0.0
+        length = 0
+
+        # Simulate water flow path
+        for _ in range(DROPLET_PATH_LENGTH):
+            path_y[length] = y
+            path_x[length] = x
+            length += 1
+
+            dy = flow_dir[y, x, 0]
+            dx = flow_dir[y, x, 1]
+            if dy == 0 and dx == 0:
+                break
+
+            # Wrap x (longitude) and clamp y (latitude)
+            nx = (x + dx) % size
+            ny = max(0, min(size - 1, y + dy))
+
+            h_diff = heightmap[y, x] - heightmap[ny, nx]
+
+            if h_diff > 0:
+                # Erode more on steeper slopes
+                erode_amount = min(h_diff * erosion_strength, 0.01)
+                heightmap[y, x] -= erode_amount
+                sediment += erode_amount
+            else:
+                # Deposit some sediment when slope decreases
+                deposit = sediment * 0.5
+                heightmap[y, x] += deposit
+                sediment -= deposit
+
+            x = nx
+            y = ny
+
+            # Stop at ocean
+            if heightmap[y, x] < 0:
+                break
+
+        # Deposit remaining sediment along path
+        if sediment > 0 and length > 0:
+            deposit_per_cell = sediment / length
+            for i in range(length):
+                heightmap[path_y[i], path_x[i]] += deposit_per_cell
+
+
+def line_points(y0, x0, y1, x1, out_y, out_x):
+    """Bresenham line between (y0, x0) and (y1, x1).
+
+    Matches ``TerrainGenerator.generate_line_points`` point for point.
+
+    Args:
+        y0, x0: Starting coordinates
+        y1, x1: Ending coordinates
+        out_y, out_x: Output buffers, large enough for the line
+
+    Returns:
+        Number of points written
+    """
+    steep = abs(y1 - y0) > abs(x1 - x0)
+    if steep:
+        x0, y0 = y0, x0
+        x1, y1 = y1, x1
+
+    if x0 > x1:
+        x0, x1 = x1, x0
+        y0, y1 = y1, y0
+
+    dx = x1 - x0
+    dy = abs(y1 - y0)
+    error = dx // 2
+    y = y0
+    ystep = 1 if y0 < y1 else -1
+
+    count = 0
+    for x in range(x0, x1 + 1):
+        if steep:
+            out_y[count] = x
+            out_x[count] = y
+        else:
+            out_y[count] = y
+            out_x[count] = x
+        count += 1
+
+        error -= dy
+        if error < 0:
+            y += ystep
+            error += dx
+
+    return count
+
+
+def carve_segment(path_y, path_x, count, heightmap):
+    """Carve a straight river segment so it slopes downward.
+
+    Matches ``TerrainGenerator.carve_river_segment``.
+
+    Args:
+        path_y, path_x: Segment coordinates (already wrapped/clamped)
+        count: Number of points in the segment
+        heightmap: Heightmap to modify in place
+    """
+    if count < 2:
+        return
+
+    start_y = path_y[0]
+    start_x = path_x[0]
+    end_y = path_y[count - 1]
+    end_x = path_x[count - 1]
+
+    for i in range(1, count):
+        position = i / (count - 1)
+
+        start_height = heightmap[start_y, start_x]
+        end_height = heightmap[end_y, end_x]
+        if end_height >= start_height:
+            end_height = start_height - 0.05
+
+        heightmap[path_y[i], path_x[i]] = (start_height * (1 - position)
+                                           + end_height * position)
+
+
+def river_walk(river_heightmap, heightmap, river_mask, flow_accumulation,
+               visited, stamp, start_y, start_x, meander_factor, randoms,
+               path_y, path_x):
+    """Follow a meandering steepest-descent path from a river source.
+
+    Each step scores the unvisited 8-neighbours (downhill preference, flow
+    accumulation, meander noise, diagonal penalty) and moves to the best or,
+    occasionally, the second-best one. When the river is trapped it may punch
+    through to any lower cell within a few cells, carving the segment.
+
+    Args:
+        river_heightmap: 0-1 heightmap used for pathing, carved in place
+        heightmap: Terrain heightmap (negative values are ocean)
+        river_mask: uint8 mask of already drawn rivers
+        flow_accumulation: Flow accumulation map
+        visited: int64 stamp array marking cells visited by this river
+        stamp: Value marking cells of this river in ``visited``
+        start_y, start_x: River source
+        meander_factor: Amount of randomness in the path (0.0-1.0)
+        randoms: (max_steps, 9) uniform draws; column k < 8 scores the k-th
+            neighbour, column 8 decides whether to take the second-best
+        path_y, path_x: Output buffers of at least ``max_steps + 64`` cells
+
+    Returns:
+        Tuple of (points written, downhill steps taken, reached water flag)
+    """
+    size = river_heightmap.shape[0]
+    line_y = np.empty(PUNCH_THROUGH_RADIUS + 2, dtype=np.int64)
+    line_x = np.empty(PUNCH_THROUGH_RADIUS + 2, dtype=np.int64)
+
+    y = start_y
+    x = start_x
+    path_y[0] = y
+    path_x[0] = x
+    count = 1
+    visited[y, x] = stamp
+
+    path_length = 0
+    punch_through_attempts = PUNCH_THROUGH_ATTEMPTS
+    has_reached_water = 0
+
+    for step in range(randoms.shape[0]):
+        current_height = river_heightmap[y, x]
+
+        # Track the best and second-best options (stable on ties)
+        best_y = -1
+        best_x = -1
+        best_score = 0.0
+        second_y = -1
+        second_x = -1
+        second_score = 0.0
+
+        k = -1
+        for dy in range(-1, 2):
+            for dx in range(-1, 2):
+                if dy == 0 and dx == 0:
+                    continue
+                k += 1
+
+                nx = (x + dx) % size
+                ny = max(0, min(size - 1, y + dy))
+
+                # Skip if already visited (prevents loops)
+                if visited[ny, nx] == stamp:
+                    continue
+
+                score = 0.0
+                neighbor_height = river_heightmap[ny, nx]
+                if neighbor_height < current_height:
+                    # Prefer downhill flow, capped to allow steep drops
+                    height_diff = current_height - neighbor_height
+                    score += 10 + (min(height_diff, 0.2) * 30)
+                else:
+                    height_diff = neighbor_height - current_height
+                    if height_diff < 0.08:
+                        score -= 5 + (height_diff * 80)
+                    else:
+                        continue  # Skip significant uphills
+
+                # Prefer natural drainage, add meandering randomness
+                score += flow_accumulation[ny, nx] * 0.1
+                score += randoms[step, k] * meander_factor * 5
+
+                # Rivers tend to follow cardinal directions
+                if dx != 0 and dy != 0:
+                    score -= 0.5
+
+                if score > 0:
+                    if best_y < 0 or score > best_score:
+                        second_y, second_x, second_score = (best_y, best_x,
+                                                            best_score)
+                        best_y, best_x, best_score = ny, nx, score
+                    elif second_y < 0 or score > second_score:
+                        second_y, second_x, second_score = ny, nx, score
+
+        if best_y < 0:
+            # Try to punch through difficult terrain
+            found_exit = False
+            if punch_through_attempts > 0:
+                punch_through_attempts -= 1
+
+                for r in range(1, PUNCH_THROUGH_RADIUS + 1):
+                    for dy in range(-r, r + 1):
+                        for dx in range(-r, r + 1):
+                            if dy == 0 and dx == 0:
+                                continue
+                            if abs(dy) != r and abs(dx) != r:
+                                continue  # Only check perimeter
+
+                            ny = max(0, min(size - 1, y + dy))
+                            nx = (x + dx) % size
+                            if visited[ny, nx] == stamp:
+                                continue
+
+                            # Accept ANY lower terrain
+                            if river_heightmap[ny, nx] < current_height:
+                                # Trace the unwrapped line, then wrap it
+                                points = line_points(y, x, ny, x + dx,
+                                                     line_y, line_x)
+                                for i in range(points):
+                                    line_x[i] = line_x[i] % size
+                                    line_y[i] = max(0, min(size - 1,
+                                                           line_y[i]))
+                                    visited[line_y[i], line_x[i]] = stamp
+                                    path_y[count] = line_y[i]
+                                    path_x[count] = line_x[i]
+                                    count += 1
+
+                                # Carve a channel so later rivers can follow
+                                carve_segment(line_y, line_x, points,
+                                              river_heightmap)
+
+                                y = ny
+                                x = nx
+                                found_exit = True
+                                break
+                        if found_exit:
+                            break
+                    if found_exit:
+                        break
+
+            if found_exit:
+                continue
+
+            # Punch-through failed or no attempts left, end the river
+            break
+
+        # Usually take best path but occasionally second-best for variety
+        if second_y >= 0 and randoms[step, 8] < meander_factor * 0.5:
+            y = second_y
+            x = second_x
+        else:
+            y = best_y
+            x = best_x
+
+        visited[y, x] = stamp
+        path_y[count] = y
+        path_x[count] = x
+        count += 1
+        path_length += 1
+
+        # Check if we've reached water (existing river, lake, or ocean)
+        if (river_mask[y, x] > 0 or river_heightmap[y, x] <= 0.05
+                or heightmap[y, x] < 0):
+            has_reached_water = 1
+            break
+
+        # Stop at the polar edges of the map (x wraps)
+        if y <= 1 or y >= size - 2:
+            break
+
+    return count, path_length, has_reached_water
+
+
+def distance_columns(features, carry, out, backward):
+    """One sweep of the column pass of the exact Euclidean distance transform.
+
+    The column pass counts the rows to the nearest feature above (forward
+    sweep, north to south) and below (backward sweep, south to north) in
+    each column and keeps the smaller. The sweeps run over bands of rows in
+    order; ``carry`` holds the running distances from one band to the next.
+
+    Args:
+        features: 2D uint8 band of rows, nonzero where a feature (target)
+            cell is
+        carry: float64 distance of every column at the end of the previous
+            band (inf before the first band), updated in place
+        out: float64 band receiving the distance along each column to the
+            nearest feature (inf when the column has none); the backward
+            sweep keeps the smaller of the forward distance already in
+            ``out`` and its own
+        backward: Sweep from the last row up instead of from the first down
+    """
+    rows, cols = features.shape
+    for i in range(rows):
+        y = rows - 1 - i if backward else i
+        for x in range(cols):
+            if features[y, x]:
+                carry[x] = 0.0
+            else:
+                carry[x] += 1.0
+            if not backward or carry[x] < out[y, x]:
+                out[y, x] = carry[x]
+
+
+def distance_rows(column_distance, out):
+    """Row pass of the exact Euclidean distance transform.
+
+    Computes the lower envelope of the parabolas ``(x - q)**2 + g(q)**2``
+    along each row (Felzenszwalb and Huttenlocher).
+
+    Args:
+        column_distance: 2D float64 output of the ``distance_columns``
+            sweeps
+        out: float64 array receiving the Euclidean distances
+    """
+    rows, cols = column_distance.shape
+    f = np.empty(cols, dtype=np.float64)
+    v = np.empty(cols, dtype=np.int64)
+    z = np.empty(cols + 1, dtype=np.float64)
+
+    for y in range(rows):
+        for q in range(cols):
+            f[q] = column_distance[y, q] * column_distance[y, q]
+
+        # Build the lower envelope, skipping columns without features
+        k = -1
+        for q in range(cols):
+            if f[q] == np.inf:
+                continue
+            if k < 0:
+                k = 0
+                v[0] = q
+                z[0] = -np.inf
+                z[1] = np.inf
+                continue
+            s = (((f[q] + q * q) - (f[v[k]] + v[k] * v[k]))
+                 / (2 * q - 2 * v[k]))
+            while s <= z[k]:
+                k -= 1
+                s = (((f[q] + q * q) - (f[v[k]] + v[k] * v[k]))
+                     / (2 * q - 2 * v[k]))
+            k += 1
+            v[k] = q
+            z[k] = s
+            z[k + 1] = np.inf
+
+        if k < 0:
+            for p in range(cols):
+                out[y, p] = np.inf
+            continue
+
+        k = 0
+        for p in range(cols):
+            while z[k + 1] < p:
+                k += 1
+            out[y, p] = math.sqrt((p - v[k]) * (p - v[k]) + f[v[k]])
+
+
+def accumulate_flow(receivers, fractions, weights, out):
+    """Accumulate flow downstream in topological order (Kahn's algorithm).
+
+    Every cell passes its accumulated value to its receivers, split by the
+    given fractions. Receivers must be strictly lower than the cell, so the
+    flow graph is acyclic and each cell is processed exactly once.
+
+    Args:
+        receivers: (k, n) flat indices of up to k receivers per cell; a cell
+            that is its own receiver (or has a zero fraction) passes nothing
+        fractions: (k, n) share of the flow sent to each receiver
+        weights: Per-cell contribution (e.g. ones for contributing area)
+        out: float64 array receiving the accumulated flow
+    """
+    k, n = receivers.shape
+    indegree = np.zeros(n, dtype=np.int64)
+    for j in range(k):
+        for i in range(n):
+            if receivers[j, i] != i and fractions[j, i] > 0:
+                indegree[receivers[j, i]] += 1
+
+    # Start from the cells nothing flows into (ridges and peaks)
+    stack = np.empty(n, dtype=np.int64)
+    top = 0
+    for i in range(n):
+        out[i] = weights[i]
+        if indegree[i] == 0:
+            stack[top] = i
+            top += 1
+
+    while top > 0:
+        top -= 1
+        i = stack[top]
+        for j in range(k):
+            r = receivers[j, i]
+            if r == i or fractions[j, i] <= 0:
+                continue
+            out[r] += out[i] * fractions[j, i]
+            indegree[r] -= 1
+            if indegree[r] == 0:
+                stack[top] = r
+                top += 1
+
+
+def stream_power_step(elevation, receivers, area, fixed, k_dt, m, n):
+    """Implicit stream-power incision for one time step, in place.
+
+    Solves ``h - h0 + k_dt * A**m * (h - h_r)**n = 0`` for every cell after
+    its receiver ``r`` has been updated (Braun and Willett, 2013), so the
+    step is stable for any time step. Cells are ordered by a topological
+    sort of the receiver tree, giving O(N) work per step.
+
+    Args:
+        elevation: Flat float64 elevations, updated in place
+        receivers: Flat index of each cell's D8 receiver (itself for sinks)
+        area: Upstream drainage area of each cell
+        fixed: Nonzero for base-level cells that are never eroded
+        k_dt: Erodibility times the time step
+        m: Drainage area exponent
+        n: Slope exponent
+    """
+    cells = elevation.size
+    donors = np.zeros(cells, dtype=np.int64)
+    for i in range(cells):
+        if receivers[i] != i:
+            donors[receivers[i]] += 1
+
+    # Topological order from the ridges down to the base level
+    order = np.empty(cells, dtype=np.int64)
+    count = 0
+    for i in range(cells):
+        if donors[i] == 0:
+            order[count] = i
+            count += 1
+    head = 0
+    while head < count:
+        i = order[head]
+        head += 1
+        r = receivers[i]
+        if r == i:
+            continue
+        donors[r] -= 1
+        if donors[r] == 0:
+            order[count] = r
+            count += 1
+
+    # Solve from the base level upstream, receivers before donors
+    for k in range(count - 1, -1, -1):
+        i = order[k]
+        r = receivers[i]
+        if r == i or fixed[i]:
+            continue
+        h0 = elevation[i]
+        base = elevation[r]
+        if h0 <= base:
+            continue
+        factor = k_dt * area[i] ** m
+        if n == 1.0:
+            elevation[i] = (h0 + factor * base) / (1.0 + factor)
+            continue
+
+        # Newton iterations for a nonlinear slope exponent
+        h = h0
+        for _ in range(STREAM_POWER_NEWTON_STEPS):
+            drop = max(h - base, 1e-12)
+            residual = h - h0 + factor * drop ** n
+            h -= residual / (1.0 + n * factor * drop ** (n - 1.0))
+            if abs(residual) < 1e-12:
+                break
+        elevation[i] = max(h, base)
+
+
+def heap_push(keys, cells, size, key, cell):
+    """Push a cell onto a binary min-heap stored in two arrays.
+
+    Args:
+        keys: Heap priorities
+        cells: Heap payloads
+        size: Current heap size
+        key: Priority of the new entry
+        cell: Payload of the new entry
+
+    Returns:
+        New heap size
+    """
+    i = size
+    keys[i] = key
+    cells[i] = cell
+    while i > 0:
+        parent = (i - 1) // 2
+        if keys[parent] <= keys[i]:
+            break
+        keys[parent], keys[i] = keys[i], keys[parent]
+        cells[parent], cells[i] = cells[i], cells[parent]
+        i = parent
+    return size + 1
+
+
+def heap_pop(keys, cells, size):
+    """Pop the lowest-priority cell from a binary min-heap.
+
+    Args:
+        keys: Heap priorities
+        cells: Heap payloads
+        size: Current heap size (must be positive)
+
+    Returns:
+        Tuple of (popped cell, new heap size)
+    """
+    cell = cells[0]
+    size -= 1
+    keys[0] = keys[size]
+    cells[0] = cells[size]
+    i = 0
+    while True:
+        left = 2 * i + 1
+        if left >= size:
+            break
+        child = left
+        if left + 1 < size and keys[left + 1] < keys[left]:
+            child = left + 1
+        if keys[i] <= keys[child]:
+            break
+        keys[child], keys[i] = keys[i], keys[child]
+        cells[child], cells[i] = cells[i], cells[child]
+        i = child
+    return cell, size
+
+
+def priority_flood(heightmap, outlets, labels, filled, parents):
+    """Find every closed basin with a priority-flood depression fill.
+
+    Flooding starts from the outlet cells and always expands the lowest
+    cell on the flooded region's boundary. Whenever it steps down into a
+    cell below the current water level, that cell starts a closed basin
+    (depression) whose spill elevation is the current level and whose outlet
+    is the cell it was entered from; the basin is flooded to that level
+    with a plain queue. Runs in O(N log N).
+
+    Args:
+        heightmap: 2D float64 heightmap
+        outlets: uint8 mask of cells that drain freely (e.g. ocean); the
+            lowest cell is used when the mask is empty
+        labels: int64 output, basin id (1-based) of each cell or 0
+        filled: float64 output, water surface (depression-filled) elevation
+        parents: int64 output, flat index of the cell each cell was flooded
+            from (itself for outlets); following it never leads uphill on
+            the filled surface and always ends at an outlet
+
+    Returns:
+        Tuple of per-basin arrays (outlet cell, spill elevation, area in
+        cells, volume below the spill elevation, lowest cell), basin ``b``
+        being stored at index ``b - 1``
+    """
+    rows, cols = heightmap.shape
+    n = rows * cols
+    keys = np.empty(n, dtype=np.float64)
+    cells = np.empty(n, dtype=np.int64)
+    queue = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=np.uint8)
+    size = 0
+
+    capacity = 256
+    basin_outlet = np.empty(capacity, dtype=np.int64)
+    basin_spill = np.empty(capacity, dtype=np.float64)
+    basin_area = np.empty(capacity, dtype=np.int64)
+    basin_volume = np.empty(capacity, dtype=np.float64)
+    basin_pit = np.empty(capacity, dtype=np.int64)
+    count = 0
+
+    lowest = 0
+    for i in range(n):
+        y = i // cols
+        x = i % cols
+        labels[y, x] = 0
+        filled[y, x] = heightmap[y, x]
+        if heightmap[y, x] < heightmap[lowest // cols, lowest % cols]:
+            lowest = i
+        parents[i] = i
+        if outlets[y, x]:
+            visited[i] = 1
+            size = heap_push(keys, cells, size, heightmap[y, x], i)
+
+    if size == 0:
+        visited[lowest] = 1
+        size = heap_push(keys, cells, size,
+                         heightmap[lowest // cols, lowest % cols], lowest)
+
+    while size > 0:
+        c, size = heap_pop(keys, cells, size)
+        cy = c // cols
+        cx = c % cols
+        level = filled[cy, cx]
+
+        for dy in range(-1, 2):
+            for dx in range(-1, 2):
+                if dy == 0 and dx == 0:
+                    continue
+                ny = max(0, min(rows - 1, cy + dy))
+                nx = (cx + dx) % cols
+                j = ny * cols + nx
+                if visited[j]:
+                    continue
+                visited[j] = 1
+                parents[j] = c
+
+                if heightmap[ny, nx] >= level:
+                    size = heap_push(keys, cells, size, heightmap[ny, nx], j)
+                    continue
+
+                # Stepped down below the water level: a new closed basin
+                if count == capacity:
+                    capacity *= 2
+                    basin_outlet = np.concatenate((basin_outlet,
+                                                   np.empty_like(basin_outlet)))
+                    basin_spill = np.concatenate((basin_spill,
+                                                  np.empty_like(basin_spill)))
+                    basin_area = np.concatenate((basin_area,
+                                                 np.empty_like(basin_area)))
+                    basin_volume = np.concatenate((basin_volume,
+                                                   np.empty_like(basin_volume)))
+                    basin_pit = np.concatenate((basin_pit,
+                                                np.empty_like(basin_pit)))
+                count += 1
+                area = 0
+                volume = 0.0
+                pit = j
+
+                head = 0
+                tail = 1
+                queue[0] = j
+                while head < tail:
+                    p = queue[head]
+                    head += 1
+                    py = p // cols
+                    px = p % cols
+                    labels[py, px] = count
+                    filled[py, px] = level
+                    area += 1
+                    volume += level - heightmap[py, px]
+                    if heightmap[py, px] < heightmap[pit // cols, pit % cols]:
+                        pit = p
+
+                    for qy in range(-1, 2):
+                        for qx in range(-1, 2):
+                            if qy == 0 and qx == 0:
+                                continue
+                            ry = max(0, min(rows - 1, py + qy))
+                            rx = (px + qx) % cols
+                            q = ry * cols + rx
+                            if visited[q]:
+                                continue
+                            visited[q] = 1
+                            parents[q] = p
+                            if heightmap[ry, rx] < level:
+                                queue[tail] = q
+                                tail += 1
+                            else:
+                                size = heap_push(keys, cells, size,
+                                                 heightmap[ry, rx], q)
+
+                basin_outlet[count - 1] = c
+                basin_spill[count - 1] = level
+                basin_area[count - 1] = area
+                basin_volume[count - 1] = volume
+                basin_pit[count - 1] = pit
+
+    return (basin_outlet[:count].copy(), basin_spill[:count].copy(),
+            basin_area[:count].copy(), basin_volume[:count].copy(),
+            basin_pit[:count].copy())
+
+
+def fill_basin(heightmap, labels, basin, pit, max_cells, members, stamp,
+               out_cells):
+    """Flood a basin upwards from its lowest cell.
+
+    Water always spreads to the lowest cell on the lake shore, so the lake
+    grows exactly as a rising water level would fill the basin.
+
+    Args:
+        heightmap: 2D float64 heightmap
+        labels: Basin labels from ``priority_flood``
+        basin: Basin id to fill
+        pit: Flat index of the basin's lowest cell
+        max_cells: Stop once the lake covers this many cells
+        members: int64 stamp array marking cells already reached
+        stamp: Value marking cells of this lake in ``members``
+        out_cells: Output buffer of flat cell indices (``max_cells`` long)
+
+    Returns:
+        Tuple of (number of lake cells, water level)
+    """
+    rows, cols = heightmap.shape
+    keys = np.empty(9 * max_cells + 1, dtype=np.float64)
+    cells = np.empty(9 * max_cells + 1, dtype=np.int64)
+    size = heap_push(keys, cells, 0, heightmap[pit // cols, pit % cols], pit)
+    members[pit // cols, pit % cols] = stamp
+
+    count = 0
+    level = -np.inf
+    while size > 0 and count < max_cells:
+        c, size = heap_pop(keys, cells, size)
+        cy = c // cols
+        cx = c % cols
+        out_cells[count] = c
+        count += 1
+        if heightmap[cy, cx] > level:
+            level = heightmap[cy, cx]
+
+        for dy in range(-1, 2):
+            for dx in range(-1, 2):
+                if dy == 0 and dx == 0:
+                    continue
+                ny = max(0, min(rows - 1, cy + dy))
+                nx = (cx + dx) % cols
+                if members[ny, nx] == stamp or labels[ny, nx] != basin:
+                    continue
+                members[ny, nx] = stamp
+                size = heap_push(keys, cells, size, heightmap[ny, nx],
+                                 ny * cols + nx)
+
+    return count, level
+
+
+_SIGNATURES = {
+    "droplet_erosion": [
+        "void(float64[:, ::1], int64[:, :, ::1], int64[:, ::1], float64)",
+    ],
+    "line_points": [
+        "int64(int64, int64, int64, int64, int64[::1], int64[::1])",
+    ],
+    "carve_segment": [
+        "void(int64[::1], int64[::1], int64, float64[:, ::1])",
+    ],
+    "river_walk": [
+        "UniTuple(int64, 3)(float64[:, ::1], float64[:, ::1], "
+        "uint8[:, ::1], float64[:, ::1], int64[:, ::1], int64, int64, "
+        "int64, float64, float64[:, ::1], int64[::1], int64[::1])",
+    ],
+    "distance_columns": [
+        "void(uint8[:, ::1], float64[::1], float64[:, ::1], boolean)",
+    ],
+    "distance_rows": [
+        "void(float64[:, ::1], float64[:, ::1])",
+    ],
+    "accumulate_flow": [
+        "void(int64[:, ::1], float64[:, ::1], float64[::1], float64[::1])",
+    ],
+    "stream_power_step": [
+        "void(float64[::1], int64[::1], float64[::1], uint8[::1], float64, "
+        "float64, float64)",
+    ],
+    "heap_push": [
+        "int64(float64[::1], int64[::1], int64, float64, int64)",
+    ],
+    "heap_pop": [
+        "UniTuple(int64, 2)(float64[::1], int64[::1], int64)",
+    ],
+    "priority_flood": [
+        "Tuple((int64[::1], float64[::1], int64[::1], float64[::1], "
+        "int64[::1]))(float64[:, ::1], uint8[:, ::1], int64[:, ::1], "
+        "float64[:, ::1], int64[::1])",
+    ],
+    "fill_basin": [
+        "Tuple((int64, float64))(float64[:, ::1], int64[:, ::1], int64, "
+        "int64, int64, int64[:, ::1], int64, int64[::1])",
+    ],
+}
+
+
+class KernelBackend:
+    """A named set of terrain kernels sharing one execution backend."""
+
+    def __init__(self, name: str, kernels: dict):
+        """Initialize the backend.
+
+        Args:
+            name: Backend name ("numba" or "python")
+            kernels: Mapping of kernel name to callable
+        """
+        self.name = name
+        for kernel_name, kernel in kernels.items():
+            setattr(self, kernel_name, kernel)
+
+    def __repr__(self) -> str:
+        return f"KernelBackend({self.name!r})"
+
+
+_PYTHON_KERNELS = {
+    "droplet_erosion": droplet_erosion,
+    "line_points": line_points,
+    "carve_segment": carve_segment,
+    "river_walk": river_walk,
+    "distance_columns": distance_columns,
+    "distance_rows": distance_rows,
+    "accumulate_flow": accumulate_flow,
+    "stream_power_step": stream_power_step,
+    "heap_push": heap_push,
+    "heap_pop": heap_pop,
+    "priority_flood": priority_flood,
+    "fill_basin": fill_basin,
+}
+
+
+def _compile_kernels() -> dict:
+    """Compile every kernel eagerly, reusing numba's on-disk cache.
+
+    The kernels are compiled from copies of the Python functions whose
+    globals point at the compiled helpers, so that compiled kernels call
+    compiled helpers while the python backend stays pure Python.
+    """
+    namespace = dict(globals())
+    compiled = {}
+    # Helpers first so the kernels calling them resolve the compiled version
+    for kernel_name in ("line_points", "carve_segment", "droplet_erosion",
+                        "river_walk",
+                        "distance_columns", "distance_rows",
+                        "accumulate_flow", "stream_power_step",
+                        "heap_push", "heap_pop",
+                        "priority_flood", "fill_basin"):
+        func = _PYTHON_KERNELS[kernel_name]
+        clone = types.FunctionType(func.__code__, namespace, func.__name__,
+                                   func.__defaults__, func.__closure__)
+        clone.__qualname__ = func.__qualname__
+        clone.__module__ = func.__module__
+        clone.__doc__ = func.__doc__
+        kernel = njit(_SIGNATURES[kernel_name], cache=True)(clone)
+        namespace[kernel_name] = kernel
+        compiled[kernel_name] = kernel
+    return compiled
+
+
+if NUMBA_AVAILABLE:
+    _NUMBA_KERNELS = _compile_kernels()
+else:
+    _NUMBA_KERNELS = None
+
+
+def get_kernels(backend: str) -> KernelBackend:
+    """Return the kernel set for a backend.
+
+    Args:
+        backend: "numba" or "python"
+
+    Returns:
+        KernelBackend with the kernel functions as attributes
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{backend}', "
+                         f"expected one of {BACKENDS}")
+
+    if backend == "numba":
+        if _NUMBA_KERNELS is None:
+            print("Warning: numba is not installed, "
+                  "using the python kernel backend")
+            return KernelBackend("python", _PYTHON_KERNELS)
+        return KernelBackend("numba", _NUMBA_KERNELS)
+
+    return KernelBackend("python", _PYTHON_KERNELS)
+
+
+def default_backend() -> str:
+    """Return the fastest available backend name."""
+    return "numba" if NUMBA_AVAILABLE else "python"
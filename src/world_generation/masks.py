@@ -0,0 +1,177 @@
+"""Compact world masks for EmergenWorld.
+
+Water, river, lake and day-night masks only hold "set" or "not set", so they
+are kept as ``bool`` arrays (one byte per cell) instead of floating-point
+fields. ``pack_mask`` reduces a mask to one bit per cell for storage and
+transfer.
+
+``WaterBodies`` replaces the separate ocean, river and lake masks with one
+label raster: a ``uint8`` type code per cell, whose bits mark the water types
+present (a river cell inside a lake has both bits), and a water-body id per
+cell. Bodies are the connected areas of one type, labelled ocean first, then
+lakes, then rivers on the cells that are not yet part of a body; x wraps, so
+a body crossing the date line keeps one id.
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+# Type code bits of the water types
+OCEAN = 1
+RIVER = 2
+LAKE = 4
+
+# Water type names (as used for the water system masks) and their bits
+WATER_TYPES: Dict[str, int] = {"ocean": OCEAN, "rivers": RIVER, "lakes": LAKE}
+
+# Water types in the order their bodies are labelled
+LABEL_ORDER = (OCEAN, LAKE, RIVER)
+
+
+class PackedMask(NamedTuple):
+    """Mask stored as one bit per cell."""
+    shape: Tuple[int, ...]
+    bits: np.ndarray
+
+    def unpack(self) -> np.ndarray:
+        """Restore the boolean mask."""
+        count = int(np.prod(self.shape))
+        return np.unpackbits(self.bits, count=count).view(bool).reshape(
+            self.shape)
+
+
+def pack_mask(mask: np.ndarray) -> PackedMask:
+    """Pack a mask into one bit per cell.
+
+    Args:
+        mask: Mask of any shape; nonzero cells are set
+
+    Returns:
+        Packed mask
+    """
+    mask = np.asarray(mask)
+    return PackedMask(mask.shape, np.packbits(mask.ravel() != 0))
+
+
+def label_wrapped(mask: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Label the connected areas of a mask whose x axis wraps.
+
+    Args:
+        mask: 2D boolean mask
+
+    Returns:
+        Tuple of (int32 labels, 0 outside the mask, number of areas)
+    """
+    labels, count = ndimage.label(mask)
+
+    # Join areas that touch across the date line
+    left, right = labels[:, 0], labels[:, -1]
+    joined = (left > 0) & (right > 0)
+    if np.any(joined):
+        graph = coo_matrix((np.ones(np.count_nonzero(joined)),
+                            (left[joined] - 1, right[joined] - 1)),
+                           shape=(count, count))
+        count, merged = connected_components(graph, directed=False)
+        labels[mask] = merged[labels[mask] - 1] + 1
+
+    return labels.astype(np.int32, copy=False), count
+
+
+class WaterBodies(Mapping):
+    """Label raster of a world's oceans, rivers and lakes.
+
+    Indexing by water type name (``bodies["rivers"]``) returns the boolean
+    mask of that type, so the raster can stand in for a dictionary of
+    separate masks.
+    """
+
+    def __init__(self, kinds: np.ndarray, labels: np.ndarray,
+                 body_kinds: np.ndarray):
+        """Initialize the label raster.
+
+        Args:
+            kinds: 2D uint8 type code of every cell (bits of ``WATER_TYPES``)
+            labels: 2D water-body id of every cell, 0 for land
+            body_kinds: Water type bit of every body id (index 0 is land)
+        """
+        self.kinds = kinds
+        self.labels = labels
+        self.body_kinds = body_kinds
+
+    @classmethod
+    def from_masks(cls, ocean: Optional[np.ndarray] = None,
+                   rivers: Optional[np.ndarray] = None,
+                   lakes: Optional[np.ndarray] = None) -> "WaterBodies":
+        """Build the label raster from separate water masks.
+
+        Args:
+            ocean: Ocean mask (nonzero cells are ocean)
+            rivers: River mask
+            lakes: Lake mask
+
+        Returns:
+            Label raster of the masks
+        """
+        masks = {OCEAN: ocean, RIVER: rivers, LAKE: lakes}
+        shape = next(np.shape(mask) for mask in masks.values()
+                     if mask is not None)
+
+        kinds = np.zeros(shape, dtype=np.uint8)
+        for code, mask in masks.items():
+            if mask is not None:
+                kinds[np.asarray(mask) != 0] |= code
+
+        # One id per connected area of a type; ocean takes precedence over
+        # lakes and lakes over rivers where types overlap
+        labels = np.zeros(shape, dtype=np.int32)
+        body_kinds = [0]
+        for code in LABEL_ORDER:
+            cells = ((kinds & code) != 0) & (labels == 0)
+            found, count = label_wrapped(cells)
+            labels[cells] = found[cells] + (len(body_kinds) - 1)
+            body_kinds.extend([code] * count)
+
+        # int16 ids unless the world has more bodies than int16 can number
+        if len(body_kinds) <= np.iinfo(np.int16).max:
+            labels = labels.astype(np.int16)
+
+        return cls(kinds, labels, np.array(body_kinds, dtype=np.uint8))
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in WATER_TYPES:
+            raise KeyError(name)
+        return (self.kinds & WATER_TYPES[name]) != 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(WATER_TYPES)
+
+    def __len__(self) -> int:
+        return len(WATER_TYPES)
+
+    @property
+    def water(self) -> np.ndarray:
+        """Mask of every water cell."""
+        return self.kinds != 0
+
+    @property
+    def count(self) -> int:
+        """Number of water bodies."""
+        return self.body_kinds.size - 1
+
+    def body(self, body_id: int) -> np.ndarray:
+        """Return the mask of one water body."""
+        return self.labels == body_id
+
+    def bodies_of(self, name: str) -> np.ndarray:
+        """Return the ids of the bodies of one water type."""
+        return np.flatnonzero(self.body_kinds == WATER_TYPES[name])
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the raster in bytes."""
+        return self.kinds.nbytes + self.labels.nbytes + self.body_kinds.nbytes
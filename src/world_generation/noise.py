@@ -0,0 +1,304 @@
+"""Batched fractal noise module for EmergenWorld.
+
+This module evaluates OpenSimplex noise over whole coordinate arrays instead
+of one point at a time. Every noise field in the terrain and climate systems
+is built from the same few patterns (plain fractal sums, ridged sums and the
+cylindrical longitude/latitude mapping used for east-west wrapping), so they
+are implemented here once as fused multi-octave kernels.
+
+The kernels reuse the permutation tables and the per-point routines of the
+``opensimplex`` package, so a ``FractalNoise(seed)`` produces exactly the same
+values as the equivalent loop over ``OpenSimplex(seed).noise2``/``noise3``.
+"""
+
+from typing import Tuple, Union
+
+from numpy.typing import DTypeLike
+
+import numpy as np
+from opensimplex import OpenSimplex
+from opensimplex.internals import _noise2, _noise3
+
+from .kernels import NUMBA_AVAILABLE, njit
+
+if NUMBA_AVAILABLE:
+    from numba import prange
+else:  # The kernels run as plain Python loops
+    prange = range  # pylint: disable=invalid-name
+
+
+ArrayLike = Union[float, np.ndarray]
+
+
+@njit(cache=True, parallel=True)
+def _fractal2_kernel(x, y, perm, frequencies, amplitudes, ridged, out):
+    """Sum 2D noise octaves for every point of the flattened inputs."""
+    for i in prange(x.size):
+        value = 0.0
+        for k in range(frequencies.size):
+            n = _noise2(x[i] * frequencies[k], y[i] * frequencies[k], perm)
+            if ridged:
+                # Ridged noise: fold around zero and sharpen the crests
+                n = 1.0 - abs(n)
+                n *= n
+            value += n * amplitudes[k]
+        out[i] = value
+
+
+@njit(cache=True, parallel=True)
+def _fractal3_kernel(x, y, z, perm, perm_grad_index3, frequencies,
+                     amplitudes, divide, out):
+    """Sum 3D noise octaves for every point of the flattened inputs."""
+    for i in prange(x.size):
+        value = 0.0
+        for k in range(frequencies.size):
+            if divide:
+                n = _noise3(x[i] / frequencies[k], y[i] / frequencies[k],
+                            z[i] / frequencies[k], perm, perm_grad_index3)
+            else:
+                n = _noise3(x[i] * frequencies[k], y[i] * frequencies[k],
+                            z[i] * frequencies[k], perm, perm_grad_index3)
+            value += n * amplitudes[k]
+        out[i] = value
+
+
+def octave_weights(octaves: int, persistence: float,
+                   lacunarity: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Build the per-octave frequency and amplitude tables.
+
+    The values are accumulated by repeated multiplication, exactly like the
+    ``amplitude *= persistence`` / ``frequency *= lacunarity`` loops they
+    replace, so the results are bit-identical.
+
+    Args:
+        octaves: Number of noise octaves
+        persistence: Amplitude multiplier between octaves
+        lacunarity: Frequency multiplier between octaves
+
+    Returns:
+        Tuple of (frequencies, amplitudes) arrays
+    """
+    frequencies = np.empty(octaves)
+    amplitudes = np.empty(octaves)
+    amplitude = 1.0
+    frequency = 1.0
+    for k in range(octaves):
+        frequencies[k] = frequency
+        amplitudes[k] = amplitude
+        amplitude *= persistence
+        frequency *= lacunarity
+    return frequencies, amplitudes
+
+
+class FractalNoise:
+    """Array-in/array-out multi-octave OpenSimplex noise.
+
+    Seeded exactly like ``OpenSimplex(seed=seed)``. Coordinate arguments may
+    be scalars or arrays of any broadcast-compatible shapes; the result has
+    the broadcast shape (or is a float when every input is a scalar).
+    """
+
+    def __init__(self, seed: int):
+        """Initialize the noise engine.
+
+        Args:
+            seed: Seed passed to the underlying OpenSimplex permutation
+        """
+        self.seed = seed
+        generator = OpenSimplex(seed=seed)
+        # pylint: disable=protected-access
+        self._perm = generator._perm
+        self._perm_grad_index3 = generator._perm_grad_index3
+
+    @staticmethod
+    def _flatten(*coords) -> Tuple[Tuple[int, ...], list]:
+        """Broadcast coordinates together and flatten them to float64."""
+        arrays = np.broadcast_arrays(*[np.asarray(c, dtype=np.float64)
+                                       for c in coords])
+        shape = arrays[0].shape
+        return shape, [np.ascontiguousarray(a).ravel() for a in arrays]
+
+    @staticmethod
+    def _finish(values: np.ndarray, shape: Tuple[int, ...]) -> ArrayLike:
+        """Restore the broadcast shape, unwrapping scalar results."""
+        if not shape:
+            return float(values[0])
+        return values.reshape(shape)
+
+    def noise2(self, x: ArrayLike, y: ArrayLike,
+               dtype: DTypeLike = np.float64) -> ArrayLike:
+        """Evaluate single-octave 2D noise at every (x, y) point.
+
+        Args:
+            x: X coordinates
+            y: Y coordinates
+            dtype: Floating-point type of the result
+
+        Returns:
+            Noise values in range [-1, 1]
+        """
+        return self.fractal2(x, y, octaves=1, dtype=dtype)
+
+    def noise3(self, x: ArrayLike, y: ArrayLike, z: ArrayLike) -> ArrayLike:
+        """Evaluate single-octave 3D noise at every (x, y, z) point.
+
+        Args:
+            x: X coordinates
+            y: Y coordinates
+            z: Z coordinates
+
+        Returns:
+            Noise values in range [-1, 1]
+        """
+        return self.fractal3(x, y, z, octaves=1)
+
+    def fractal2(self, x: ArrayLike, y: ArrayLike, octaves: int = 1,
+                 persistence: float = 0.5, lacunarity: float = 2.0,
+                 ridged: bool = False, normalize: bool = False,
+                 first_octave: int = 0,
+                 dtype: DTypeLike = np.float64) -> ArrayLike:
+        """Evaluate multi-octave 2D noise.
+
+        Each octave samples ``noise2(x * frequency, y * frequency)`` and adds
+        it with weight ``amplitude``.
+
+        Args:
+            x: X coordinates
+            y: Y coordinates
+            octaves: Number of octaves to sum
+            persistence: Amplitude multiplier between octaves
+            lacunarity: Frequency multiplier between octaves
+            ridged: Use ridged noise ``(1 - |n|)**2`` for each octave
+            normalize: Divide by the sum of amplitudes
+            first_octave: Index of the first octave to sum, so that an
+                octave band can be added to a sum of the lower octaves
+            dtype: Floating-point type of the result (octaves are summed in
+                float64 and rounded once)
+
+        Returns:
+            Summed noise values
+        """
+        shape, (fx, fy) = self._flatten(x, y)
+        frequencies, amplitudes = octave_weights(octaves, persistence,
+                                                 lacunarity)
+        band = slice(first_octave, None)
+        out = np.empty(fx.size, dtype=dtype)
+        _fractal2_kernel(fx, fy, self._perm, frequencies[band],
+                         amplitudes[band], ridged, out)
+        if normalize:
+            out /= _amplitude_total(amplitudes)
+        return self._finish(out, shape)
+
+    def fractal3(self, x: ArrayLike, y: ArrayLike, z: ArrayLike,
+                 octaves: int = 1, persistence: float = 0.5,
+                 lacunarity: float = 2.0, normalize: bool = False,
+                 divide_frequency: bool = False,
+                 first_octave: int = 0,
+                 dtype: DTypeLike = np.float64) -> ArrayLike:
+        """Evaluate multi-octave 3D noise.
+
+        Args:
+            x: X coordinates
+            y: Y coordinates
+            z: Z coordinates
+            octaves: Number of octaves to sum
+            persistence: Amplitude multiplier between octaves
+            lacunarity: Frequency multiplier between octaves
+            normalize: Divide by the sum of amplitudes
+            divide_frequency: Divide the coordinates by the octave frequency
+                instead of multiplying (the heightmap convention)
+            first_octave: Index of the first octave to sum
+            dtype: Floating-point type of the result
+
+        Returns:
+            Summed noise values
+        """
+        shape, (fx, fy, fz) = self._flatten(x, y, z)
+        frequencies, amplitudes = octave_weights(octaves, persistence,
+                                                 lacunarity)
+        band = slice(first_octave, None)
+        out = np.empty(fx.size, dtype=dtype)
+        _fractal3_kernel(fx, fy, fz, self._perm, self._perm_grad_index3,
+                         frequencies[band], amplitudes[band],
+                         divide_frequency, out)
+        if normalize:
+            out /= _amplitude_total(amplitudes)
+        return self._finish(out, shape)
+
+    def cylindrical(self, x: ArrayLike, y: ArrayLike, size: int,
+                    scale: float, octaves: int = 6, persistence: float = 0.5,
+                    lacunarity: float = 2.0,
+                    first_octave: int = 0,
+                    dtype: DTypeLike = np.float64) -> ArrayLike:
+        """Evaluate fractal noise on a cylinder for seamless east-west wrap.
+
+        Grid column ``x`` is mapped to longitude ``x / size * 2π`` and row
+        ``y`` to latitude ``y / size * π - π/2``; the noise is then sampled at
+        ``(cos(lon), lat, sin(lon)) * scale / frequency``.
+
+        Args:
+            x: Grid column indices
+            y: Grid row indices
+            size: Grid size used for the longitude/latitude mapping
+            scale: Scale factor for noise generation
+            octaves: Number of octaves to sum
+            persistence: Amplitude multiplier between octaves
+            lacunarity: Frequency multiplier between octaves
+            first_octave: Index of the first octave to sum (the octaves are
+                ordered from the finest to the coarsest)
+            dtype: Floating-point type of the result
+
+        Returns:
+            Summed noise values
+        """
+        lon, lat = cylindrical_coordinates(x, y, size)
+        return self.fractal3(np.cos(lon) * scale, lat * scale,
+                             np.sin(lon) * scale, octaves=octaves,
+                             persistence=persistence, lacunarity=lacunarity,
+                             divide_frequency=True,
+                             first_octave=first_octave, dtype=dtype)
+
+
+def cylindrical_coordinates(x: ArrayLike, y: ArrayLike,
+                            size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Map grid coordinates to (longitude, latitude) in radians.
+
+    Args:
+        x: Grid column indices
+        y: Grid row indices
+        size: Grid size
+
+    Returns:
+        Tuple of (longitude, latitude) arrays
+    """
+    two_pi = 2 * np.pi
+    lon = (np.asarray(x) / size) * two_pi
+    lat = ((np.asarray(y) / size) * np.pi) - (np.pi / 2)
+    return lon, lat
+
+
+def grid_coordinates(height: int, width: int,
+                     y_offset: int = 0,
+                     x_offset: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Return broadcastable row/column index arrays for a grid block.
+
+    Args:
+        height: Number of rows
+        width: Number of columns
+        y_offset: Index of the first row
+        x_offset: Index of the first column
+
+    Returns:
+        Tuple of (y, x) arrays with shapes (height, 1) and (1, width)
+    """
+    y = np.arange(y_offset, y_offset + height)[:, np.newaxis]
+    x = np.arange(x_offset, x_offset + width)[np.newaxis, :]
+    return y, x
+
+
+def _amplitude_total(amplitudes: np.ndarray) -> float:
+    """Sum amplitudes in octave order (matching the scalar accumulation)."""
+    total = 0.0
+    for amplitude in amplitudes:
+        total += amplitude
+    return total
@@ -5,11 +5,30 @@ and orbital properties to generate realistic day/night cycles, seasons,
 and solar radiation patterns across the world.
 """
 
+import os
+
 import numpy as np
 import matplotlib.pyplot as plt
-from typing import Tuple
-import ephem  # For astronomical calculations
-from datetime import datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from .cache import DEFAULT_CACHE_SIZE, StageCache, stage_key
+from .instrumentation import count as count_event, profiled
+from .precision import DEFAULT_DTYPE, resolve_dtype
+from .solar import (OrbitalEphemeris, SolarClimatology, SolarGeometry,
+                    SunPositions, daily_insolation)
+
+
+# Size of one chunk of time-series frames in bytes, unless a chunk size in
+# frames is given
+SERIES_CHUNK_BYTES = 64 * 1024 ** 2
+
+
+class SolarFrames(NamedTuple):
+    """Day/night and solar radiation frames of a series of time steps."""
+    days: np.ndarray        # Day of year of every frame
+    hours: np.ndarray       # Hour of day of every frame
+    day_night: np.ndarray   # (t, y, x) day/night masks
+    radiation: np.ndarray   # (t, y, x) solar radiation maps
 
 
 class PlanetarySystem:
@@ -30,7 +49,10 @@ class PlanetarySystem:
             perihelion_day: float = 14.0,
             start_day: int = 0,
             seasonal_factor: float = 1.0,
-            earth_scale: float = 0.0083
+            earth_scale: float = 0.0083,
+            dtype=DEFAULT_DTYPE,
+            equinox_day: Optional[float] = None,
+            cache_dir: Optional[str] = None
     ):
         """Initialize the PlanetarySystem with configurable parameters.
 
@@ -45,8 +67,15 @@ class PlanetarySystem:
             seasonal_factor: Multiplier to increase or decrease seasonal effects
             earth_scale: Scale factor for display purposes
                          (doesn't affect physical calculations)
+            dtype: Floating-point type of the coordinate and radiation
+                   grids, float32 (default) or float64
+            equinox_day: Day of year of the northern spring equinox
+                         (defaults to the Earth-like fraction of the year)
+            cache_dir: Directory in which to keep the solar climatology
+                       table of this planet configuration between runs
         """
         self.world_size = world_size
+        self.dtype = resolve_dtype(dtype)
         self.axial_tilt = np.radians(axial_tilt_degrees)
         self.day_length_hours = day_length_hours
         self.year_length_days = year_length_days
@@ -56,6 +85,11 @@ class PlanetarySystem:
         self.current_hour = 0.0
         self.seasonal_factor = seasonal_factor
         self.earth_scale = earth_scale
+        self.equinox_day = equinox_day
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = StageCache(cache_dir, max_bytes=DEFAULT_CACHE_SIZE)
+        self._solar_climatology = None
 
         # Derived planetary properties
         # For display purposes - scaled-down map representation
@@ -72,13 +106,16 @@ class PlanetarySystem:
 
         # Initialize coordinate system
         self._initialize_coordinates()
+        self.solar_geometry = SolarGeometry(self.latitudes[:, 0],
+                                            self.longitudes[0, :])
     
-        # Set up the sun and observer for ephem calculations
+        # Set up the orbit for the sun positions
         self._setup_celestial_objects()
     
         # Create day/night mask and solar radiation map
         self.day_night_mask = np.zeros((world_size, world_size), dtype=bool)
-        self.solar_radiation = np.zeros((world_size, world_size))
+        self.solar_radiation = np.zeros((world_size, world_size),
+                                        dtype=self.dtype)
     
         # Update the initial state
         self.update_sun_position()
@@ -100,8 +137,10 @@ class PlanetarySystem:
     def _initialize_coordinates(self) -> None:
         """Initialize the latitude and longitude grids for the world."""
         # Create arrays to hold the latitude and longitude of each cell
-        self.latitudes = np.zeros((self.world_size, self.world_size))
-        self.longitudes = np.zeros((self.world_size, self.world_size))
+        self.latitudes = np.zeros((self.world_size, self.world_size),
+                                  dtype=self.dtype)
+        self.longitudes = np.zeros((self.world_size, self.world_size),
+                                   dtype=self.dtype)
 
         # Calculate latitudes (from +90° at the top to -90° at the bottom)
         for y in range(self.world_size):
@@ -114,32 +153,37 @@ class PlanetarySystem:
             self.longitudes[:, x] = longitude
 
     def _setup_celestial_objects(self) -> None:
-        """Set up the sun and observer for astronomical calculations."""
-        self.sun = ephem.Sun()
+        """Set up the orbit for astronomical calculations."""
+        # Sun positions follow this planet's own orbit and tilt
+        self.orbit = OrbitalEphemeris(
+            self.axial_tilt, self.eccentricity, self.perihelion_day,
+            self.year_length_days, self.equinox_day)
+        self.subsolar = (0.0, 0.0)
+        self.orbital_distance = 1.0
+
+    @property
+    def current_time(self) -> float:
+        """Current simulation time in planet days since day 0."""
+        return self.current_day + self.current_hour / self.day_length_hours
+
+    def get_sun_positions(self, days) -> SunPositions:
+        """Compute sun positions for a batch of times.
 
-        # Create an observer - will be updated for each grid cell
-        self.observer = ephem.Observer()
-        self.observer.pressure = 0.0  # Ignore atmospheric refraction
+        Args:
+            days: Times in planet days since day 0 (scalar or array)
 
-        # Set the epoch for calculations (doesn't matter much for our purposes)
-        self.epoch = datetime(2000, 1, 1)
+        Returns:
+            Subsolar latitudes and longitudes (radians), orbital distances
+            and equations of time, with the shape of ``days``
+        """
+        return self.orbit.positions(days)
 
+    @profiled
     def _update_sun_position(self) -> None:
         """Update the sun's position based on the current day and hour."""
-        # Calculate the hour of day as a fraction
-        hour_fraction = self.current_hour / self.day_length_hours
-
-        # Calculate the julian date for ephem
-        # This is simplified - we're just using a base date
-        # and adding our simulation time
-        days_since_epoch = (
-            self.current_day
-            + (hour_fraction * self.day_length_hours / 24.0)
-        )
-        self.observer.date = self.epoch + timedelta(days=days_since_epoch)
-
-        # Update the sun's position
-        self.sun.compute(self.observer)
+        position = self.orbit.positions(self.current_time)
+        self.subsolar = (float(position.latitude), float(position.longitude))
+        self.orbital_distance = float(position.distance)
 
     def update_sun_position(self) -> None:
         """Update the sun's position based on current date and time."""
@@ -153,95 +197,226 @@ class PlanetarySystem:
         """Update the solar radiation map for the entire world."""
         self._update_solar_radiation()
 
+    @profiled
     def update_all(self) -> None:
         """Update sun position, day/night cycle and solar radiation."""
         self.update_sun_position()
-        self.update_day_night_cycle()
-        self.update_solar_radiation()
+        self._update_solar_fields()
 
+    @profiled
     def advance_time(self, hours: float = 1.0) -> None:
         """Advance the simulation time by a specified number of hours.
 
         Args:
             hours: Number of hours to advance the simulation
         """
-        self.current_hour += hours
+        self.current_day, self.current_hour = self._advance_clock(
+            self.current_day, self.current_hour, hours)
+
+        # Update the sun's position
+        self.update_sun_position()
+
+        # Update day/night and solar radiation maps
+        self._update_solar_fields()
+
+    def _advance_clock(self, day, hour: float,
+                       hours: float) -> Tuple[float, float]:
+        """Advance a (day, hour) simulation clock by a number of hours.
+
+        Args:
+            day: Day of year
+            hour: Hour of day
+            hours: Number of hours to advance
+
+        Returns:
+            Tuple of (day of year, hour of day) after advancing
+        """
+        hour += hours
 
         # Handle day rollover
-        while self.current_hour >= self.day_length_hours:
-            self.current_hour -= self.day_length_hours
-            self.current_day += 1
+        while hour >= self.day_length_hours:
+            hour -= self.day_length_hours
+            day += 1
 
             # Handle year rollover
-            if self.current_day >= self.year_length_days:
-                self.current_day = 0
+            if day >= self.year_length_days:
+                day = 0
 
-        # Update the sun's position
-        self.update_sun_position()
+        return day, hour
 
-        # Update day/night and solar radiation maps
-        self._update_day_night_cycle()
-        self._update_solar_radiation()
+    def _orbital_factor(self) -> float:
+        """Solar radiation factor of the current orbital distance."""
+        # Solar radiation is inversely proportional
+        # to square of distance of the planet from its sun
+        return 1 / (self.orbital_distance ** 2)
 
+    @profiled
     def _update_day_night_cycle(self) -> None:
         """Update the day/night mask for the entire world."""
-        # For each position, calculate if it's day or night
-        for y in range(self.world_size):
-            for x in range(self.world_size):
-                latitude = self.latitudes[y, x]
-                longitude = self.longitudes[y, x]
+        # It's day where the sun's altitude is above 0
+        sin_altitude = self.solar_geometry.sin_altitude(*self.subsolar)
+        np.greater(sin_altitude, 0, out=self.day_night_mask)
+
+    @profiled
+    def _update_solar_radiation(self) -> None:
+        """Update the solar radiation map for the entire world."""
+        # Solar radiation is 0 at night, otherwise proportional to
+        # sin(altitude) and scaled by the orbital distance
+        radiation = self.solar_geometry.sin_altitude(
+            *self.subsolar, out=self.solar_radiation)
+        np.maximum(radiation, 0, out=radiation)
+        radiation *= self._orbital_factor()
+
+    @profiled
+    def _update_solar_fields(self) -> None:
+        """Update the day/night mask and solar radiation in one pass."""
+        self._fill_solar_fields(self.solar_radiation, self.day_night_mask,
+                                *self.subsolar, self.orbital_distance)
+
+    def _fill_solar_fields(self, radiation: np.ndarray, day_night: np.ndarray,
+                           subsolar_lat, subsolar_lon, distance) -> None:
+        """Compute solar radiation and day/night for one or more time steps.
 
-                # Update observer position
-                self.observer.lat = str(latitude)
-                self.observer.lon = str(longitude)
+        Args:
+            radiation: (y, x) or (t, y, x) radiation output
+            day_night: Day/night mask output of the same shape
+            subsolar_lat: Subsolar latitude(s) in radians
+            subsolar_lon: Subsolar longitude(s) in radians
+            distance: Orbital distance(s) in semi-major axes
+        """
+        self.solar_geometry.sin_altitude(subsolar_lat, subsolar_lon,
+                                         out=radiation)
+
+        # It's day where the sun's altitude is above 0; solar radiation is
+        # 0 at night and scaled by the orbital distance during the day
+        np.greater(radiation, 0, out=day_night)
+        np.maximum(radiation, 0, out=radiation)
+        factor = 1 / np.asarray(distance, dtype=np.float64) ** 2
+        radiation *= factor.astype(radiation.dtype)[..., np.newaxis, np.newaxis]
+
+    def advance_time_series(self, hours: float = 1.0, steps: int = 24,
+                            chunk_size: Optional[int] = None
+                            ) -> Iterator[SolarFrames]:
+        """Advance the simulation time step by step, yielding the frames.
+
+        Equivalent to calling ``advance_time(hours)`` ``steps`` times and
+        copying the day/night mask and solar radiation after each call,
+        but all sun positions are computed up front and the frames are
+        filled a chunk at a time. The planet advances as the chunks are
+        consumed; after each chunk its clock and fields are those of the
+        chunk's last frame.
 
-                # Compute the sun's position for this location
-                self.sun.compute(self.observer)
+        Args:
+            hours: Number of hours per time step
+            steps: Number of time steps
+            chunk_size: Number of frames per chunk (defaults to chunks of
+                about 64 MiB)
 
-                # It's day if the sun's altitude is above 0
-                self.day_night_mask[y, x] = float(self.sun.alt) > 0
+        Yields:
+            Frames of consecutive time steps, with a leading time axis
+        """
+        yield from self._time_series(hours, steps, chunk_size)
 
-    def _update_solar_radiation(self) -> None:
-        """Update the solar radiation map for the entire world."""
-        # For each position, calculate solar radiation intensity
-        for y in range(self.world_size):
-            for x in range(self.world_size):
-                latitude = self.latitudes[y, x]
-                longitude = self.longitudes[y, x]
-
-                # Update observer position
-                self.observer.lat = str(latitude)
-                self.observer.lon = str(longitude)
-
-                # Compute the sun's position for this location
-                self.sun.compute(self.observer)
-
-                # Solar radiation is 0 at night,
-                # otherwise proportional to sin(altitude)
-                if float(self.sun.alt) <= 0:
-                    self.solar_radiation[y, x] = 0.0
-                else:
-                    # Calculate radiation factor based on sun's altitude
-                    radiation = np.sin(float(self.sun.alt))
-
-                    # Apply orbital distance factor
-                    year_angle = (
-                        2 * np.pi * (self.current_day / self.year_length_days)
-                    )
-                    perihelion_angle = (
-                        2 * np.pi
-                        * (self.perihelion_day / self.year_length_days)
-                    )
-                    angle_diff = (year_angle - perihelion_angle) % (2 * np.pi)
-
-                    # Distance factor due to eccentricity (1 - e*cos(angle))
-                    distance_factor = 1 - self.eccentricity * np.cos(angle_diff)
-
-                    # Solar radiation is inversely proportional
-                    # to square of distance of the planet from its sun
-                    orbital_factor = 1 / (distance_factor ** 2)
-
-                    self.solar_radiation[y, x] = radiation * orbital_factor
+    @profiled
+    def advance_time_series_array(self, hours: float = 1.0, steps: int = 24,
+                                  chunk_size: Optional[int] = None,
+                                  memmap_dir: Optional[str] = None
+                                  ) -> SolarFrames:
+        """Advance the simulation time, returning all frames as arrays.
+
+        Args:
+            hours: Number of hours per time step
+            steps: Number of time steps
+            chunk_size: Number of frames filled at a time
+            memmap_dir: Directory to write the frames to as memory-mapped
+                .npy files (day_night.npy, solar_radiation.npy, days.npy
+                and hours.npy) instead of holding them in memory
+
+        Returns:
+            Frames of all time steps, memory-mapped if ``memmap_dir`` is set
+        """
+        shape = (steps, self.world_size, self.world_size)
+        if memmap_dir is None:
+            day_night = np.empty(shape, dtype=bool)
+            radiation = np.empty(shape, dtype=self.dtype)
+        else:
+            os.makedirs(memmap_dir, exist_ok=True)
+            day_night = np.lib.format.open_memmap(
+                os.path.join(memmap_dir, "day_night.npy"), mode="w+",
+                dtype=bool, shape=shape)
+            radiation = np.lib.format.open_memmap(
+                os.path.join(memmap_dir, "solar_radiation.npy"), mode="w+",
+                dtype=self.dtype, shape=shape)
+
+        days, hours_of_day = [], []
+        for frames in self._time_series(hours, steps, chunk_size,
+                                        day_night, radiation):
+            days.append(frames.days)
+            hours_of_day.append(frames.hours)
+        days = np.concatenate(days) if days else np.empty(0)
+        hours_of_day = (np.concatenate(hours_of_day) if hours_of_day
+                        else np.empty(0))
+
+        if memmap_dir is not None:
+            day_night.flush()
+            radiation.flush()
+            np.save(os.path.join(memmap_dir, "days.npy"), days)
+            np.save(os.path.join(memmap_dir, "hours.npy"), hours_of_day)
+
+        return SolarFrames(days, hours_of_day, day_night, radiation)
+
+    def _time_series(self, hours: float, steps: int,
+                     chunk_size: Optional[int],
+                     day_night: Optional[np.ndarray] = None,
+                     radiation: Optional[np.ndarray] = None
+                     ) -> Iterator[SolarFrames]:
+        """Generate time-series frames, optionally into given arrays."""
+        # Simulation clock of every frame, as advance_time would step it
+        clock: List[Tuple[float, float]] = []
+        day, hour = self.current_day, self.current_hour
+        for _ in range(steps):
+            day, hour = self._advance_clock(day, hour, hours)
+            clock.append((day, hour))
+        days = np.array([day for day, _ in clock], dtype=np.float64)
+        hours_of_day = np.array([hour for _, hour in clock], dtype=np.float64)
+
+        # All sun positions at once
+        positions = self.orbit.positions(
+            days + hours_of_day / self.day_length_hours)
+
+        if chunk_size is None:
+            frame_bytes = self.world_size ** 2 * (self.dtype.itemsize + 1)
+            chunk_size = max(1, SERIES_CHUNK_BYTES // frame_bytes)
+
+        frame_shape = (self.world_size, self.world_size)
+        for start in range(0, steps, chunk_size):
+            stop = min(start + chunk_size, steps)
+            if radiation is None:
+                chunk_radiation = np.empty((stop - start,) + frame_shape,
+                                           dtype=self.dtype)
+                chunk_day_night = np.empty((stop - start,) + frame_shape,
+                                           dtype=bool)
+            else:
+                chunk_radiation = radiation[start:stop]
+                chunk_day_night = day_night[start:stop]
+
+            self._fill_solar_fields(chunk_radiation, chunk_day_night,
+                                    positions.latitude[start:stop],
+                                    positions.longitude[start:stop],
+                                    positions.distance[start:stop])
+            count_event("time_series.frames", stop - start)
+
+            # Leave the planet at the last frame of the chunk
+            last = stop - 1
+            self.current_day, self.current_hour = clock[last]
+            self.subsolar = (float(positions.latitude[last]),
+                             float(positions.longitude[last]))
+            self.orbital_distance = float(positions.distance[last])
+            self.day_night_mask[...] = chunk_day_night[-1]
+            self.solar_radiation[...] = chunk_radiation[-1]
+
+            yield SolarFrames(days[start:stop], hours_of_day[start:stop],
+                              chunk_day_night, chunk_radiation)
 
     def get_current_date(self) -> Tuple[int, float]:
         """Get the current simulation date.
@@ -300,88 +475,95 @@ class PlanetarySystem:
         else:
             return "Fall"
 
-    def get_seasonal_factor(self, latitude: float) -> float:
+    @property
+    def solar_climatology(self) -> SolarClimatology:
+        """Latitude x day-of-year table of noon altitude, seasonal factor
+        and day length, computed on first use (or loaded from the cache).
+        """
+        if self._solar_climatology is None:
+            config = (self.axial_tilt, self.eccentricity, self.perihelion_day,
+                      self.year_length_days, self.orbit.equinox_day,
+                      self.day_length_hours, self.seasonal_factor)
+            key = stage_key("solar_climatology", config)
+            table = self.cache.get(key) if self.cache is not None else None
+            if table is None:
+                table = SolarClimatology.compute(
+                    self.orbit, self.day_length_hours, self.seasonal_factor)
+                count_event("solar_climatology.computed")
+                if self.cache is not None:
+                    self.cache.put(key, table)
+            self._solar_climatology = table
+        return self._solar_climatology
+
+    def get_seasonal_factor(self, latitude, day: Optional[float] = None):
         """Calculate seasonal factor for a given latitude.
 
         This represents how much the season affects the given latitude,
         with positive values for summer-like conditions and negative for winter.
 
         Args:
-            latitude: Latitude in degrees (-90 to 90)
+            latitude: Latitude in degrees (-90 to 90), scalar or array
+            day: Day of year (defaults to the current day)
 
         Returns:
-            Seasonal factor (-1.0 to 1.0)
+            Seasonal factor (-1.0 to 1.0), an array for array arguments
         """
-        # Convert to observer at this latitude
-        observer = ephem.Observer()
-        observer.lat = str(latitude)
-        observer.pressure = 0
-
-        # Set date based on current day
-        observer.date = self.epoch + timedelta(days=self.current_day)
-
-        # Calculate sun's position at noon
-        sun = ephem.Sun()
-        # Set to local noon
-        observer.date = observer.date.datetime() + timedelta(hours=12)
-        sun.compute(observer)
-
-        # Get the sun's altitude at noon
-        max_altitude = float(sun.alt)
-
-        # Normalize to -1 to 1 range and apply seasonal factor
-        # At equinox, sun at equator is at 90° at noon, and at poles is at 0°
-        equinox_altitude = np.radians(90 - abs(latitude))
-        seasonal_effect = (max_altitude - equinox_altitude) / (np.pi/2)
-        seasonal_effect = np.clip(
-            seasonal_effect * self.seasonal_factor, -1.0, 1.0
-        )
+        day = self.current_day if day is None else day
+        return self.solar_climatology.lookup("seasonal_factor", latitude, day)
+
+    def get_noon_altitude(self, latitude, day: Optional[float] = None):
+        """Calculate the sun's altitude at noon for a given latitude.
+
+        Args:
+            latitude: Latitude in degrees (-90 to 90), scalar or array
+            day: Day of year (defaults to the current day)
 
-        return seasonal_effect
+        Returns:
+            Noon altitude in radians, negative during polar night
+        """
+        day = self.current_day if day is None else day
+        return self.solar_climatology.lookup("noon_altitude", latitude, day)
 
-    def get_day_length(self, latitude: float) -> float:
+    def get_day_length(self, latitude, day: Optional[float] = None):
         """Calculate day length in hours for a given
            latitude on the current day.
 
         Args:
-            latitude: Latitude in degrees (-90 to 90)
+            latitude: Latitude in degrees (-90 to 90), scalar or array
+            day: Day of year (defaults to the current day)
 
         Returns:
-            Day length in hours
+            Day length in hours (0 during polar night, the full day
+            length during polar day)
         """
-        # Set up observer at this latitude
-        observer = ephem.Observer()
-        observer.lat = str(latitude)
-        observer.pressure = 0
-
-        # Set date based on current day
-        observer.date = self.epoch + timedelta(days=self.current_day)
-
-        # Get sunrise and sunset times
-        try:
-            sunrise = observer.next_rising(ephem.Sun())
-            sunset = observer.next_setting(ephem.Sun())
-
-            # Calculate time difference in hours
-            time_diff = (
-                (sunset.datetime()
-                 - sunrise.datetime()).total_seconds()
-                 / 3600.0
-            )
+        day = self.current_day if day is None else day
+        return self.solar_climatology.lookup("day_length", latitude, day)
 
-            # Scale to match our custom day length
-            scaled_time = time_diff * (self.day_length_hours / 24.0)
+    def get_daily_insolation(self, day: Optional[float] = None,
+                             solar_constant: float = 1.0) -> np.ndarray:
+        """Calculate the daily-mean top-of-atmosphere insolation.
 
-            return scaled_time
-        except (ephem.AlwaysUpError, ephem.NeverUpError):
-            # Handle polar day/night
-            sun = ephem.Sun()
-            sun.compute(observer)
+        Averages the solar radiation over a whole day in closed form, with
+        the declination and orbital distance at noon of the day, instead of
+        stepping through its hours.
 
-            if float(sun.alt) > 0:
-                return self.day_length_hours  # Polar day
-            else:
-                return 0.0  # Polar night
+        Args:
+            day: Day of year (defaults to the current day)
+            solar_constant: Insolation at the mean orbital distance with the
+                sun at the zenith (1.0 gives the units of solar_radiation)
+
+        Returns:
+            Read-only (world_size, world_size) view of the insolation of
+            each grid row, broadcast along the rows
+        """
+        day = self.current_day if day is None else day
+        position = self.orbit.positions(day + 0.5)
+        latitudes = np.radians(self.latitudes[:, 0].astype(np.float64))
+        rows = daily_insolation(latitudes, position.latitude,
+                                position.distance)
+        rows = (rows * solar_constant).astype(self.dtype)
+        return np.broadcast_to(rows[:, np.newaxis],
+                               (self.world_size, self.world_size))
 
     def visualize_day_night(self, ax=None, title: str = "Day/Night Cycle"):
         """Visualize the current day/night cycle.
@@ -482,19 +664,12 @@ class PlanetarySystem:
         if latitudes is None:
             latitudes = [0, 23.5, 45, 66.5, 90]
 
-        # Save current day
-        original_day = self.current_day
-
         plt.figure(figsize=(12, 6))
 
         # For each latitude, calculate day length through the year
         for current_lat in latitudes:
             days = np.arange(0, self.year_length_days, self.year_length_days/50)
-            day_lengths = []
-
-            for day in days:
-                self.current_day = int(day)
-                day_lengths.append(self.get_day_length(current_lat))
+            day_lengths = self.get_day_length(current_lat, days.astype(int))
 
             plt.plot(days, day_lengths, label=f"{current_lat}° latitude")
 
@@ -537,14 +712,11 @@ class PlanetarySystem:
         plt.tight_layout()
         plt.show()
 
-        # Restore original day
-        self.current_day = original_day
-
-    def get_seasonal_temperature_factor(self, latitude: float) -> float:
+    def get_seasonal_temperature_factor(self, latitude):
         """Calculate a temperature modifier based on season and latitude.
 
         Args:
-            latitude: Latitude in degrees (-90 to 90)
+            latitude: Latitude in degrees (-90 to 90), scalar or array
 
         Returns:
             Temperature modifier in degrees Celsius
@@ -0,0 +1,37 @@
+"""Floating-point precision policy for EmergenWorld.
+
+TerrainGenerator, PlanetarySystem and ClimateSystem allocate every field in
+one configurable floating-point type. The default is float32: world fields
+are normalized heights, masks, angles and climate quantities that need far
+less than float64's precision, and halving their size halves the memory and
+bandwidth of every vectorized stage. Pass ``dtype=np.float64`` for results
+identical to double-precision runs.
+
+The compiled kernels and a few library routines (distance transforms, the
+metpy/verde climate calculations) work in float64; their results are cast
+back to the policy type explicitly where they are stored.
+"""
+
+import numpy as np
+
+# Floating-point type of world fields unless another one is requested
+DEFAULT_DTYPE = np.float32
+
+FLOAT_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+
+def resolve_dtype(dtype=None) -> np.dtype:
+    """Validate a field dtype option.
+
+    Args:
+        dtype: float32 or float64 in any form numpy accepts (e.g.
+            ``np.float32`` or ``"float64"``), ``DEFAULT_DTYPE`` if None
+
+    Returns:
+        The numpy dtype
+    """
+    resolved = np.dtype(dtype if dtype is not None else DEFAULT_DTYPE)
+    if resolved not in FLOAT_DTYPES:
+        raise ValueError(f"Unsupported field dtype '{resolved}', expected "
+                         f"one of {[str(d) for d in FLOAT_DTYPES]}")
+    return resolved
@@ -0,0 +1,142 @@
+"""Multi-resolution terrain pyramid for EmergenWorld.
+
+Progressive generation (``TerrainGenerator.generate_progressive``) builds the
+world at a sequence of increasing resolutions. Each level keeps its heightmap
+and masks here, so rendering can pick the coarsest level that still has at
+least one cell per screen pixel for the region being shown.
+
+Level grids sample the same longitude/latitude mapping as the full world:
+cell ``(y, x)`` of a ``size`` level lies at ``(y / size, x / size)`` of the
+map, so a coarse field is resampled onto a finer level with ``upsample``
+(linear interpolation, x wraps and y is clamped).
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class PyramidLevel(NamedTuple):
+    """Heightmap and masks of one resolution."""
+    size: int
+    heightmap: np.ndarray
+    continental_mask: np.ndarray
+    valley_mask: np.ndarray
+
+
+def upsample(field: np.ndarray, size: int) -> np.ndarray:
+    """Linearly resample a square field onto a finer ``size`` x ``size`` grid.
+
+    Args:
+        field: 2D field of a coarser level
+        size: Grid size of the finer level
+
+    Returns:
+        Resampled field
+    """
+    coarse = field.shape[0]
+    position = np.arange(size) * (coarse / size)
+    index = np.floor(position).astype(np.int64)
+    weight = (position - index).astype(field.dtype)
+
+    # Interpolate along x with wrap-around, then along y with clamping
+    rows = (field[:, index % coarse] * (1.0 - weight)
+            + field[:, (index + 1) % coarse] * weight)
+    upper = np.minimum(index + 1, coarse - 1)
+    return (rows[index] * (1.0 - weight)[:, np.newaxis]
+            + rows[upper] * weight[:, np.newaxis])
+
+
+class HeightmapPyramid:
+    """Heightmaps and masks of one world at several resolutions."""
+
+    def __init__(self):
+        """Initialize an empty pyramid."""
+        self._levels: Dict[int, PyramidLevel] = {}
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    @property
+    def sizes(self) -> List[int]:
+        """Grid sizes of the levels, coarsest first."""
+        return sorted(self._levels)
+
+    @property
+    def finest(self) -> PyramidLevel:
+        """Level with the highest resolution."""
+        return self._levels[self.sizes[-1]]
+
+    def add(self, heightmap: np.ndarray, continental_mask: np.ndarray,
+            valley_mask: np.ndarray) -> PyramidLevel:
+        """Store a level, replacing any level of the same size.
+
+        Args:
+            heightmap: Square heightmap of the level
+            continental_mask: Continental mask of the level
+            valley_mask: Valley mask of the level
+
+        Returns:
+            The stored level
+        """
+        level = PyramidLevel(heightmap.shape[0], heightmap, continental_mask,
+                             valley_mask)
+        self._levels[level.size] = level
+        return level
+
+    def level(self, size: int) -> PyramidLevel:
+        """Return the level of a given grid size."""
+        if size not in self._levels:
+            raise KeyError(f"No pyramid level of size {size}, "
+                           f"available sizes are {self.sizes}")
+        return self._levels[size]
+
+    def level_for(self, pixels: int,
+                  region: Optional[Tuple[float, float, float, float]] = None
+                  ) -> PyramidLevel:
+        """Coarsest level that shows a region with at least ``pixels`` cells.
+
+        Args:
+            pixels: Number of screen pixels across the region
+            region: (top, bottom, left, right) map fractions in [0, 1]
+                (the whole map if omitted)
+
+        Returns:
+            Selected level (the finest one if none is fine enough)
+        """
+        top, bottom, left, right = region if region is not None else (
+            0.0, 1.0, 0.0, 1.0)
+        width = right - left if right > left else right - left + 1.0
+        extent = max(bottom - top, width)
+        for size in self.sizes:
+            if size * extent >= pixels:
+                return self._levels[size]
+        return self.finest
+
+    @staticmethod
+    def crop(field: np.ndarray,
+             region: Optional[Tuple[float, float, float, float]]
+             ) -> np.ndarray:
+        """Cut a map region out of a level field.
+
+        Args:
+            field: 2D field of a level
+            region: (top, bottom, left, right) map fractions in [0, 1]; a
+                ``left`` greater than ``right`` crosses the date line
+
+        Returns:
+            Field of the region (the whole field if region is None)
+        """
+        if region is None:
+            return field
+
+        rows, cols = field.shape[:2]
+        top, bottom, left, right = region
+        y0 = int(np.floor(top * rows))
+        y1 = max(y0 + 1, int(np.ceil(bottom * rows)))
+        x0 = int(np.floor(left * cols))
+        x1 = int(np.ceil(right * cols))
+        if x1 <= x0:
+            x1 += cols
+        columns = np.arange(x0, max(x0 + 1, x1)) % cols
+        return field[y0:y1][:, columns]
@@ -0,0 +1,554 @@
+"""River networks for EmergenWorld terrain.
+
+A ``RiverNetwork`` stores every river path in compressed sparse row form:
+the (y, x) cells of all rivers, each from source to mouth, in one int32
+buffer, and the start of each river in an offsets array, so river ``r`` is
+``points[offsets[r]:offsets[r + 1]]``. A river that ends on an earlier river
+is a tributary: ``parent`` holds the river it joins (-1 for rivers that reach
+the sea or end on land) and ``junction`` the index of the confluence on the
+parent's path.
+
+Confluences split the rivers into segments. Every segment has a Strahler
+order (1 without tributaries upstream, one more than the highest incoming
+order where two or more segments of that order meet) and a discharge at its
+downstream end (the channel cells upstream of it, or the runoff summed over
+them).
+
+Rivers are drawn with a disc per path cell whose width grows downstream from
+2 cells at the source; x wraps and rows beyond the poles are dropped. An id
+raster of the drawn cells gives the river at any cell in constant time.
+
+Channels are carved from a centerline raster holding each path cell's
+downstream fraction (0 at the source, 1 at the mouth) and channel level (the
+lowest land height of the path so far, so water never has to climb). A
+distance transform to the centerline, padded across the date line, gives
+every cell its distance to and nearest cell of the centerline; channel width
+and depth follow from that cell's attributes, and the carve is one
+``np.minimum`` over the cells within reach. All cells are carved from the
+same starting heights, so overlapping channels do not depend on the order
+of the rivers.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import ndimage
+
+# River id of cells without a river
+NO_RIVER = -1
+
+# Channels widen from 1 cell at the source to this many at the mouth
+MAX_CHANNEL_WIDTH = 5
+
+# Rows per distance transform when carving channels
+CARVE_STRIP_ROWS = 256
+
+
+class RiverSegments(NamedTuple):
+    """Segments of a river network, between confluences."""
+    river: np.ndarray
+    start: np.ndarray
+    stop: np.ndarray
+    order: np.ndarray
+    discharge: np.ndarray
+
+
+def river_widths(length: int) -> np.ndarray:
+    """Drawing width of each cell of a path, from source to mouth.
+
+    Args:
+        length: Number of cells in the path
+
+    Returns:
+        int64 widths, 2 at the source growing to at most 5 downstream
+    """
+    position = np.arange(length) / length
+    return np.minimum(2 + (position * 3).astype(np.int64), 5)
+
+
+def wrapped_distance(features: np.ndarray, reach: int
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Euclidean distance to the nearest feature cell, with x wrapping.
+
+    The grid is padded with ``reach`` wrapped columns on each side, so
+    distances up to ``reach`` are exact across the date line.
+
+    Args:
+        features: 2D boolean mask of the feature cells (at least one set)
+        reach: Largest distance that must be exact across the date line
+
+    Returns:
+        Tuple of (distance, y of the nearest feature, x of the nearest
+        feature)
+    """
+    cols = features.shape[1]
+    reach = min(reach, cols)
+    padded = np.concatenate([features[:, cols - reach:], features,
+                             features[:, :reach]], axis=1)
+    indices = np.empty((2,) + padded.shape, dtype=np.int32)
+    distance = ndimage.distance_transform_edt(~padded, return_indices=True,
+                                              indices=indices)
+
+    inner = slice(reach, reach + cols)
+    return (distance[:, inner], indices[0][:, inner],
+            (indices[1][:, inner] - reach) % cols)
+
+
+def neighbourhood_minimum(field: np.ndarray) -> np.ndarray:
+    """Minimum over each cell's 3x3 neighbourhood (x wraps, y is clamped).
+
+    Args:
+        field: 2D field
+
+    Returns:
+        Neighbourhood minimum of every cell
+    """
+    rows = field.copy()
+    np.minimum(rows[1:], field[:-1], out=rows[1:])
+    np.minimum(rows[:-1], field[1:], out=rows[:-1])
+
+    result = rows.copy()
+    np.minimum(result[:, 1:], rows[:, :-1], out=result[:, 1:])
+    np.minimum(result[:, :1], rows[:, -1:], out=result[:, :1])
+    np.minimum(result[:, :-1], rows[:, 1:], out=result[:, :-1])
+    np.minimum(result[:, -1:], rows[:, :1], out=result[:, -1:])
+    return result
+
+
+def carve_channels(heightmap: np.ndarray, centerline: np.ndarray,
+                   level: np.ndarray) -> np.ndarray:
+    """Carve river channels around a centerline raster.
+
+    Land cells within a channel's width of their nearest centerline cell
+    are lowered, deepest at the center. Channels widen from 1 to
+    ``MAX_CHANNEL_WIDTH`` cells and deepen downstream; near the source they
+    only scale the terrain down, further on they cut below the channel
+    level of the centerline. Banks more than 0.1 below a neighbour pull that
+    neighbour down to 0.05 above the bank.
+
+    The distance transform runs over strips of ``CARVE_STRIP_ROWS`` rows
+    plus the ``MAX_CHANNEL_WIDTH`` rows around them, skipping strips
+    without channels.
+
+    Args:
+        heightmap: 2D heightmap (negative values are ocean)
+        centerline: Downstream fraction of each centerline cell, NaN
+            elsewhere (see ``RiverNetwork.centerline``)
+        level: Channel level of each centerline cell
+
+    Returns:
+        Carved copy of the heightmap
+    """
+    rows = heightmap.shape[0]
+    reach = MAX_CHANNEL_WIDTH
+    carved = heightmap.copy()
+    channel = ~np.isnan(centerline) & (heightmap >= 0)
+    floor = np.full(heightmap.shape, np.inf)
+    bank_rows = [rows, 0]
+
+    for top in range(0, rows, CARVE_STRIP_ROWS):
+        bottom = min(top + CARVE_STRIP_ROWS, rows)
+        above, below = max(0, top - reach), min(rows, bottom + reach)
+        if not np.any(channel[above:below]):
+            continue
+
+        distance, near_y, near_x = wrapped_distance(channel[above:below],
+                                                    reach)
+        strip = slice(top - above, bottom - above)
+        height = heightmap[top:bottom].ravel()
+        cells = np.flatnonzero((distance[strip] <= reach).ravel()
+                               & (height >= 0))
+        distance = distance[strip].ravel()[cells]
+        near_y = near_y[strip].ravel()[cells] + above
+        near_x = near_x[strip].ravel()[cells]
+        fraction = centerline[near_y, near_x]
+        width = 1 + (fraction * 4).astype(np.int64)
+        inside = distance <= width
+        cells, distance, fraction, width = (cells[inside], distance[inside],
+                                            fraction[inside], width[inside])
+        near_y, near_x = near_y[inside], near_x[inside]
+
+        # Center is deepest, edges are higher
+        cell_depth = (0.05 + fraction * 0.15) * (1.0 - distance / width)
+        height = height[cells]
+        source = fraction < 0.05
+        target = np.where(source, height * (1.0 - cell_depth * 0.5),
+                          level[near_y, near_x] - cell_depth * 0.05)
+        carved[top:bottom].ravel()[cells] = np.minimum(height, target)
+
+        # Banks of the larger channels, smoothed once all strips are carved
+        bank = cells[~source & (distance > width * 0.7)]
+        if bank.size:
+            floor[top:bottom].ravel()[bank] = carved[top:bottom].ravel()[bank]
+            bank_rows = [min(bank_rows[0], top), bottom]
+
+    # Only the rows around the banks can change
+    region = slice(max(0, bank_rows[0] - 1), min(rows, bank_rows[1] + 1))
+    if region.start < region.stop:
+        floor = neighbourhood_minimum(floor[region])
+        steep = carved[region] > floor + 0.1
+        carved[region][steep] = floor[steep] + 0.05
+    return carved
+
+
+def disc_offsets(radius: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(dy, dx) offsets of the cells within ``radius`` of a center cell."""
+    dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+    inside = dy * dy + dx * dx <= radius * radius
+    return dy[inside], dx[inside]
+
+
+class RiverNetwork:
+    """Array-backed river paths with their confluence graph."""
+
+    def __init__(self, size: int):
+        """Initialize an empty network.
+
+        Args:
+            size: Size of the square world grid
+        """
+        self.size = size
+        # Buffers with spare capacity, grown geometrically by ``add``; the
+        # filled parts are exposed as ``points``, ``offsets``, ``parent``
+        # and ``junction``
+        self._points = np.empty((0, 2), dtype=np.int32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._parent = np.empty(0, dtype=np.int32)
+        self._junction = np.empty(0, dtype=np.int32)
+        self._rivers = 0
+        self._ids = None
+        self._segments = None
+
+    @classmethod
+    def from_paths(cls, size: int,
+                   paths: Sequence[Sequence[Tuple[int, int]]]
+                   ) -> "RiverNetwork":
+        """Build a network from (y, x) paths, each from source to mouth.
+
+        Args:
+            size: Size of the square world grid
+            paths: River paths in the order they were created
+
+        Returns:
+            The network
+        """
+        network = cls(size)
+        for path in paths:
+            network.add(path)
+        return network
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, object]) -> "RiverNetwork":
+        """Rebuild a network from the output of ``arrays``."""
+        network = cls(arrays["size"])
+        network._points = arrays["points"]
+        network._offsets = arrays["offsets"]
+        network._parent = arrays["parent"]
+        network._junction = arrays["junction"]
+        network._rivers = network._parent.size
+        return network
+
+    def arrays(self) -> Dict[str, object]:
+        """Grid size and arrays that fully describe the network."""
+        return {"size": self.size, "points": self.points,
+                "offsets": self.offsets, "parent": self.parent,
+                "junction": self.junction}
+
+    def __len__(self) -> int:
+        return self._rivers
+
+    @property
+    def points(self) -> np.ndarray:
+        """(n, 2) int32 (y, x) cells of every river, river after river."""
+        return self._points[:self._offsets[self._rivers]]
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """Start of each river in ``points``, plus the end of the last one."""
+        return self._offsets[:self._rivers + 1]
+
+    @property
+    def parent(self) -> np.ndarray:
+        """River each river joins, ``NO_RIVER`` if it joins none."""
+        return self._parent[:self._rivers]
+
+    @property
+    def junction(self) -> np.ndarray:
+        """Index of each confluence on the parent's path (or ``NO_RIVER``)."""
+        return self._junction[:self._rivers]
+
+    def path(self, river: int) -> np.ndarray:
+        """(n, 2) array of the (y, x) cells of a river, source first."""
+        return self.points[self.offsets[river]:self.offsets[river + 1]]
+
+    def paths(self) -> List[List[Tuple[int, int]]]:
+        """Every river as a list of (y, x) tuples."""
+        return [list(map(tuple, self.path(river).tolist()))
+                for river in range(len(self))]
+
+    def children(self, river: int) -> np.ndarray:
+        """Ids of the tributaries that join a river."""
+        return np.flatnonzero(self.parent == river)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """int32 raster of the river drawn at each cell (``NO_RIVER`` if none).
+
+        Where rivers overlap the cell belongs to the earliest one.
+        """
+        if self._ids is None:
+            self._ids = np.full((self.size, self.size), NO_RIVER,
+                                dtype=np.int32)
+            for river in range(len(self)):
+                self._claim(river)
+        return self._ids
+
+    def river_at(self, y: int, x: int) -> int:
+        """Id of the river drawn at a cell, ``NO_RIVER`` if there is none."""
+        return int(self.ids[y, x])
+
+    def add(self, path) -> int:
+        """Append a river and connect it to the river it ends on.
+
+        Args:
+            path: (y, x) cells from source to mouth
+
+        Returns:
+            Id of the new river
+        """
+        path = np.asarray(path, dtype=np.int32).reshape(-1, 2)
+        if path.shape[0] == 0:
+            raise ValueError("River path must contain at least one cell")
+
+        # A river ending on an earlier river joins it at the nearest cell
+        # of that river's path
+        mouth_y, mouth_x = path[-1]
+        parent = self.ids[mouth_y, mouth_x]
+        junction = NO_RIVER
+        if parent != NO_RIVER:
+            cells = self.path(parent)
+            dx = np.abs(cells[:, 1] - mouth_x)
+            dx = np.minimum(dx, self.size - dx)
+            dy = cells[:, 0] - mouth_y
+            junction = int(np.argmin(dy * dy + dx * dx))
+
+        river = len(self)
+        start = self._offsets[river]
+        stop = start + path.shape[0]
+        self._reserve(river + 1, stop)
+        self._points[start:stop] = path
+        self._offsets[river + 1] = stop
+        self._parent[river] = parent
+        self._junction[river] = junction
+        self._rivers += 1
+        self._claim(river)
+        self._segments = None
+        return river
+
+    def _reserve(self, rivers: int, points: int) -> None:
+        """Grow the buffers to hold ``rivers`` rivers and ``points`` cells.
+
+        Capacities at least double, so appending a river costs amortized
+        O(1) per path cell instead of copying every earlier path.
+        """
+        if points > self._points.shape[0]:
+            grown = np.empty((max(points, 2 * self._points.shape[0]), 2),
+                             dtype=np.int32)
+            grown[:self._offsets[self._rivers]] = self.points
+            self._points = grown
+        if rivers > self._parent.size:
+            capacity = max(rivers, 2 * self._parent.size)
+            offsets = np.empty(capacity + 1, dtype=np.int64)
+            offsets[:self._rivers + 1] = self.offsets
+            self._offsets = offsets
+            for name in ("_parent", "_junction"):
+                grown = np.empty(capacity, dtype=np.int32)
+                grown[:self._rivers] = getattr(self, name)[:self._rivers]
+                setattr(self, name, grown)
+
+    def footprint(self, river: Optional[int] = None
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Cells covered when drawing rivers.
+
+        Args:
+            river: River to draw (every river if None)
+
+        Returns:
+            Tuple of (y, x, width) arrays, one entry per covered cell and
+            drawn point (cells covered by several points repeat)
+        """
+        rivers = range(len(self)) if river is None else (river,)
+        widths = [river_widths(self.offsets[r + 1] - self.offsets[r])
+                  for r in rivers]
+        if not widths:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        width = np.concatenate(widths)
+        start = self.offsets[0 if river is None else river]
+        points = self.points[start:start + width.size].astype(np.int64)
+
+        ys, xs, ws = [], [], []
+        for radius in np.unique(width // 2):
+            center = points[width // 2 == radius]
+            dy, dx = disc_offsets(int(radius))
+            y = (center[:, 0:1] + dy).ravel()
+            x = ((center[:, 1:2] + dx) % self.size).ravel()
+            w = np.repeat(width[width // 2 == radius], dy.size)
+            inside = (y >= 0) & (y < self.size)
+            ys.append(y[inside])
+            xs.append(x[inside])
+            ws.append(w[inside])
+        return np.concatenate(ys), np.concatenate(xs), np.concatenate(ws)
+
+    def centerline(self, heightmap: np.ndarray, min_length: int = 3
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rasterize the land cells of the river paths with their attributes.
+
+        Args:
+            heightmap: Terrain heightmap (negative values are ocean)
+            min_length: Rivers shorter than this are left out
+
+        Returns:
+            Tuple of float64 rasters, NaN off the centerline:
+            - the fraction along its river of every path cell (0 at the
+              source, 1 at the mouth); where rivers cross the larger
+              fraction wins
+            - the channel level, the lowest land height of the path up to
+              and including the cell, so channels never climb; where
+              rivers cross the lower level wins
+        """
+        lengths = np.diff(self.offsets)
+        river = np.repeat(np.arange(len(self)), lengths)
+        index = np.arange(self.points.shape[0]) - self.offsets[river]
+        fraction = index / np.maximum(lengths[river] - 1, 1)
+        cells = (self.points[:, 0].astype(np.int64) * self.size
+                 + self.points[:, 1])
+        height = np.asarray(heightmap, dtype=np.float64).ravel()[cells]
+        keep = (lengths[river] >= min_length) & (height >= 0)
+
+        # Running minimum along each river: offsetting every river below
+        # all earlier ones restarts the accumulation at each source
+        level = np.where(height >= 0, height, np.inf)
+        if level.size:
+            step = np.max(level, initial=0.0,
+                          where=np.isfinite(level)) + 1.0
+            level = np.minimum.accumulate(level - river * step) + river * step
+
+        raster = np.full(self.size * self.size, -np.inf)
+        np.maximum.at(raster, cells[keep], fraction[keep])
+        raster[raster == -np.inf] = np.nan
+        levels = np.full(self.size * self.size, np.inf)
+        np.minimum.at(levels, cells[keep], level[keep])
+        levels[levels == np.inf] = np.nan
+        return (raster.reshape(self.size, self.size),
+                levels.reshape(self.size, self.size))
+
+    def rasterize(self, widths: bool = False) -> np.ndarray:
+        """Draw every river onto a raster.
+
+        Args:
+            widths: Return the widest river width at each cell instead of
+                a boolean mask
+
+        Returns:
+            Boolean mask, or uint8 width raster (0 without a river)
+        """
+        y, x, width = self.footprint()
+        if not widths:
+            mask = np.zeros((self.size, self.size), dtype=bool)
+            mask[y, x] = True
+            return mask
+
+        raster = np.zeros(self.size * self.size, dtype=np.uint8)
+        np.maximum.at(raster, y * self.size + x, width.astype(np.uint8))
+        return raster.reshape(self.size, self.size)
+
+    def segments(self, runoff: Optional[np.ndarray] = None) -> RiverSegments:
+        """Split the rivers at their confluences.
+
+        Args:
+            runoff: Optional raster of water contributed by each channel
+                cell (every cell contributes 1 if omitted)
+
+        Returns:
+            Segments in river order, each river's from source to mouth;
+            ``start``/``stop`` index ``points``
+        """
+        if runoff is None and self._segments is not None:
+            return self._segments
+
+        rivers = len(self)
+        if runoff is None:
+            inflow = np.ones(self.points.shape[0])
+        else:
+            inflow = np.asarray(runoff, dtype=np.float64)[self.points[:, 0],
+                                                          self.points[:, 1]]
+        cumulative = np.concatenate([[0.0], np.cumsum(inflow)])
+
+        # Segments start at the source and at every confluence
+        tributary = np.flatnonzero(self.parent != NO_RIVER)
+        cuts = [[0] for _ in range(rivers)]
+        for child in tributary:
+            cuts[self.parent[child]].append(int(self.junction[child]))
+        cuts = [np.unique(cut) for cut in cuts]
+
+        # Tributaries always join earlier rivers, so visiting rivers from
+        # the last one finishes every tributary before the river it joins
+        outlet_order = np.zeros(rivers, dtype=np.int64)
+        outlet_discharge = np.zeros(rivers)
+        river_segments = [None] * rivers
+        for river in range(rivers - 1, -1, -1):
+            start = self.offsets[river]
+            stops = np.append(cuts[river][1:],
+                              self.offsets[river + 1] - start)
+            joining = tributary[self.parent[tributary] == river]
+            order = np.zeros(stops.size, dtype=np.int64)
+            discharge = np.zeros(stops.size)
+            previous_order, previous_discharge = 0, 0.0
+            for k, (cut, stop) in enumerate(zip(cuts[river], stops)):
+                incoming = joining[self.junction[joining] == cut]
+                orders = np.append(outlet_order[incoming], previous_order)
+                highest = orders.max()
+                if highest == 0:
+                    order[k] = 1
+                elif np.count_nonzero(orders == highest) > 1:
+                    order[k] = highest + 1
+                else:
+                    order[k] = highest
+                discharge[k] = (previous_discharge
+                                + outlet_discharge[incoming].sum()
+                                + cumulative[start + stop]
+                                - cumulative[start + cut])
+                previous_order, previous_discharge = order[k], discharge[k]
+            outlet_order[river] = previous_order
+            outlet_discharge[river] = previous_discharge
+            river_segments[river] = (start + cuts[river], start + stops,
+                                     order, discharge)
+
+        counts = [cut.size for cut in cuts]
+        segments = RiverSegments(
+            np.repeat(np.arange(rivers, dtype=np.int32), counts),
+            np.concatenate([s[0] for s in river_segments] or [[]]).astype(
+                np.int64),
+            np.concatenate([s[1] for s in river_segments] or [[]]).astype(
+                np.int64),
+            np.concatenate([s[2] for s in river_segments] or [[]]).astype(
+                np.uint8),
+            np.concatenate([s[3] for s in river_segments] or [[]]))
+        if runoff is None:
+            self._segments = segments
+        return segments
+
+    def strahler_order(self) -> np.ndarray:
+        """Strahler order of every river at its mouth."""
+        segments = self.segments()
+        last = np.flatnonzero(np.diff(np.append(segments.river, len(self))))
+        return segments.order[last]
+
+    def _claim(self, river: int) -> None:
+        """Record a river in the id raster where no earlier river is drawn."""
+        if self._ids is None:
+            return
+        y, x, _ = self.footprint(river)
+        free = self._ids[y, x] == NO_RIVER
+        self._ids[y[free], x[free]] = river
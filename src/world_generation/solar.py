@@ -0,0 +1,357 @@
+"""Vectorized solar geometry for EmergenWorld.
+
+``OrbitalEphemeris`` places the sun for any batch of times from the planet's
+own orbit: Kepler's equation gives the orbital distance and the sun's
+ecliptic longitude, the axial tilt turns that into the declination and right
+ascension, and the equation of time shifts the subsolar point away from the
+mean-sun meridian. The subsolar point is where the sun stands at the zenith.
+
+``SolarGeometry`` turns a subsolar point into the sun's altitude at every
+cell of the world grid in closed form:
+
+    sin(alt) = sin(lat) sin(lat_s) + cos(lat) cos(lat_s) cos(lon - lon_s)
+
+Latitude only varies along rows and longitude along columns of the grid, so
+the altitude is an outer product of two 1-D vectors, evaluated in one pass.
+
+``daily_insolation`` gives the daily-mean insolation per latitude in closed
+form from the hour angle of sunset.
+
+``SolarClimatology`` tabulates the noon altitude, seasonal factor and day
+length over latitude and day of year once per planet, so they can be looked
+up for whole grids at once.
+
+Times are measured in planet days since the start of year 0, with day
+fractions counted from midnight on the prime meridian.
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Northern spring equinox of an Earth-like calendar as a fraction of the
+# year (day 79.3 of 365.25)
+EQUINOX_YEAR_FRACTION = 79.3 / 365.25
+
+# Convergence threshold and iteration limit of the Kepler solver
+KEPLER_TOLERANCE = 1e-12
+KEPLER_MAX_ITERATIONS = 50
+
+
+def solve_kepler(mean_anomaly: np.ndarray, eccentricity: float) -> np.ndarray:
+    """Solve Kepler's equation E - e sin(E) = M for the eccentric anomaly.
+
+    Args:
+        mean_anomaly: Mean anomalies in radians
+        eccentricity: Orbital eccentricity (0 <= e < 1)
+
+    Returns:
+        Eccentric anomalies in radians
+    """
+    mean_anomaly = np.asarray(mean_anomaly, dtype=np.float64)
+
+    # Solve for the anomaly within the current orbit, starting from
+    # Danby's guess, from which Newton's method converges for any e < 1
+    reduced = wrap_angle(mean_anomaly)
+    anomaly = reduced + 0.85 * eccentricity * np.sign(np.sin(reduced))
+    for _ in range(KEPLER_MAX_ITERATIONS):
+        step = ((anomaly - eccentricity * np.sin(anomaly) - reduced)
+                / (1.0 - eccentricity * np.cos(anomaly)))
+        anomaly = anomaly - step
+        if np.all(np.abs(step) < KEPLER_TOLERANCE):
+            break
+    return anomaly + (mean_anomaly - reduced)
+
+
+def wrap_angle(angle: np.ndarray) -> np.ndarray:
+    """Wrap angles in radians to [-pi, pi)."""
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+def sunset_hour_angle(latitude: np.ndarray,
+                      declination: np.ndarray) -> np.ndarray:
+    """Hour angle of sunset, from cos(H) = -tan(lat) tan(dec).
+
+    Args:
+        latitude: Latitudes in radians
+        declination: Solar declinations in radians (broadcasting with
+            ``latitude``)
+
+    Returns:
+        Hour angles in radians, 0 during polar night and pi during polar day
+    """
+    numerator = -np.sin(latitude) * np.sin(declination)
+    denominator = np.cos(latitude) * np.cos(declination)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_sunset = np.where(numerator == 0, 0.0, numerator / denominator)
+    return np.arccos(np.clip(cos_sunset, -1.0, 1.0))
+
+
+def daily_insolation(latitude: np.ndarray, declination: np.ndarray,
+                     distance: np.ndarray) -> np.ndarray:
+    """Daily-mean top-of-atmosphere insolation.
+
+    Q = (H sin(lat) sin(dec) + cos(lat) cos(dec) sin(H)) / (pi r^2), with
+    H the sunset hour angle, as a fraction of the solar constant at the
+    mean orbital distance.
+
+    Args:
+        latitude: Latitudes in radians
+        declination: Solar declinations in radians (broadcasting with
+            ``latitude``)
+        distance: Orbital distances in semi-major axes
+
+    Returns:
+        Daily-mean insolation
+    """
+    sunset = sunset_hour_angle(latitude, declination)
+    return ((sunset * np.sin(latitude) * np.sin(declination)
+             + np.cos(latitude) * np.cos(declination) * np.sin(sunset))
+            / (np.pi * distance ** 2))
+
+
+class SunPositions(NamedTuple):
+    """Sun positions at a batch of times (all angles in radians)."""
+    latitude: np.ndarray          # Subsolar latitude, the declination
+    longitude: np.ndarray         # Subsolar longitude, east-positive
+    distance: np.ndarray          # Orbital distance in semi-major axes
+    ecliptic_longitude: np.ndarray
+    equation_of_time: np.ndarray  # Apparent minus mean solar time
+
+
+class OrbitalEphemeris:
+    """Sun positions of a planet on an elliptical orbit."""
+
+    def __init__(self, axial_tilt: float, eccentricity: float,
+                 perihelion_day: float, year_length_days: float,
+                 equinox_day: Optional[float] = None):
+        """Initialize the ephemeris.
+
+        Args:
+            axial_tilt: Axial tilt in radians
+            eccentricity: Orbital eccentricity (0 <= e < 1)
+            perihelion_day: Day of year when the planet is closest to its sun
+            year_length_days: Length of a year in planet days
+            equinox_day: Day of year of the northern spring equinox
+                (defaults to the Earth-like fraction of the year)
+        """
+        if not 0.0 <= eccentricity < 1.0:
+            raise ValueError(
+                f"Eccentricity must be in [0, 1), got {eccentricity}")
+        self.axial_tilt = axial_tilt
+        self.eccentricity = eccentricity
+        self.perihelion_day = perihelion_day
+        self.year_length_days = year_length_days
+        self.equinox_day = (equinox_day if equinox_day is not None
+                            else EQUINOX_YEAR_FRACTION * year_length_days)
+
+        # Longitude of perihelion, chosen so that the sun's ecliptic
+        # longitude is 0 at the equinox
+        self.perihelion_longitude = -float(
+            self._anomalies(self.equinox_day)[2])
+
+    def _anomalies(self, days) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Mean, eccentric and true anomaly in radians at times in days."""
+        e = self.eccentricity
+        mean_anomaly = (2 * np.pi / self.year_length_days
+                        * (np.asarray(days, dtype=np.float64)
+                           - self.perihelion_day))
+        anomaly = solve_kepler(mean_anomaly, e)
+        true_anomaly = 2 * np.arctan2(np.sqrt(1 + e) * np.sin(anomaly / 2),
+                                      np.sqrt(1 - e) * np.cos(anomaly / 2))
+        return mean_anomaly, anomaly, true_anomaly
+
+    def positions(self, days) -> SunPositions:
+        """Sun positions at a batch of times.
+
+        Args:
+            days: Times in planet days since the start of year 0 (scalar
+                or array of any shape)
+
+        Returns:
+            Sun positions, arrays of the shape of ``days``
+        """
+        days = np.asarray(days, dtype=np.float64)
+        mean_anomaly, anomaly, true_anomaly = self._anomalies(days)
+        distance = 1 - self.eccentricity * np.cos(anomaly)
+
+        # Equatorial coordinates of the sun from its ecliptic longitude
+        ecliptic_longitude = true_anomaly + self.perihelion_longitude
+        sin_longitude = np.sin(ecliptic_longitude)
+        declination = np.arcsin(np.sin(self.axial_tilt) * sin_longitude)
+        right_ascension = np.arctan2(np.cos(self.axial_tilt) * sin_longitude,
+                                     np.cos(ecliptic_longitude))
+
+        # The mean sun moves uniformly along the equator; the apparent sun
+        # runs ahead of or behind it by the equation of time
+        mean_longitude = mean_anomaly + self.perihelion_longitude
+        equation_of_time = wrap_angle(mean_longitude - right_ascension)
+
+        # The mean sun crosses the prime meridian at noon
+        hour_angle = 2 * np.pi * (days % 1.0) - np.pi + equation_of_time
+        longitude = wrap_angle(-hour_angle)
+
+        return SunPositions(declination, longitude, distance,
+                            wrap_angle(ecliptic_longitude), equation_of_time)
+
+
+class SolarGeometry:
+    """Sun altitude over a latitude/longitude grid.
+
+    The grid is described by one latitude per row and one longitude per
+    column; their sines and cosines are computed once.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray):
+        """Initialize the geometry.
+
+        Args:
+            latitudes: Latitude of every grid row in degrees
+            longitudes: Longitude of every grid column in degrees
+        """
+        latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+        self.sin_lat = np.sin(latitudes)
+        self.cos_lat = np.cos(latitudes)
+        self.longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Shape of the grid."""
+        return self.sin_lat.size, self.longitudes.size
+
+    def sin_altitude(self, subsolar_lat, subsolar_lon,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sine of the sun's altitude at every grid cell.
+
+        Args:
+            subsolar_lat: Subsolar latitude in radians, or a 1-D array of
+                them for a batch of time steps
+            subsolar_lon: Subsolar longitude(s) in radians
+            out: Array of the grid shape, with a leading time axis for a
+                batch, to write the result to (any float dtype; the
+                products are formed in float64)
+
+        Returns:
+            Sine of the altitude, positive where the sun is above the horizon
+        """
+        subsolar_lat = np.asarray(subsolar_lat,
+                                  dtype=np.float64)[..., np.newaxis]
+        subsolar_lon = np.asarray(subsolar_lon,
+                                  dtype=np.float64)[..., np.newaxis]
+        cos_hour_angle = np.cos(self.longitudes - subsolar_lon)
+        if out is None:
+            out = np.empty(subsolar_lat.shape[:-1] + self.shape,
+                           dtype=np.float64)
+        np.multiply((self.cos_lat * np.cos(subsolar_lat))[..., :, np.newaxis],
+                    cos_hour_angle[..., np.newaxis, :], out=out)
+        out += (self.sin_lat * np.sin(subsolar_lat))[..., :, np.newaxis]
+        return out
+
+
+class SolarClimatology:
+    """Latitude x day-of-year table of a planet's solar climate.
+
+    Holds the noon sun altitude, the seasonal factor and the day length for
+    every latitude (in ``latitude_step`` degree steps) and every day of the
+    year, sampled at noon on the prime meridian. Lookups interpolate
+    bilinearly; the day axis wraps around the year.
+    """
+
+    FIELDS = ("noon_altitude", "seasonal_factor", "day_length")
+
+    def __init__(self, latitudes: np.ndarray, days: np.ndarray,
+                 year_length_days: float, tables: Dict[str, np.ndarray]):
+        """Initialize the table.
+
+        Args:
+            latitudes: Evenly spaced latitudes of the table rows in degrees
+            days: Increasing days of year of the table columns, ending at
+                ``year_length_days`` (equivalent to day 0)
+            year_length_days: Length of a year in planet days
+            tables: 2D (latitude, day) array of every name in ``FIELDS``
+        """
+        self.latitudes = latitudes
+        self.days = days
+        self.year_length_days = year_length_days
+        self.tables = tables
+
+    @classmethod
+    def compute(cls, orbit: OrbitalEphemeris, day_length_hours: float,
+                seasonal_scale: float = 1.0,
+                latitude_step: float = 0.5) -> "SolarClimatology":
+        """Compute the table of a planet.
+
+        Args:
+            orbit: The planet's orbital ephemeris
+            day_length_hours: Length of a day in hours
+            seasonal_scale: Multiplier of the seasonal factor
+            latitude_step: Latitude spacing of the table in degrees
+
+        Returns:
+            Climatology table
+        """
+        year = orbit.year_length_days
+        days = np.append(np.arange(int(np.ceil(year))), year).astype(np.float64)
+        latitudes = np.linspace(-90.0, 90.0,
+                                int(round(180.0 / latitude_step)) + 1)
+
+        declination = orbit.positions(days + 0.5).latitude[np.newaxis, :]
+        latitude = np.radians(latitudes)[:, np.newaxis]
+
+        # The sun culminates at 90 degrees minus its distance from the zenith
+        noon_altitude = np.pi / 2 - np.abs(latitude - declination)
+
+        # Noon altitude relative to an equinox, as used for seasons
+        equinox_altitude = np.pi / 2 - np.abs(latitude)
+        seasonal_factor = np.clip(
+            (noon_altitude - equinox_altitude) / (np.pi / 2) * seasonal_scale,
+            -1.0, 1.0)
+
+        # The sun is up between the hour angles of sunrise and sunset
+        sunset = sunset_hour_angle(latitude, declination)
+        day_length = sunset / np.pi * day_length_hours
+
+        return cls(latitudes, days, year, {
+            "noon_altitude": noon_altitude,
+            "seasonal_factor": seasonal_factor,
+            "day_length": day_length,
+        })
+
+    def lookup(self, field: str, latitude, day):
+        """Interpolate a field of the table.
+
+        Args:
+            field: Name from ``FIELDS``
+            latitude: Latitudes in degrees (scalar or array)
+            day: Days of year (scalar or array broadcasting with
+                ``latitude``)
+
+        Returns:
+            Interpolated values, a float for scalar arguments
+        """
+        table = self.tables[field]
+        latitude, day = np.broadcast_arrays(
+            np.asarray(latitude, dtype=np.float64),
+            np.asarray(day, dtype=np.float64))
+
+        # Fractional row along the evenly spaced latitudes
+        step = self.latitudes[1] - self.latitudes[0]
+        row = np.clip((latitude - self.latitudes[0]) / step,
+                      0, self.latitudes.size - 1)
+        row0 = np.minimum(row.astype(np.int64), self.latitudes.size - 2)
+        row_weight = row - row0
+
+        # Fractional column along the days, wrapping around the year
+        day = day % self.year_length_days
+        column0 = np.clip(np.searchsorted(self.days, day, side="right") - 1,
+                          0, self.days.size - 2)
+        column_weight = ((day - self.days[column0])
+                         / (self.days[column0 + 1] - self.days[column0]))
+
+        values = ((table[row0, column0] * (1 - column_weight)
+                   + table[row0, column0 + 1] * column_weight)
+                  * (1 - row_weight)
+                  + (table[row0 + 1, column0] * (1 - column_weight)
+                     + table[row0 + 1, column0 + 1] * column_weight)
+                  * row_weight)
+        return float(values) if values.ndim == 0 else values
@@ -0,0 +1,130 @@
+"""Spatial index of placed features for EmergenWorld terrain.
+
+River sources, springs, lakes and plateaus are placed greedily: candidates
+are visited best first and accepted unless an accepted feature lies closer
+than a minimum separation (Poisson-disk style). ``PointIndex`` keeps the
+accepted points in a grid hash whose buckets are about one separation wide,
+so each test only looks at the points of the few surrounding buckets and
+placement scales linearly with the number of candidates.
+
+Distances follow the grid conventions: x (longitude) wraps around and y
+(latitude) does not. Many points can be tested at once against a fixed set
+with ``near_many``, which queries a periodic k-d tree.
+"""
+
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class PointIndex:
+    """Wrap-aware grid hash of points on a square world grid."""
+
+    def __init__(self, size: int, cell_size: float):
+        """Initialize an empty index.
+
+        Args:
+            size: Size of the square world grid
+            cell_size: Approximate bucket width, best set to the typical
+                separation tested with ``near``
+        """
+        self.size = size
+        self.columns = max(1, int(size // max(cell_size, 1.0)))
+        self.bucket_width = size / self.columns
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+        self._ys: List[int] = []
+        self._xs: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._ys)
+
+    @property
+    def points(self) -> np.ndarray:
+        """(n, 2) array of the (y, x) points in insertion order."""
+        return np.array([self._ys, self._xs], dtype=np.int64).T.reshape(-1, 2)
+
+    def _bucket(self, y: float, x: float) -> Tuple[int, int]:
+        """Bucket (row, column) of a point."""
+        return (int(y // self.bucket_width),
+                int(x // self.bucket_width) % self.columns)
+
+    def add(self, y: int, x: int) -> None:
+        """Insert a point.
+
+        Args:
+            y: Row of the point
+            x: Column of the point
+        """
+        self._buckets.setdefault(self._bucket(y, x), []).append(len(self._ys))
+        self._ys.append(y)
+        self._xs.append(x)
+
+    def near(self, y: int, x: int, distance: float) -> bool:
+        """Check whether any point lies closer than a distance.
+
+        Args:
+            y: Row of the tested cell
+            x: Column of the tested cell
+            distance: Separation (wrapping in longitude)
+
+        Returns:
+            True if a point is closer than ``distance``
+        """
+        reach = int(math.ceil(distance / self.bucket_width))
+        row, column = self._bucket(y, x)
+        if 2 * reach + 1 >= self.columns:
+            columns = range(self.columns)
+        else:
+            columns = [c % self.columns
+                       for c in range(column - reach, column + reach + 1)]
+
+        for bucket_row in range(row - reach, row + reach + 1):
+            for bucket_column in columns:
+                for i in self._buckets.get((bucket_row, bucket_column), ()):
+                    dx = abs(x - self._xs[i])
+                    dx = min(dx, self.size - dx)
+                    dy = y - self._ys[i]
+                    if math.sqrt(dx * dx + dy * dy) < distance:
+                        return True
+        return False
+
+    def accept(self, y: int, x: int, distance: float) -> bool:
+        """Insert a point unless another lies closer than a distance.
+
+        Args:
+            y: Row of the candidate
+            x: Column of the candidate
+            distance: Minimum separation (wrapping in longitude)
+
+        Returns:
+            True if the candidate was accepted
+        """
+        if self.near(y, x, distance):
+            return False
+        self.add(y, x)
+        return True
+
+    def near_many(self, ys: np.ndarray, xs: np.ndarray,
+                  distance: float) -> np.ndarray:
+        """Test many cells at once against the current points.
+
+        Args:
+            ys: Rows of the tested cells
+            xs: Columns of the tested cells
+            distance: Separation (wrapping in longitude)
+
+        Returns:
+            Boolean array, True where a point is closer than ``distance``
+        """
+        queries = np.column_stack([ys, xs]).astype(np.float64)
+        if not self._ys or queries.shape[0] == 0:
+            return np.zeros(queries.shape[0], dtype=bool)
+
+        # Rows are periodic over three world heights, which never wraps
+        # a distance within the grid
+        tree = cKDTree(self.points.astype(np.float64),
+                       boxsize=[3 * self.size, self.size])
+        closest, _ = tree.query(queries, distance_upper_bound=distance)
+        return closest < distance
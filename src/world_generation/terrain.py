@@ -5,11 +5,48 @@ better land distribution patterns, and enhanced geographic features for
 a believable fantasy world.
 """
 
+import zlib
+
 import numpy as np
-from opensimplex import OpenSimplex
 import matplotlib.pyplot as plt
-from typing import Tuple, Dict, Optional
-from scipy.ndimage import distance_transform_edt, gaussian_filter
+from typing import Tuple, Dict, Mapping, Optional, Sequence
+from scipy.ndimage import (correlate1d, distance_transform_edt, gaussian_filter,
+                           maximum_filter)
+
+from .cache import DEFAULT_CACHE_SIZE, StageCache, stage_key
+from .erosion import (EROSION_MODES, STREAM_POWER_DIFFUSIVITY,
+                      STREAM_POWER_TIME_STEP, STREAM_POWER_UPLIFT,
+                      batched_droplet_erosion, stream_power_erosion,
+                      thermal_weathering)
+from .hydrology import D8_OFFSETS, DepressionBasins, FlowField, shift
+from .instrumentation import count as count_event, profiled
+from .kernels import default_backend, get_kernels
+from .masks import WaterBodies
+from .noise import FractalNoise, grid_coordinates
+from .precision import DEFAULT_DTYPE, resolve_dtype
+from .pyramid import HeightmapPyramid, PyramidLevel, upsample
+from .rivers import RiverNetwork, carve_channels, wrapped_distance
+from .spatial import PointIndex
+from .tiling import TileStore
+
+
+# Stages of generate_complete_terrain, in order
+PIPELINE_STAGES = ("create_continental_mask", "generate_heightmap",
+                   "generate_valley_mask", "add_mountains",
+                   "add_ridges_and_canyons", "add_plateaus", "apply_erosion",
+                   "generate_water_bodies", "add_rivers", "add_lakes",
+                   "final_erosion")
+
+# Stages of the pipeline that run tile by tile in tiled mode; the others
+# need the whole world in memory
+TILED_STAGES = PIPELINE_STAGES[:4]
+
+# Resolutions of the progressive pyramid below the full world size
+PROGRESSIVE_LEVELS = (256, 1024, 4096)
+
+# Grid cells per noise unit needed to resolve a heightmap noise octave;
+# coarser pyramid levels skip the octaves they cannot resolve
+NOISE_SAMPLES_PER_UNIT = 2.0
 
 
 class TerrainGenerator:
@@ -21,7 +58,13 @@ class TerrainGenerator:
 
     def __init__(self, size: int = 1024, octaves: int = 6,
                 persistence: float = 0.5, lacunarity: float = 2.0,
-                seed: Optional[int] = None, earth_scale: float = 0.0083):
+                seed: Optional[int] = None, earth_scale: float = 0.0083,
+                backend: Optional[str] = None, tiled: bool = False,
+                tile_rows: int = 256, max_tiles: int = 4,
+                workdir: Optional[str] = None,
+                cache_dir: Optional[str] = None,
+                cache_size: int = DEFAULT_CACHE_SIZE,
+                dtype=DEFAULT_DTYPE):
         """Initialize the TerrainGenerator with configurable parameters.
 
         Args:
@@ -31,16 +74,56 @@ class TerrainGenerator:
             lacunarity: Lacunarity value for noise generation
             seed: Random seed for reproducible terrain generation
             earth_scale: Scale factor for display purposes
+            backend: Kernel backend for the sequential algorithms, "numba"
+                or "python" (defaults to numba when it is installed)
+            tiled: Store the world arrays as memory-mapped files and generate
+                the continental mask, valley mask, heightmap and mountains
+                tile by tile, for worlds larger than RAM (the later stages
+                need the whole world in memory and are not available)
+            tile_rows: Number of rows per tile in tiled mode
+            max_tiles: Number of tiles resident in memory in tiled mode
+            workdir: Directory for the tiled-mode array files (temporary
+                directory if omitted)
+            cache_dir: Directory of the on-disk stage cache used by
+                generate_complete_terrain (no caching if omitted; not
+                available in tiled mode)
+            cache_size: Stage cache size limit in bytes, least recently
+                used stages are evicted beyond it
+            dtype: Floating-point type of the heightmap, the masks and the
+                latitudes, float32 (default) or float64
         """
+        if tiled and cache_dir is not None:
+            raise ValueError("The stage cache is not available in tiled mode")
+
         self.size = size
         self.octaves = octaves
         self.persistence = persistence
         self.lacunarity = lacunarity
         self.seed = seed if seed is not None else np.random.randint(0, 1000000)
+        self.dtype = resolve_dtype(dtype)
+        self._flow_cache = {}
+        self.pyramid = None
         self.heightmap = None
         self.continental_mask = None
         self.valley_mask = None
-        self.river_paths = []
+        self.river_network = RiverNetwork(size)
+
+        # Kernels for droplet erosion, river walks, lake fills and carving
+        self.backend = backend if backend is not None else default_backend()
+        self.kernels = get_kernels(self.backend)
+        self.backend = self.kernels.name
+
+        # Out-of-core storage for worlds larger than RAM
+        self.tiles = None
+        if tiled:
+            self.tiles = TileStore(size, self.kernels, tile_rows=tile_rows,
+                                   max_tiles=max_tiles, workdir=workdir,
+                                   dtype=self.dtype)
+
+        # Stage results of generate_complete_terrain, keyed by their inputs
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = StageCache(cache_dir, max_bytes=cache_size)
 
         # Earth properties for scaling
         self.earth_scale = earth_scale
@@ -60,7 +143,7 @@ class TerrainGenerator:
         self.area_per_cell_sqmiles = (self.area_per_cell_sqkm * 0.386102)  # Convert to sq miles
 
         # Create latitude bands for reference (y-coordinates to latitude in degrees)
-        self.latitudes = np.zeros(self.size)
+        self.latitudes = np.zeros(self.size, dtype=self.dtype)
         for y in range(self.size):
             self.latitudes[y] = 90 - (y / (self.size - 1) * 180)  # +90° at top, -90° at bottom
 
@@ -70,6 +153,89 @@ class TerrainGenerator:
         print(f"Each grid cell represents {self.km_per_cell:.2f} km "
               f"({self.area_per_cell_sqmiles:.2f} sq miles)")
 
+    @property
+    def heightmap(self) -> Optional[np.ndarray]:
+        """Current heightmap (assigning a new one invalidates the flow cache).
+
+        Assigned heightmaps are converted to the generator's dtype, so the
+        float64 results of the compiled kernels are stored at the policy
+        precision.
+        """
+        return self._heightmap
+
+    @heightmap.setter
+    def heightmap(self, heightmap: Optional[np.ndarray]) -> None:
+        if heightmap is not None and heightmap.dtype != self.dtype:
+            heightmap = heightmap.astype(self.dtype)
+        self._heightmap = heightmap
+        self.invalidate_flow()
+
+        # The pyramid only describes the heightmap it was generated with
+        if (self.pyramid is not None
+                and heightmap is not self.pyramid.finest.heightmap):
+            self.pyramid = None
+
+    def invalidate_flow(self) -> None:
+        """Discard cached flow routing.
+
+        Called automatically when ``self.heightmap`` is reassigned; call it
+        explicitly after modifying the heightmap in place.
+        """
+        self._flow_cache.clear()
+
+    @profiled
+    def flow_field(self, method: str = "d8") -> FlowField:
+        """Flow directions and accumulation of the current heightmap.
+
+        The result is cached until the heightmap changes, so rivers, erosion
+        and lakes share one computation.
+
+        Args:
+            method: Routing method, "d8" or "dinf"
+
+        Returns:
+            FlowField for the current heightmap
+        """
+        if self.heightmap is None:
+            raise ValueError("Heightmap must be generated before routing flow")
+
+        if method not in self._flow_cache:
+            self._flow_cache[method] = FlowField(np.asarray(self.heightmap),
+                                                 method=method,
+                                                 kernels=self.kernels)
+        return self._flow_cache[method]
+
+    def _require_in_memory(self, stage: str) -> None:
+        """Refuse a stage that works on the whole world at once in tiled mode.
+
+        Args:
+            stage: Stage description for the error message
+
+        Raises:
+            ValueError: If the generator is in tiled mode
+        """
+        if self.tiles is not None:
+            raise ValueError(f"{stage} needs the whole world in memory and "
+                             f"is not available in tiled mode")
+
+    def stage_rng(self, stage: str) -> np.random.Generator:
+        """Independent random generator of one generation stage.
+
+        The stream is spawned from the world seed with ``SeedSequence``
+        using a key derived from the stage name, so a stage gives the same
+        result whether it runs alone, out of order or in another process.
+
+        Args:
+            stage: Stage name (e.g. "add_rivers")
+
+        Returns:
+            Freshly seeded random generator
+        """
+        stream = zlib.crc32(stage.encode("utf-8"))
+        return np.random.default_rng(
+            np.random.SeedSequence(self.seed, spawn_key=(stream,)))
+
+    @profiled
     def create_continental_mask(self, continent_size: float = 0.3) -> np.ndarray:
         """Generate continent masks with improved latitudinal distribution.
         
@@ -83,30 +249,13 @@ class TerrainGenerator:
             2D numpy array with continental influence
         """
         print("Generating continental influence map with improved distribution...")
-    
-        # Base continental noise with variable frequencies
-        continental_mask = np.zeros((self.size, self.size))
-        noise_gen = OpenSimplex(seed=self.seed + 42)  # Different seed for continents
 
-        # Use multiple noise octaves for more realistic continent shapes
-        for y in range(self.size):
-            latitude = self.latitudes[y]  # Current latitude in degrees
-            
-            # Create latitudinal bias - multiply land probability by this factor
-            # Peaks at around 40° North and South, lowest at equator
-            lat_bias = self.calculate_latitudinal_land_bias(latitude)
-            
-            for x in range(self.size):
-                # Multiple noise scales for complex continents
-                value1 = noise_gen.noise2(x / (self.size/2), y / (self.size/2))
-                value2 = noise_gen.noise2(x / (self.size/4), y / (self.size/4)) * 0.5
-                value3 = noise_gen.noise2(x / (self.size/8), y / (self.size/8)) * 0.25
-                
-                # Combine noise at different scales
-                base_value = value1 + value2 + value3
-                
-                # Apply latitudinal bias
-                continental_mask[y, x] = base_value * lat_bias
+        if self.tiles is not None:
+            return self._create_continental_mask_tiled(continent_size)
+
+        # Base continental noise with variable frequencies
+        noise_gen = FractalNoise(seed=self.seed + 42)  # Different seed for continents
+        continental_mask = self._continental_noise(noise_gen, 0, self.size)
 
         # Normalize to 0-1 range
         min_val = np.min(continental_mask)
@@ -118,10 +267,10 @@ class TerrainGenerator:
         
         # Use percentile for land threshold to ensure target land percentage
         land_threshold = np.percentile(continental_mask, (1.0 - continent_size) * 100)
-        binary_continents = (continental_mask > land_threshold).astype(float)
+        binary_continents = (continental_mask > land_threshold).astype(self.dtype)
         
         # Apply distance field for coastal gradients
-        distance = distance_transform_edt(1 - binary_continents)
+        distance = distance_transform_edt(1 - binary_continents).astype(self.dtype)
         max_distance = np.max(distance)
         if max_distance > 0:
             coastal_gradient = 1.0 - (distance / max_distance)
@@ -131,6 +280,87 @@ class TerrainGenerator:
         self.continental_mask = continental_mask
         return continental_mask
 
+    def _continental_noise(self, noise_gen: FractalNoise, y0: int,
+                           rows: int) -> np.ndarray:
+        """Latitude-biased continental noise for rows ``[y0, y0 + rows)``.
+
+        Args:
+            noise_gen: Continental noise generator
+            y0: First row
+            rows: Number of rows
+
+        Returns:
+            Un-normalized continental noise of shape (rows, size)
+        """
+        y, x = grid_coordinates(rows, self.size, y_offset=y0)
+
+        # Use multiple noise octaves for more realistic continent shapes
+        # (size/2, size/4 and size/8 wavelengths with halving amplitude)
+        base_value = noise_gen.fractal2(x / (self.size/2), y / (self.size/2),
+                                        octaves=3, persistence=0.5,
+                                        lacunarity=2.0, dtype=self.dtype)
+
+        # Create latitudinal bias - multiply land probability by this factor
+        # Peaks at around 40° North and South, lowest at equator
+        lat_bias = np.array([self.calculate_latitudinal_land_bias(latitude)
+                             for latitude in self.latitudes[y0:y0 + rows]],
+                            dtype=self.dtype)
+
+        # Apply latitudinal bias
+        return base_value * lat_bias[:, np.newaxis]
+
+    def _create_continental_mask_tiled(self, continent_size: float) -> np.ndarray:
+        """Tiled version of ``create_continental_mask`` for out-of-core worlds.
+
+        Args:
+            continent_size: Target land percentage (0.0-1.0)
+
+        Returns:
+            Memory-mapped continental mask
+        """
+        tiles = self.tiles
+        noise_gen = FractalNoise(seed=self.seed + 42)  # Different seed for continents
+
+        continental_mask = tiles.array("continental_mask")
+        for tile in tiles.tiles():
+            tiles.write(continental_mask, tile,
+                        self._continental_noise(noise_gen, tile.y0, tile.rows))
+
+        # Normalize to 0-1 range, then improve east-west continuity
+        # (the continuity pass works row by row, so tiles need no halo)
+        min_val, max_val = tiles.minmax(continental_mask)
+        for tile in tiles.tiles():
+            values = (tiles.read(continental_mask, tile) - min_val) / (max_val - min_val)
+            tiles.write(continental_mask, tile,
+                        self.enhance_horizontal_continuity(values))
+
+        # Use percentile for land threshold to ensure target land percentage
+        land_threshold = tiles.percentile(continental_mask,
+                                          (1.0 - continent_size) * 100)
+        continents = tiles.array("continents", dtype=np.uint8)
+        for tile in tiles.tiles():
+            tiles.write(continents, tile,
+                        tiles.read(continental_mask, tile) > land_threshold)
+
+        # Apply distance field for coastal gradients
+        distance, max_distance = tiles.distance_transform(continents,
+                                                          "coast_distance")
+        if max_distance > 0:
+            for tile in tiles.tiles():
+                binary_continents = tiles.read(continents, tile).astype(self.dtype)
+                coastal_gradient = 1.0 - (tiles.read(distance, tile) / max_distance)
+                tiles.write(continental_mask, tile,
+                            np.maximum(binary_continents, coastal_gradient * 0.7))
+
+        # Drop the mappings first, mapped files cannot be deleted on Windows
+        del distance, continents
+        tiles.remove("coast_distance")
+        tiles.remove("continents")
+        tiles.flush()
+
+        self.continental_mask = continental_mask
+        return continental_mask
+
     def calculate_latitudinal_land_bias(self, latitude: float) -> float:
         """Calculate the land probability bias for a given latitude.
         
@@ -173,52 +403,41 @@ class TerrainGenerator:
         Returns:
             Enhanced continental mask
         """
-        enhanced_mask = mask.copy()
-        
-        # Apply a horizontal smoothing pass to ensure east-west continuity
-        for y in range(self.size):
-            # Extract row and create wrapped version for edge handling
-            row = mask[y, :]
-            wrapped_row = np.concatenate([row[-10:], row, row[:10]])
-            
-            # Apply horizontal smoothing with distance weighting
-            for x in range(self.size):
-                # Consider a wider neighborhood with distance weighting
-                neighborhood = wrapped_row[x:x+20]  # 10 cells left, current, 9 cells right
-                
-                # Weighted average based on distance
-                weights = np.linspace(0.5, 1.0, 10)  # Weights increase toward center
-                weights = np.concatenate([weights, weights[::-1]])
-                
-                weighted_avg = np.sum(neighborhood * weights) / np.sum(weights)
-                
-                # Blend with original value (80% original, 20% smoothed)
-                enhanced_mask[y, x] = mask[y, x] * 0.8 + weighted_avg * 0.2
-        
+        # Apply a horizontal smoothing pass to ensure east-west continuity:
+        # distance-weighted average of 10 cells left, current, 9 cells right,
+        # with weights increasing toward the center
+        weights = np.linspace(0.5, 1.0, 10)
+        weights = np.concatenate([weights, weights[::-1]])
+        smoothed = correlate1d(mask, weights / np.sum(weights), axis=1,
+                               mode="wrap")
+
+        # Blend with original value (80% original, 20% smoothed)
+        enhanced_mask = mask * 0.8 + smoothed * 0.2
+
         # Improve edge wrapping by explicitly copying edge data
-        # Copy right edge to left buffer zone and vice versa
-        for y in range(self.size):
-            for x in range(1, 21):  # Wider buffer zone (20 cells)
-                enhanced_mask[y, -x] = 0.3 * enhanced_mask[y, -x] + 0.7 * enhanced_mask[y, x]
-                enhanced_mask[y, x-1] = 0.3 * enhanced_mask[y, x-1] + 0.7 * enhanced_mask[y, -x]
-        
+        # Copy right edge to left buffer zone and vice versa (20 cells)
+        buffer = np.arange(1, 21)
+        right = enhanced_mask[:, -buffer] * 0.3 + enhanced_mask[:, buffer] * 0.7
+        enhanced_mask[:, buffer - 1] = (enhanced_mask[:, buffer - 1] * 0.3
+                                        + right * 0.7)
+        enhanced_mask[:, -buffer] = right
+
         # Additional smoothing pass focused on edges
-        edge_weights = np.linspace(0.5, 1.0, 20)  # Stronger weights near edges
-        for y in range(self.size):
-            # Process left edge (with data from right)
-            for x in range(20):
-                weight = edge_weights[x]
-                right_val = enhanced_mask[y, -20+x]
-                enhanced_mask[y, x] = enhanced_mask[y, x] * (1-weight) + right_val * weight
-                
-            # Process right edge (with data from left)
-            for x in range(1, 21):
-                weight = edge_weights[20-x]
-                left_val = enhanced_mask[y, x-1]
-                enhanced_mask[y, -x] = enhanced_mask[y, -x] * (1-weight) + left_val * weight
-        
+        edge_weights = np.linspace(0.5, 1.0, 20,  # Stronger weights near edges
+                                   dtype=mask.dtype)
+
+        # Process left edge (with data from right)
+        enhanced_mask[:, :20] = (enhanced_mask[:, :20] * (1 - edge_weights)
+                                 + enhanced_mask[:, -20:] * edge_weights)
+
+        # Process right edge (with data from left)
+        weight = edge_weights[20 - buffer]
+        enhanced_mask[:, -buffer] = (enhanced_mask[:, -buffer] * (1 - weight)
+                                     + enhanced_mask[:, buffer - 1] * weight)
+
         return enhanced_mask
 
+    @profiled
     def generate_valley_mask(self) -> np.ndarray:
         """Generate a mask for deep valleys in the terrain.
         
@@ -228,28 +447,12 @@ class TerrainGenerator:
             2D numpy array representing valley locations
         """
         print("Generating deep valley patterns...")
-        
-        valley_mask = np.zeros((self.size, self.size))
-        valley_noise = OpenSimplex(seed=self.seed + 75)
-        
-        # Different frequency for valleys
-        for y in range(self.size):
-            for x in range(self.size):
-                # Valleys have a different pattern than the base heightmap
-                nx = x / (self.size / 7)  # Higher frequency for narrower valleys
-                ny = y / (self.size / 5)
-                
-                # Multiple octaves for valley detail
-                value = 0.0
-                amplitude = 1.0
-                frequency = 1.0
-                
-                for _ in range(4):  # Fewer octaves for valley mask
-                    value += valley_noise.noise2(nx * frequency, ny * frequency) * amplitude
-                    amplitude *= 0.65
-                    frequency *= 2.0
-                
-                valley_mask[y, x] = value
+
+        if self.tiles is not None:
+            return self._generate_valley_mask_tiled()
+
+        valley_noise = FractalNoise(seed=self.seed + 75)
+        valley_mask = self._valley_noise(valley_noise, 0, self.size)
         
         # Normalize to 0-1
         valley_mask = (valley_mask - np.min(valley_mask)) / (np.max(valley_mask) - np.min(valley_mask))
@@ -263,50 +466,92 @@ class TerrainGenerator:
         self.valley_mask = valley_mask
         return valley_mask
 
-    def generate_heightmap(self, scale: float = 100.0) -> np.ndarray:
+    def _valley_noise(self, valley_noise: FractalNoise, y0: int,
+                      rows: int) -> np.ndarray:
+        """Raw valley noise for rows ``[y0, y0 + rows)``.
+
+        Args:
+            valley_noise: Valley noise generator
+            y0: First row
+            rows: Number of rows
+
+        Returns:
+            Un-normalized valley noise of shape (rows, size)
+        """
+        y, x = grid_coordinates(rows, self.size, y_offset=y0)
+        
+        # Valleys have a different pattern than the base heightmap
+        nx = x / (self.size / 7)  # Higher frequency for narrower valleys
+        ny = y / (self.size / 5)
+        
+        # Fewer octaves for valley detail than the base heightmap
+        return valley_noise.fractal2(nx, ny, octaves=4,
+                                     persistence=0.65, lacunarity=2.0,
+                                     dtype=self.dtype)
+
+    def _generate_valley_mask_tiled(self) -> np.ndarray:
+        """Tiled version of ``generate_valley_mask`` for out-of-core worlds.
+
+        Returns:
+            Memory-mapped valley mask
+        """
+        tiles = self.tiles
+        valley_noise = FractalNoise(seed=self.seed + 75)
+
+        raw_mask = tiles.array("valley_noise")
+        for tile in tiles.tiles():
+            tiles.write(raw_mask, tile,
+                        self._valley_noise(valley_noise, tile.y0, tile.rows))
+
+        # Normalize to 0-1 and keep only the deepest valleys
+        min_val, max_val = tiles.minmax(raw_mask)
+        for tile in tiles.tiles():
+            values = (tiles.read(raw_mask, tile) - min_val) / (max_val - min_val)
+            tiles.write(raw_mask, tile, (values > 0.65) * values)
+
+        # Smooth the valley transitions (sigma 1 reaches 4 rows)
+        halo = 4
+        valley_mask = tiles.array("valley_mask")
+        for tile in tiles.tiles():
+            values = tiles.read(raw_mask, tile, halo=halo, mode="reflect")
+            smoothed = gaussian_filter(values, sigma=1.0)
+            tiles.write(valley_mask, tile, smoothed[halo:-halo])
+
+        del raw_mask
+        tiles.remove("valley_noise")
+        tiles.flush()
+
+        self.valley_mask = valley_mask
+        return valley_mask
+
+    @profiled
+    def generate_heightmap(self, scale: float = 100.0,
+                           rng: Optional[np.random.Generator] = None,
+                           base_noise: Optional[np.ndarray] = None) -> np.ndarray:
         """Generate a heightmap with improved features including deep valleys.
         
         Args:
             scale: Scale factor for noise generation
+            rng: Random generator (defaults to the stage's own stream,
+                see ``stage_rng``)
+            base_noise: Precomputed cylindrical base noise (used by
+                ``generate_progressive``; computed here if omitted)
             
         Returns:
             2D numpy array representing the heightmap
         """
         print(f"Generating heightmap of size {self.size}x{self.size}...")
+        rng = rng if rng is not None else self.stage_rng("generate_heightmap")
 
-        heightmap = np.zeros((self.size, self.size))
-        noise_gen = OpenSimplex(seed=self.seed)
+        if self.tiles is not None:
+            if base_noise is not None:
+                raise ValueError("base_noise is not supported in tiled mode")
+            return self._generate_heightmap_tiled(scale, rng)
 
-        # Constants for cylindrical mapping
-        two_pi = 2 * np.pi
-
-        # Generate base noise with cylindrical mapping for proper wrapping
-        for y in range(self.size):
-            for x in range(self.size):
-                value = 0.0
-                amplitude = 1.0
-                frequency = 1.0
-
-                # Convert grid coordinates to cylindrical coordinates
-                # Map x to longitude (0 to 2π) for east-west wrapping
-                lon = (x / self.size) * two_pi
-
-                # Map y to latitude (-π/2 to π/2) for proper pole distortion
-                lat = ((y / self.size) * np.pi) - (np.pi / 2)
-
-                for _ in range(self.octaves):
-                    # Calculate 3D noise coordinates on a cylinder
-                    nx = np.cos(lon) * scale / frequency
-                    nz = np.sin(lon) * scale / frequency
-                    ny = lat * scale / frequency
-                
-                    # Use 3D noise for better continuity
-                    value += noise_gen.noise3(nx, ny, nz) * amplitude
-                
-                    amplitude *= self.persistence
-                    frequency *= self.lacunarity
-
-                heightmap[y][x] = value
+        if base_noise is not None:
+            heightmap = base_noise
+        else:
+            heightmap = self._base_noise(scale, self.size)
 
         # Normalize to 0-1 range
         min_val = np.min(heightmap)
@@ -320,10 +565,7 @@ class TerrainGenerator:
             continental_mask = self.continental_mask
 
         # Apply the continental mask to influence heightmap
-        for y in range(self.size):
-            for x in range(self.size):
-                # Blend heightmap with continental influence
-                heightmap[y, x] = heightmap[y, x] * 0.4 + continental_mask[y, x] * 0.6
+        heightmap = heightmap * 0.4 + continental_mask * 0.6
 
         # Create valley mask if not already created
         if self.valley_mask is None:
@@ -332,7 +574,8 @@ class TerrainGenerator:
             valley_mask = self.valley_mask
 
         # Apply mountain and valley transformations
-        heightmap = self.apply_mountain_valley_transformation(heightmap, valley_mask)
+        heightmap = self.apply_mountain_valley_transformation(heightmap, valley_mask,
+                                                              rng)
 
         # Enhance coastal areas to ensure proper elevation transitions
         heightmap = self.enhance_coastal_areas(heightmap)
@@ -346,8 +589,209 @@ class TerrainGenerator:
         
         return heightmap
 
+    def _base_noise(self, scale: float, size: int, first_octave: int = 0,
+                    octaves: Optional[int] = None) -> np.ndarray:
+        """Cylindrical base noise of the heightmap on a ``size`` grid.
+
+        Args:
+            scale: Scale factor for noise generation
+            size: Grid size to sample
+            first_octave: First octave to sum
+            octaves: End of the octave band (all octaves if omitted)
+
+        Returns:
+            Summed noise of the octave band
+        """
+        noise_gen = FractalNoise(seed=self.seed)
+        y, x = grid_coordinates(size, size)
+
+        # Generate base noise with cylindrical mapping for proper wrapping:
+        # x maps to longitude (0 to 2π) for east-west wrapping and y to
+        # latitude (-π/2 to π/2), sampled as 3D noise for better continuity
+        return noise_gen.cylindrical(x, y, size, scale,
+                                     octaves=(octaves if octaves is not None
+                                              else self.octaves),
+                                     persistence=self.persistence,
+                                     lacunarity=self.lacunarity,
+                                     first_octave=first_octave,
+                                     dtype=self.dtype)
+
+    def _resolved_octave(self, scale: float, size: int) -> int:
+        """First base noise octave a ``size`` grid can resolve.
+
+        Octave k is sampled at ``scale / lacunarity**k``, so its features are
+        ``size * lacunarity**k / (2π * scale)`` cells apart along the equator.
+        The coarsest octave is always kept.
+
+        Args:
+            scale: Scale factor for noise generation
+            size: Grid size
+
+        Returns:
+            Index of the finest octave with enough samples
+        """
+        first = 0
+        while (first < self.octaves - 1
+               and size * self.lacunarity ** first
+               < NOISE_SAMPLES_PER_UNIT * 2 * np.pi * scale):
+            first += 1
+        return first
+
+    @profiled
+    def generate_progressive(self, levels: Optional[Sequence[int]] = None,
+                             scale: float = 100.0,
+                             continent_size: float = 0.35,
+                             callback=None) -> HeightmapPyramid:
+        """Generate the base terrain coarse to fine as a resolution pyramid.
+
+        The coarsest level is a quick preview. Every finer level reuses the
+        base noise of the level before it (resampled with ``upsample``) and
+        only evaluates the high-frequency octaves the coarser grid could not
+        resolve, then repeats the cheap per-level steps (continental and
+        valley masks, mountain/valley transformation, coastal enhancement) at
+        its own resolution. The last level is the full world; it includes
+        every octave and becomes ``self.heightmap``.
+
+        Args:
+            levels: Grid sizes of the coarser levels (defaults to those of
+                ``PROGRESSIVE_LEVELS`` below the world size)
+            scale: Scale factor for noise generation
+            continent_size: Target land percentage (0.0-1.0)
+            callback: Optional function called with each finished
+                ``PyramidLevel`` as soon as it is ready, coarsest first
+
+        Returns:
+            Pyramid with the heightmap and masks of every level, also kept as
+            ``self.pyramid`` for zoomed rendering
+        """
+        if self.tiles is not None:
+            raise ValueError("Progressive generation is not available in "
+                             "tiled mode")
+        if levels is None:
+            levels = [size for size in PROGRESSIVE_LEVELS if size < self.size]
+        if any(size <= 0 or size > self.size for size in levels):
+            raise ValueError(f"Pyramid levels must be between 1 and the world "
+                             f"size {self.size}, got {list(levels)}")
+        sizes = sorted(set(levels) | {self.size})
+
+        pyramid = HeightmapPyramid()
+        base = None
+        first = self.octaves
+        for size in sizes:
+            print(f"Generating pyramid level {size}x{size}...")
+            if size == self.size:
+                level = self
+            else:
+                level = TerrainGenerator(size=size, octaves=self.octaves,
+                                         persistence=self.persistence,
+                                         lacunarity=self.lacunarity,
+                                         seed=self.seed,
+                                         earth_scale=self.earth_scale,
+                                         backend=self.backend,
+                                         dtype=self.dtype)
+
+            # Add the octaves this level resolves and the coarser one did not
+            band = 0 if level is self else self._resolved_octave(scale, size)
+            detail = (self._base_noise(scale, size, band, first)
+                      if band < first else 0.0)
+            base = detail if base is None else upsample(base, size) + detail
+            first = min(first, band)
+
+            level.create_continental_mask(continent_size)
+            level.generate_valley_mask()
+            level.generate_heightmap(scale, base_noise=base)
+            finished = pyramid.add(level.heightmap, level.continental_mask,
+                                   level.valley_mask)
+            if callback is not None:
+                callback(finished)
+
+        self.pyramid = pyramid
+        return pyramid
+
+    def _generate_heightmap_tiled(self, scale: float,
+                                  rng: np.random.Generator) -> np.ndarray:
+        """Tiled version of ``generate_heightmap`` for out-of-core worlds.
+
+        Every pass streams the tiles from north to south, so the random draws
+        of the mountain/valley transformation happen in the same row-major
+        order as in memory and the result is identical.
+
+        Args:
+            scale: Scale factor for noise generation
+
+        Returns:
+            Memory-mapped heightmap
+        """
+        tiles = self.tiles
+        noise_gen = FractalNoise(seed=self.seed)
+
+        # Base noise with cylindrical mapping for proper wrapping
+        base = tiles.array("heightmap_base")
+        for tile in tiles.tiles():
+            y, x = grid_coordinates(tile.rows, self.size, y_offset=tile.y0)
+            tiles.write(base, tile, noise_gen.cylindrical(
+                x, y, self.size, scale, octaves=self.octaves,
+                persistence=self.persistence, lacunarity=self.lacunarity,
+                dtype=self.dtype))
+        min_val, max_val = tiles.minmax(base)
+
+        if self.continental_mask is None:
+            self.create_continental_mask()
+        if self.valley_mask is None:
+            self.generate_valley_mask()
+
+        # Normalize, then apply the continental mask and the mountain and
+        # valley transformations (all pointwise)
+        transformed = tiles.array("heightmap_transformed")
+        for tile in tiles.tiles():
+            heightmap = (tiles.read(base, tile) - min_val) / (max_val - min_val)
+            heightmap = (heightmap * 0.4
+                         + tiles.read(self.continental_mask, tile) * 0.6)
+            tiles.write(transformed, tile,
+                        self.apply_mountain_valley_transformation(
+                            heightmap, tiles.read(self.valley_mask, tile),
+                            rng))
+        del base
+        tiles.remove("heightmap_base")
+
+        # Coastal plains look up to 15 cells away from each land cell
+        halo = 15
+        varied = tiles.array("heightmap_varied")
+        for tile in tiles.tiles():
+            heightmap = self.enhance_coastal_areas(
+                tiles.read(transformed, tile, halo=halo))[halo:-halo]
+            tiles.write(varied, tile,
+                        self._vary_land_elevation(heightmap, tile.y0))
+        del transformed
+        tiles.remove("heightmap_transformed")
+
+        # Re-normalize the land areas to maintain proper elevation range
+        land_min, land_max = tiles.minmax(varied, select=lambda v: v >= 0)
+        if land_max > land_min:
+            for tile in tiles.tiles():
+                heightmap = tiles.read(varied, tile)
+                land_mask = heightmap >= 0
+                heightmap[land_mask] = (heightmap[land_mask] - land_min) / (land_max - land_min)
+                tiles.write(varied, tile, heightmap)
+
+        # Normalize again
+        min_val, max_val = tiles.minmax(varied)
+        heightmap = tiles.array("heightmap")
+        for tile in tiles.tiles():
+            tiles.write(heightmap, tile,
+                        (tiles.read(varied, tile) - min_val) / (max_val - min_val))
+        del varied
+        tiles.remove("heightmap_varied")
+        tiles.flush()
+
+        self.heightmap = heightmap
+        return heightmap
+
+    @profiled
     def apply_mountain_valley_transformation(self, heightmap: np.ndarray, 
-                                             valley_mask: np.ndarray) -> np.ndarray:
+                                             valley_mask: np.ndarray,
+                                             rng: Optional[np.random.Generator] = None
+                                             ) -> np.ndarray:
         """Apply mountain and valley transformations to create dramatic terrain.
         
         Creates realistic terrain with tallest peaks ~10% higher than Everest (~9,700m)
@@ -356,10 +800,14 @@ class TerrainGenerator:
         Args:
             heightmap: Original heightmap
             valley_mask: Mask indicating where valleys should form
+            rng: Random generator for the highland jitter (defaults to the
+                ``generate_heightmap`` stream)
             
         Returns:
             Transformed heightmap with mountains and valleys
         """
+        rng = rng if rng is not None else self.stage_rng("generate_heightmap")
+
         # Create a copy of the heightmap to modify
         transformed = heightmap.copy()
         
@@ -373,93 +821,86 @@ class TerrainGenerator:
         mountain_start = 0.75     # Mountains begin = 2500m+
         high_peaks = 0.9          # High peaks = 5000m+
         
-        # Apply height transformation for varied terrain features
-        for y in range(self.size):
-            for x in range(self.size):
-                h = heightmap[y, x]
-                valley_factor = valley_mask[y, x]
-
-                if h < sea_level:
-                    # Ocean depths - get deeper gradually
-                    normalized_depth = h / sea_level
-                    transformed[y, x] = -0.3 * (1.0 - normalized_depth**2)
-                
-                elif h < coastal_plain:
-                    # Coastal plains (0-100m) - very gradual rise from shoreline
-                    normalized_h = (h - sea_level) / (coastal_plain - sea_level)
-                    transformed[y, x] = 0.01 + (normalized_h * 0.03)
-                    
-                elif h < lowland:
-                    # Lowlands and plains (100-500m)
-                    normalized_h = (h - coastal_plain) / (lowland - coastal_plain)
-                    base_height = 0.04 + (normalized_h * 0.1)
-                    
-                    # Apply valley effects if needed - can create below sea level depressions
-                    if valley_factor > 0.3:
-                        # Deep valleys can go below sea level (-440m × 1.1 = ~ -480m)
-                        valley_depth = valley_factor * 0.15  
-                        transformed[y, x] = base_height - valley_depth
-                    elif valley_factor > 0.1:
-                        # Shallow valleys
-                        valley_depth = valley_factor * 0.05
-                        transformed[y, x] = base_height - valley_depth
-                    else:
-                        # Normal terrain with subtle variations
-                        variation = np.sin(normalized_h * 5.0 * np.pi) * 0.02
-                        transformed[y, x] = base_height + variation
-                
-                elif h < hills:
-                    # Hills (500-1500m)
-                    normalized_h = (h - lowland) / (hills - lowland)
-                    base_height = 0.14 + (normalized_h * 0.12)
-                    
-                    if valley_factor > 0.2:
-                        valley_depth = valley_factor * 0.12
-                        transformed[y, x] = base_height - valley_depth
-                    else:
-                        variation = np.sin(normalized_h * 4.0 * np.pi) * 0.03
-                        transformed[y, x] = base_height + variation
-                
-                elif h < highlands:
-                    # Highlands (1500-2500m)
-                    normalized_h = (h - hills) / (highlands - hills)
-                    base_height = 0.26 + (normalized_h * 0.14)
-                    
-                    if valley_factor > 0.15:
-                        valley_depth = valley_factor * 0.15
-                        transformed[y, x] = base_height - valley_depth
-                    else:
-                        transformed[y, x] = base_height + np.random.random() * 0.02
-                
-                elif h < mountain_start:
-                    # Mountain foothills (2500-4000m)
-                    normalized_h = (h - highlands) / (mountain_start - highlands)
-                    base_height = 0.4 + (normalized_h * 0.15)
-                    
-                    if valley_factor > 0.1:
-                        # Mountain valleys
-                        valley_depth = valley_factor * 0.2
-                        transformed[y, x] = base_height - valley_depth
-                    else:
-                        transformed[y, x] = base_height
-                
-                elif h < high_peaks:
-                    # Mountains (4000-7000m)
-                    normalized_h = (h - mountain_start) / (high_peaks - mountain_start)
-                    transformed[y, x] = 0.55 + normalized_h * 0.25
-                
-                else:
-                    # Highest peaks (7000-9700m) - ~10% higher than Everest
-                    normalized_h = (h - high_peaks) / (1.0 - high_peaks)
-                    transformed[y, x] = 0.8 + normalized_h * 0.2
-                    
-                    # Add extra height to the tallest 2% for exceptional peaks
-                    if h > 0.98:
-                        bonus_height = (h - 0.98) / 0.02  # Normalize 0.98-1.0 to 0-1
-                        transformed[y, x] += bonus_height * 0.05  # Additional 5% height
+        h = heightmap
+        valley_factor = valley_mask
+
+        # Ocean depths - get deeper gradually
+        cells = h < sea_level
+        normalized_depth = h[cells] / sea_level
+        transformed[cells] = -0.3 * (1.0 - normalized_depth**2)
+
+        # Coastal plains (0-100m) - very gradual rise from shoreline
+        cells = (h >= sea_level) & (h < coastal_plain)
+        normalized_h = (h[cells] - sea_level) / (coastal_plain - sea_level)
+        transformed[cells] = 0.01 + (normalized_h * 0.03)
+
+        # Lowlands and plains (100-500m)
+        cells = (h >= coastal_plain) & (h < lowland)
+        normalized_h = (h[cells] - coastal_plain) / (lowland - coastal_plain)
+        base_height = 0.04 + (normalized_h * 0.1)
+        valley = valley_factor[cells]
+        transformed[cells] = np.select(
+            [valley > 0.3, valley > 0.1],
+            [
+                # Deep valleys can go below sea level (-440m × 1.1 = ~ -480m)
+                base_height - valley * 0.15,
+                # Shallow valleys
+                base_height - valley * 0.05,
+            ],
+            # Normal terrain with subtle variations
+            base_height + np.sin(normalized_h * 5.0 * np.pi) * 0.02)
+
+        # Hills (500-1500m)
+        cells = (h >= lowland) & (h < hills)
+        normalized_h = (h[cells] - lowland) / (hills - lowland)
+        base_height = 0.14 + (normalized_h * 0.12)
+        valley = valley_factor[cells]
+        transformed[cells] = np.where(
+            valley > 0.2, base_height - valley * 0.12,
+            base_height + np.sin(normalized_h * 4.0 * np.pi) * 0.03)
+
+        # Highlands (1500-2500m)
+        cells = (h >= hills) & (h < highlands)
+        normalized_h = (h[cells] - hills) / (highlands - hills)
+        base_height = 0.26 + (normalized_h * 0.14)
+        valley = valley_factor[cells]
+        in_valley = valley > 0.15
+        highland = np.empty_like(base_height)
+        highland[in_valley] = base_height[in_valley] - valley[in_valley] * 0.15
+        # Random jitter drawn in row-major order, one value per cell
+        highland[~in_valley] = (base_height[~in_valley]
+                                + rng.random(np.count_nonzero(~in_valley),
+                                             dtype=highland.dtype)
+                                * 0.02)
+        transformed[cells] = highland
+
+        # Mountain foothills (2500-4000m)
+        cells = (h >= highlands) & (h < mountain_start)
+        normalized_h = (h[cells] - highlands) / (mountain_start - highlands)
+        base_height = 0.4 + (normalized_h * 0.15)
+        valley = valley_factor[cells]
+        # Mountain valleys
+        transformed[cells] = np.where(valley > 0.1,
+                                      base_height - valley * 0.2, base_height)
+
+        # Mountains (4000-7000m)
+        cells = (h >= mountain_start) & (h < high_peaks)
+        normalized_h = (h[cells] - mountain_start) / (high_peaks - mountain_start)
+        transformed[cells] = 0.55 + normalized_h * 0.25
+
+        # Highest peaks (7000-9700m) - ~10% higher than Everest
+        cells = h >= high_peaks
+        normalized_h = (h[cells] - high_peaks) / (1.0 - high_peaks)
+        peaks = 0.8 + normalized_h * 0.2
+        # Add extra height to the tallest 2% for exceptional peaks
+        exceptional = h[cells] > 0.98
+        bonus_height = (h[cells][exceptional] - 0.98) / 0.02  # Normalize 0.98-1.0 to 0-1
+        peaks[exceptional] += bonus_height * 0.05  # Additional 5% height
+        transformed[cells] = peaks
 
         return transformed
 
+    @profiled
     def enhance_coastal_areas(self, heightmap: np.ndarray) -> np.ndarray:
         """Create realistic coastal plains extending from shorelines.
         
@@ -471,55 +912,52 @@ class TerrainGenerator:
         """
         enhanced = heightmap.copy()
         ocean_mask = heightmap < 0
-        
-        # For each land cell, check distance to nearest ocean
-        for y in range(self.size):
-            for x in range(self.size):
-                if heightmap[y, x] <= 0:  # Skip ocean
-                    continue
-                    
-                # Look for nearby ocean
-                min_dist = float('inf')
-                for r in range(1, 20):  # Check up to 20 cells away
-                    found_ocean = False
-                    
-                    # Check cells at distance r
-                    for angle in range(0, 360, 10):
-                        rads = np.radians(angle)
-                        dy = int(r * np.sin(rads))
-                        dx = int(r * np.cos(rads))
-                        
-                        ny = max(0, min(self.size-1, y+dy))
-                        nx = (x+dx) % self.size
-                        
-                        if heightmap[ny, nx] < 0:  # Found ocean
-                            found_ocean = True
-                            min_dist = r
-                            break
-                    
-                    if found_ocean:
-                        break
-                
-                # If within 15 cells of coast, apply coastal plain effect
-                if min_dist <= 15:
-                    # Calculate elevation based on distance from coast
-                    # Closer to coast = lower elevation
-                    coastal_factor = 1.0 - (min_dist / 15.0)
-                    
-                    # Maximum height reduction (when right next to coast)
-                    max_reduction = enhanced[y, x] * 0.8  # Reduce height by up to 80%
-                    
-                    # Apply height reduction, stronger near coast
-                    reduction = max_reduction * (coastal_factor ** 2)  # Squared for faster falloff
-                    enhanced[y, x] -= reduction
-                    
-                    # Ensure minimum elevation for coastal plains (very subtle rise from shore)
-                    if min_dist <= 3:
-                        # First 3 cells from shore have very low elevation
-                        enhanced[y, x] = min(enhanced[y, x], 0.02 + (min_dist * 0.01))
-        
+        rows = heightmap.shape[0]
+        row_index = np.arange(rows)
+
+        # Distance (in rings of radius r) from each cell to the nearest ocean,
+        # sampling every 10 degrees around each ring. Rings beyond 15 cells
+        # have no effect on the coastal plain.
+        min_dist = np.zeros(heightmap.shape, dtype=np.int64)
+        found_ocean = np.zeros(heightmap.shape, dtype=bool)
+        for r in range(1, 16):
+            ring_offsets = set()
+            for angle in range(0, 360, 10):
+                rads = np.radians(angle)
+                ring_offsets.add((int(r * np.sin(rads)), int(r * np.cos(rads))))
+
+            ring_has_ocean = np.zeros(heightmap.shape, dtype=bool)
+            for dy, dx in ring_offsets:
+                # Clamp y (latitude) and wrap x (longitude)
+                shifted = ocean_mask[np.clip(row_index + dy, 0, rows - 1)]
+                ring_has_ocean |= np.roll(shifted, -dx, axis=1)
+
+            min_dist[ring_has_ocean & ~found_ocean] = r
+            found_ocean |= ring_has_ocean
+
+        # Land cells within 15 cells of coast get the coastal plain effect
+        cells = (heightmap > 0) & found_ocean
+        dist = min_dist[cells].astype(enhanced.dtype)
+        land = enhanced[cells]
+
+        # Closer to coast = lower elevation
+        coastal_factor = 1.0 - (dist / 15.0)
+
+        # Maximum height reduction (when right next to coast) is 80%,
+        # squared for faster falloff
+        max_reduction = land * 0.8
+        reduction = max_reduction * (coastal_factor ** 2)
+        land -= reduction
+
+        # First 3 cells from shore have very low elevation
+        near_shore = dist <= 3
+        land[near_shore] = np.minimum(land[near_shore],
+                                      0.02 + (dist[near_shore] * 0.01))
+        enhanced[cells] = land
+
         return enhanced
 
+    @profiled
     def add_terrain_variation(self, heightmap: np.ndarray) -> np.ndarray:
         """Add natural elevation variation across continents.
         
@@ -531,39 +969,8 @@ class TerrainGenerator:
         Returns:
             Heightmap with improved elevation variation
         """
-        varied = heightmap.copy()
-        
-        # Use large-scale noise for broad elevation patterns
-        large_scale_noise = OpenSimplex(seed=self.seed + 200)
-        
-        for y in range(self.size):
-            for x in range(self.size):
-                # Skip ocean
-                if heightmap[y, x] < 0:
-                    continue
-                    
-                # Get large-scale noise value for this location
-                nx = x / (self.size / 2)  # Very large scale
-                ny = y / (self.size / 2)
-                noise_val = large_scale_noise.noise2(nx, ny)
-                
-                # Add medium-scale variation
-                nx2 = x / (self.size / 8)
-                ny2 = y / (self.size / 8)
-                medium_noise = large_scale_noise.noise2(nx2, ny2) * 0.3
-                
-                # Combine noise values
-                combined_noise = noise_val * 0.7 + medium_noise * 0.3
-                
-                # Use noise to create broad elevation variations
-                # Keep coastal areas low regardless
-                if heightmap[y, x] < 0.2:
-                    # Minimal adjustment near coasts
-                    varied[y, x] += combined_noise * 0.03
-                else:
-                    # Larger adjustments inland
-                    varied[y, x] += combined_noise * 0.1
-        
+        varied = self._vary_land_elevation(heightmap)
+
         # Re-normalize the land areas to maintain proper elevation range
         land_mask = varied >= 0
         if np.any(land_mask):
@@ -576,6 +983,49 @@ class TerrainGenerator:
         
         return varied
 
+    def _vary_land_elevation(self, heightmap: np.ndarray,
+                             y_offset: int = 0) -> np.ndarray:
+        """Add broad noise-driven elevation changes to land cells.
+
+        Args:
+            heightmap: Heightmap rows to vary
+            y_offset: Global index of the first row
+
+        Returns:
+            Varied heightmap (not yet re-normalized)
+        """
+        varied = heightmap.copy()
+
+        # Use large-scale noise for broad elevation patterns
+        large_scale_noise = FractalNoise(seed=self.seed + 200)
+
+        # Only land cells are varied (skip ocean)
+        ys, xs = np.nonzero(heightmap >= 0)
+        noise_ys = ys + y_offset
+
+        # Get large-scale noise value for each location
+        noise_val = large_scale_noise.noise2(xs / (self.size / 2),  # Very large scale
+                                             noise_ys / (self.size / 2),
+                                             dtype=varied.dtype)
+
+        # Add medium-scale variation
+        medium_noise = large_scale_noise.noise2(xs / (self.size / 8),
+                                                noise_ys / (self.size / 8),
+                                                dtype=varied.dtype) * 0.3
+
+        # Combine noise values
+        combined_noise = noise_val * 0.7 + medium_noise * 0.3
+
+        # Use noise to create broad elevation variations
+        # Keep coastal areas low regardless: minimal adjustment near coasts,
+        # larger adjustments inland
+        coastal = heightmap[ys, xs] < 0.2
+        varied[ys, xs] += np.where(coastal, combined_noise * 0.03,
+                                   combined_noise * 0.1)
+
+        return varied
+
+    @profiled
     def smooth_mountain_slopes(self, heightmap: np.ndarray) -> np.ndarray:
         """Apply smoothing to mountain slopes while preserving peaks.
         
@@ -587,13 +1037,34 @@ class TerrainGenerator:
         Returns:
             Heightmap with smoother mountain slopes
         """
+        return self._smooth_slope_rows(heightmap, 0)
+
+    def _smooth_slope_rows(self, heightmap: np.ndarray, y0: int) -> np.ndarray:
+        """Smooth mountain slopes in a band of rows starting at row ``y0``.
+
+        Only cells whose 8 neighbours are inside the band are smoothed, and
+        they may change their neighbours, so a tile read with a halo of 2
+        rows comes out exact in all rows but the outer 2 on each side.
+
+        Args:
+            heightmap: Heightmap rows (the whole heightmap if ``y0`` is 0
+                and it has ``size`` rows)
+            y0: World row of the first row (negative for halo rows beyond
+                the north pole)
+
+        Returns:
+            Smoothed rows
+        """
         smoothed = heightmap.copy()
         
         # Only smooth areas above certain elevation (mountains)
         mountain_mask = heightmap > 0.6
         
-        # For each mountain cell, apply a directional smoothing
-        for y in range(1, self.size-1):
+        # For each mountain cell away from the map edges, apply a
+        # directional smoothing
+        first_row = max(1, 1 - y0)
+        last_row = min(heightmap.shape[0] - 1, self.size - 1 - y0)
+        for y in range(first_row, last_row):
             for x in range(1, self.size-1):
                 if not mountain_mask[y, x]:
                     continue
@@ -605,8 +1076,10 @@ class TerrainGenerator:
                         if dy == 0 and dx == 0:
                             continue
                             
-                        ny = max(0, min(self.size-1, y+dy))
-                        nx = (x+dx) % self.size
+                        # Away from the edges no neighbour is clamped or
+                        # wrapped
+                        ny = y + dy
+                        nx = x + dx
                         
                         if heightmap[ny, nx] < heightmap[y, x]:
                             neighbors.append((ny, nx, heightmap[ny, nx]))
@@ -630,6 +1103,7 @@ class TerrainGenerator:
         
         return smoothed
 
+    @profiled
     def add_mountains(self, mountain_scale: float = 1.2,
                      peak_threshold: float = 0.6,
                      epic_factor: float = 1.8) -> np.ndarray:
@@ -648,36 +1122,14 @@ class TerrainGenerator:
 
         print(f"Adding mountain ranges (epic factor: {epic_factor:.1f})...")
 
+        if self.tiles is not None:
+            return self._add_mountains_tiled(mountain_scale, peak_threshold,
+                                             epic_factor)
+
         # Generate a mountain mask using different noise parameters
-        mountain_mask = np.zeros((self.size, self.size))
         mountain_seed = self.seed + 1000
-        mountain_noise = OpenSimplex(seed=mountain_seed)
-
-        # Generate ridge-like mountain patterns
-        for y in range(self.size):
-            for x in range(self.size):
-                # Different scales for more dramatic mountains
-                nx = x / 200
-                ny = y / 200
-                
-                # Ridge noise algorithm - creates elongated ranges
-                ridged_value = 0.0
-                amplitude = 1.0
-                frequency = 1.0
-                
-                for _ in range(3):
-                    # Generate basic noise
-                    n = mountain_noise.noise2(nx * frequency, ny * frequency)
-                    # Convert to ridged noise (1 - abs(n))
-                    n = 1.0 - abs(n)
-                    # Square to sharpen ridges
-                    n *= n
-                    ridged_value += n * amplitude
-                    
-                    amplitude *= 0.55
-                    frequency *= 2.5
-                    
-                mountain_mask[y][x] = ridged_value
+        mountain_noise = FractalNoise(seed=mountain_seed)
+        mountain_mask = self._mountain_noise(mountain_noise, 0, self.size)
 
         # Normalize mountain mask
         mountain_mask = (mountain_mask - np.min(mountain_mask)) / (
@@ -686,48 +1138,12 @@ class TerrainGenerator:
         # Use the valley mask to ensure mountains and valleys are correctly positioned
         valley_influence = np.zeros_like(mountain_mask)
         if self.valley_mask is not None:
-            # Enhance mountains adjacent to valleys
-            for y in range(self.size):
-                for x in range(self.size):
-                    # Look for valley edges
-                    is_valley_edge = False
-                    if self.valley_mask[y, x] > 0.1:
-                        continue  # Skip valley centers
-                        
-                    # Check if near a valley
-                    for dy in range(-3, 4):
-                        for dx in range(-3, 4):
-                            ny = max(0, min(self.size - 1, y + dy))
-                            nx = (x + dx) % self.size
-                            
-                            if self.valley_mask[ny, nx] > 0.3:
-                                is_valley_edge = True
-                                break
-                        if is_valley_edge:
-                            break
-                            
-                    if is_valley_edge:
-                        # Boost mountains near valleys for dramatic relief
-                        valley_influence[y, x] = 0.3
+            valley_influence = self._valley_influence(self.valley_mask)
 
         # Apply mountains where the mask exceeds the threshold
-        mountain_terrain = self.heightmap.copy()
-        mountain_areas = mountain_mask > peak_threshold
-
-        # First apply basic mountain height increase
-        mountain_terrain[mountain_areas] += (
-            mountain_scale * (mountain_mask[mountain_areas] - peak_threshold))
-
-        # Add enhanced peaks more selectively
-        high_peaks = ((mountain_mask > peak_threshold + 0.25) &  # Selective peaks
-                      (mountain_terrain > 0.7))
-
-        # Apply valley-influenced enhancement
-        for y in range(self.size):
-            for x in range(self.size):
-                if mountain_areas[y, x]:
-                    # Extra height near valleys for dramatic relief
-                    mountain_terrain[y, x] += valley_influence[y, x]
+        mountain_terrain, high_peaks = self._raise_mountains(
+            self.heightmap, mountain_mask, valley_influence, mountain_scale,
+            peak_threshold)
 
         # Create epic peaks
         if np.any(high_peaks):
@@ -745,25 +1161,16 @@ class TerrainGenerator:
                 epic_peaks[high_peaks] = mountain_terrain[high_peaks] >= peak_threshold_value
 
                 # Apply the epic height increase only to these selected peaks
-                peak_height = mountain_terrain[epic_peaks]
-                mountain_terrain[epic_peaks] = peak_height + (epic_factor * (peak_height - 0.7) ** 2)
+                self._raise_epic_peaks(mountain_terrain, epic_peaks, epic_factor)
             
                 print(f"Created {np.sum(epic_peaks)} major mountain peaks out of {peak_count} candidates")
             else:
                 # If we have very few peaks, keep them all
-                peak_height = mountain_terrain[high_peaks]
-                mountain_terrain[high_peaks] = peak_height + (epic_factor * (peak_height - 0.7) ** 2)
+                self._raise_epic_peaks(mountain_terrain, high_peaks, epic_factor)
 
         # Add crags and ridges (small high-frequency variations)
-        crag_noise = OpenSimplex(seed=mountain_seed + 500)
-        for y in range(self.size):
-            for x in range(self.size):
-                if mountain_terrain[y, x] > 0.6:  # Only add detail to mountains
-                    nx = x / 20  # Higher frequency for small details
-                    ny = y / 20
-                    # Small, sharp variations
-                    crag_value = crag_noise.noise2(nx, ny) * 0.05 * epic_factor
-                    mountain_terrain[y, x] += crag_value
+        crag_noise = FractalNoise(seed=mountain_seed + 500)
+        self._add_crags(mountain_terrain, crag_noise, 0, epic_factor)
 
         # Apply slope smoothing to create more gradual transitions
         mountain_terrain = self.smooth_mountain_slopes(mountain_terrain)
@@ -781,7 +1188,133 @@ class TerrainGenerator:
         ocean[~ocean_mask] = 0
         min_ocean = np.min(ocean) if np.any(ocean_mask) else 0
         
-        # Normalize separately to maintain structure
+        mountain_terrain = self._normalize_land_and_ocean(mountain_terrain,
+                                                          max_land, min_ocean)
+        
+        self.heightmap = mountain_terrain
+        return mountain_terrain
+
+    def _mountain_noise(self, mountain_noise: FractalNoise, y0: int,
+                        rows: int) -> np.ndarray:
+        """Raw mountain noise for rows ``[y0, y0 + rows)``.
+
+        Args:
+            mountain_noise: Mountain noise generator
+            y0: First row
+            rows: Number of rows
+
+        Returns:
+            Un-normalized mountain noise of shape (rows, size)
+        """
+        y, x = grid_coordinates(rows, self.size, y_offset=y0)
+
+        # Generate ridge-like mountain patterns: ridged noise (1 - abs(n)),
+        # squared to sharpen ridges, creates elongated ranges
+        # Different scales for more dramatic mountains
+        return mountain_noise.fractal2(x / 200, y / 200, octaves=3,
+                                       persistence=0.55, lacunarity=2.5,
+                                       ridged=True, dtype=self.dtype)
+
+    def _valley_influence(self, valley_mask: np.ndarray,
+                          halo: int = 0) -> np.ndarray:
+        """Mountain boost next to valleys.
+
+        Cells outside valley centers with a valley within 3 cells (rows
+        clamped at the poles, columns wrapped) are valley edges.
+
+        Args:
+            valley_mask: Valley mask, with ``halo`` extra rows (at least 3)
+                above and below when it is a tile
+            halo: Number of halo rows of ``valley_mask``
+
+        Returns:
+            Valley influence of the rows without the halo
+        """
+        near_valley = maximum_filter(valley_mask > 0.3, size=7,
+                                     mode=("nearest", "wrap"))
+        valley_mask = valley_mask[halo:valley_mask.shape[0] - halo]
+        near_valley = near_valley[halo:near_valley.shape[0] - halo]
+        is_valley_edge = near_valley & (valley_mask <= 0.1)
+
+        # Boost mountains near valleys for dramatic relief
+        valley_influence = np.zeros(valley_mask.shape, dtype=self.dtype)
+        valley_influence[is_valley_edge] = 0.3
+        return valley_influence
+
+    def _raise_mountains(self, heightmap: np.ndarray,
+                         mountain_mask: np.ndarray,
+                         valley_influence: np.ndarray, mountain_scale: float,
+                         peak_threshold: float
+                         ) -> Tuple[np.ndarray, np.ndarray]:
+        """Raise the terrain where the mountain mask exceeds the threshold.
+
+        Args:
+            heightmap: Heightmap (or tile of it)
+            mountain_mask: Normalized mountain mask
+            valley_influence: Extra height next to valleys
+            mountain_scale: Height scale for mountains
+            peak_threshold: Elevation threshold for mountain features
+
+        Returns:
+            Tuple of (raised terrain, candidate peak mask)
+        """
+        mountain_terrain = heightmap.copy()
+        mountain_areas = mountain_mask > peak_threshold
+
+        # First apply basic mountain height increase
+        mountain_terrain[mountain_areas] += (
+            mountain_scale * (mountain_mask[mountain_areas] - peak_threshold))
+
+        # Add enhanced peaks more selectively
+        high_peaks = ((mountain_mask > peak_threshold + 0.25) &  # Selective peaks
+                      (mountain_terrain > 0.7))
+
+        # Extra height near valleys for dramatic relief
+        mountain_terrain[mountain_areas] += valley_influence[mountain_areas]
+        return mountain_terrain, high_peaks
+
+    @staticmethod
+    def _raise_epic_peaks(mountain_terrain: np.ndarray, peaks: np.ndarray,
+                          epic_factor: float) -> None:
+        """Raise the selected peaks in place, the higher the more."""
+        peak_height = mountain_terrain[peaks]
+        mountain_terrain[peaks] = peak_height + (epic_factor * (peak_height - 0.7) ** 2)
+
+    def _add_crags(self, mountain_terrain: np.ndarray, crag_noise: FractalNoise,
+                   y0: int, epic_factor: float) -> None:
+        """Add small high-frequency variations to mountains in place.
+
+        Args:
+            mountain_terrain: Terrain rows starting at row ``y0``
+            crag_noise: Crag noise generator
+            y0: First row
+            epic_factor: Multiplier for dramatic mountain features
+        """
+        ys, xs = np.nonzero(mountain_terrain > 0.6)  # Only add detail to mountains
+        # Small, sharp variations at higher frequency for small details
+        crag_value = crag_noise.noise2(xs / 20, (ys + y0) / 20,
+                                       dtype=self.dtype) * 0.05 * epic_factor
+        mountain_terrain[ys, xs] += crag_value
+
+    @staticmethod
+    def _normalize_land_and_ocean(mountain_terrain: np.ndarray, max_land,
+                                  min_ocean) -> np.ndarray:
+        """Normalize land and ocean separately to maintain the structure.
+
+        Args:
+            mountain_terrain: Terrain (or tile of it)
+            max_land: Highest land elevation of the whole world
+            min_ocean: Lowest ocean elevation of the whole world
+
+        Returns:
+            Terrain with land scaled to at most 1 and oceans to -0.5
+        """
+        ocean_mask = mountain_terrain < 0
+        land = mountain_terrain.copy()
+        land[ocean_mask] = 0
+        ocean = mountain_terrain.copy()
+        ocean[~ocean_mask] = 0
+
         if max_land > 1.0:
             land = land / max_land
             
@@ -789,14 +1322,107 @@ class TerrainGenerator:
             ocean = ocean / (2 * abs(min_ocean)) * (-0.5)
             
         # Combine normalized land and ocean
-        mountain_terrain = np.zeros_like(mountain_terrain)
-        mountain_terrain[~ocean_mask] = land[~ocean_mask]
-        mountain_terrain[ocean_mask] = ocean[ocean_mask]
-        
-        self.heightmap = mountain_terrain
-        return mountain_terrain
-        
-    def add_ridges_and_canyons(self, ridge_count: int = 15, canyon_count: int = 10) -> np.ndarray:
+        normalized = np.zeros_like(mountain_terrain)
+        normalized[~ocean_mask] = land[~ocean_mask]
+        normalized[ocean_mask] = ocean[ocean_mask]
+        return normalized
+
+    def _add_mountains_tiled(self, mountain_scale: float,
+                             peak_threshold: float,
+                             epic_factor: float) -> np.ndarray:
+        """Tiled version of ``add_mountains`` for out-of-core worlds.
+
+        Args:
+            mountain_scale: Height scale for mountains
+            peak_threshold: Elevation threshold for mountain features
+            epic_factor: Multiplier for dramatic mountain features
+
+        Returns:
+            Memory-mapped heightmap with enhanced mountain features
+        """
+        tiles = self.tiles
+        heightmap = self.heightmap
+        mountain_seed = self.seed + 1000
+        mountain_noise = FractalNoise(seed=mountain_seed)
+
+        mountain_mask = tiles.array("mountain_mask")
+        for tile in tiles.tiles():
+            tiles.write(mountain_mask, tile,
+                        self._mountain_noise(mountain_noise, tile.y0, tile.rows))
+        min_val, max_val = tiles.minmax(mountain_mask)
+
+        # Raise the mountains; candidate peaks keep their height in a
+        # separate array (nan elsewhere) for the peak percentile. The valley
+        # edge search looks 3 rows away.
+        halo = 3
+        terrain = tiles.array("mountain_terrain")
+        peaks = tiles.array("mountain_peaks")
+        peak_count = 0
+        for tile in tiles.tiles():
+            mask = (tiles.read(mountain_mask, tile) - min_val) / (max_val - min_val)
+            if self.valley_mask is not None:
+                valley_influence = self._valley_influence(
+                    tiles.read(self.valley_mask, tile, halo=halo), halo)
+            else:
+                valley_influence = np.zeros_like(mask)
+            values, high_peaks = self._raise_mountains(
+                tiles.read(heightmap, tile), mask, valley_influence,
+                mountain_scale, peak_threshold)
+            tiles.write(terrain, tile, values)
+            tiles.write(peaks, tile, np.where(high_peaks, values, np.nan))
+            peak_count += int(np.count_nonzero(high_peaks))
+        del mountain_mask
+        tiles.remove("mountain_mask")
+
+        # Keep about 20% of the highest peaks for truly epic mountains (all
+        # of them if there are very few)
+        peak_threshold_value = -np.inf
+        if peak_count > 10:
+            peak_threshold_value = tiles.percentile(peaks, 80,
+                                                    select=np.isfinite)
+
+        crag_noise = FractalNoise(seed=mountain_seed + 500)
+        epic_count = 0
+        for tile in tiles.tiles():
+            values = tiles.read(terrain, tile)
+            epic_peaks = tiles.read(peaks, tile) >= peak_threshold_value
+            self._raise_epic_peaks(values, epic_peaks, epic_factor)
+            epic_count += int(np.count_nonzero(epic_peaks))
+            self._add_crags(values, crag_noise, tile.y0, epic_factor)
+            tiles.write(terrain, tile, values)
+        del peaks
+        tiles.remove("mountain_peaks")
+        if peak_count > 10:
+            print(f"Created {epic_count} major mountain peaks out of {peak_count} candidates")
+
+        # Slope smoothing reads the neighbours of the neighbours of a tile
+        halo = 2
+        smoothed = tiles.array("mountain_smoothed")
+        max_land = 0
+        min_ocean = 0
+        for tile in tiles.tiles():
+            values = self._smooth_slope_rows(
+                tiles.read(terrain, tile, halo=halo), tile.y0 - halo)[halo:-halo]
+            max_land = max(max_land, np.max(np.where(values < 0, 0, values)))
+            min_ocean = min(min_ocean, np.min(np.where(values < 0, values, 0)))
+            tiles.write(smoothed, tile, values)
+        del terrain
+        tiles.remove("mountain_terrain")
+
+        # Renormalize into the heightmap, maintaining ocean depths as negative
+        for tile in tiles.tiles():
+            tiles.write(heightmap, tile, self._normalize_land_and_ocean(
+                tiles.read(smoothed, tile), max_land, min_ocean))
+        del smoothed
+        tiles.remove("mountain_smoothed")
+        tiles.flush()
+
+        self.heightmap = heightmap
+        return heightmap
+
+    @profiled
+    def add_ridges_and_canyons(self, ridge_count: int = 15, canyon_count: int = 10,
+                               rng: Optional[np.random.Generator] = None) -> np.ndarray:
         """Add dramatic ridge lines and canyon features to the terrain.
         
         Creates linear features that enhance the dramatic relief of the terrain.
@@ -804,12 +1430,16 @@ class TerrainGenerator:
         Args:
             ridge_count: Number of major ridge features
             canyon_count: Number of major canyon features
+            rng: Random generator (defaults to the stage's own stream,
+                see ``stage_rng``)
             
         Returns:
             Updated heightmap with ridge and canyon features
         """
         if self.heightmap is None:
             raise ValueError("Heightmap must be generated before adding features")
+        self._require_in_memory("Ridges and canyons")
+        rng = rng if rng is not None else self.stage_rng("add_ridges_and_canyons")
             
         print(f"Adding {ridge_count} major ridges and {canyon_count} canyons...")
         
@@ -821,18 +1451,18 @@ class TerrainGenerator:
             """Generate a curved line with given length and curviness."""
             # Random starting point (away from edges)
             border = self.size // 10
-            y = np.random.randint(border, self.size - border)
-            x = np.random.randint(border, self.size - border)
+            y = rng.integers(border, self.size - border)
+            x = rng.integers(border, self.size - border)
             
             # Random direction (in radians)
-            direction = np.random.random() * 2 * np.pi
+            direction = rng.random() * 2 * np.pi
             
             points = [(y, x)]
             
             # Generate each segment
             for _ in range(length):
                 # Add some random variation to direction
-                direction += (np.random.random() - 0.5) * curviness
+                direction += (rng.random() - 0.5) * curviness
                 
                 # Calculate new position
                 dy = np.sin(direction) * 1.5  # Step size
@@ -848,7 +1478,7 @@ class TerrainGenerator:
         # Add ridge lines (elevated features)
         for _ in range(ridge_count):
             # Random length between 50 and 200 cells
-            length = np.random.randint(50, 200)
+            length = rng.integers(50, 200)
             ridge_points = generate_curve_points(length, curviness=0.4)
             
             # Ridges only appear on land
@@ -862,7 +1492,7 @@ class TerrainGenerator:
                 continue
                 
             # Random ridge height (higher for more dramatic effect)
-            ridge_height = np.random.uniform(0.1, 0.25)
+            ridge_height = rng.uniform(0.1, 0.25)
             
             # Apply ridge with falloff
             for y, x in ridge_points:
@@ -893,7 +1523,7 @@ class TerrainGenerator:
         # Add canyon features (depressed lines)
         for _ in range(canyon_count):
             # Random length between 30 and 150 cells
-            length = np.random.randint(30, 150)
+            length = rng.integers(30, 150)
             canyon_points = generate_curve_points(length, curviness=0.3)
             
             # Canyons only appear on land of certain elevation
@@ -907,7 +1537,7 @@ class TerrainGenerator:
                 continue
                 
             # Random canyon depth
-            canyon_depth = np.random.uniform(0.1, 0.3)
+            canyon_depth = rng.uniform(0.1, 0.3)
             
             # Apply canyon with falloff
             for y, x in canyon_points:
@@ -949,19 +1579,25 @@ class TerrainGenerator:
         self.heightmap = enhanced_map
         return enhanced_map
         
-    def add_plateaus(self, count: int = 8) -> np.ndarray:
+    @profiled
+    def add_plateaus(self, count: int = 8,
+                     rng: Optional[np.random.Generator] = None) -> np.ndarray:
         """Add plateau features to the terrain for more diverse landscapes.
         
         Creates flat-topped elevated areas typical of mesas and tablelands.
         
         Args:
             count: Number of plateau features to add
+            rng: Random generator (defaults to the stage's own stream,
+                see ``stage_rng``)
             
         Returns:
             Updated heightmap with plateau features
         """
         if self.heightmap is None:
             raise ValueError("Heightmap must be generated before adding plateaus")
+        self._require_in_memory("Plateaus")
+        rng = rng if rng is not None else self.stage_rng("add_plateaus")
             
         print(f"Adding {count} plateau features...")
         
@@ -974,8 +1610,8 @@ class TerrainGenerator:
         
         # Look for suitable flat-ish regions
         for _ in range(count * 5):  # Try more spots than needed
-            y = np.random.randint(border, self.size - border)
-            x = np.random.randint(border, self.size - border)
+            y = rng.integers(border, self.size - border)
+            x = rng.integers(border, self.size - border)
             
             # Check if suitable for plateau (on land, somewhat elevated)
             if plateau_map[y, x] > 0.3 and plateau_map[y, x] < 0.6:
@@ -994,33 +1630,27 @@ class TerrainGenerator:
         # Sort by local variation (flattest first)
         plateau_centers.sort(key=lambda p: p[2])
         
+        # Plateaus keep twice their size away from earlier plateaus
         plateaus_added = 0
+        placed = PointIndex(self.size, 50)
         for y, x, _ in plateau_centers:
             if plateaus_added >= count:
                 break
                 
             # Random plateau size and height
-            size = np.random.randint(15, 50)
-            height_boost = np.random.uniform(0.1, 0.25)
+            size = rng.integers(15, 50)
+            height_boost = rng.uniform(0.1, 0.25)
             
             # Create base height for the plateau (current height + boost)
             plateau_height = plateau_map[y, x] + height_boost
             
-            # Check if area is suitable for plateau
-            too_close = False
-            for py, px, _ in plateau_centers[:plateaus_added]:
-                # Calculate distance with longitude wrap-around
-                dx = min(abs(x - px), self.size - abs(x - px))
-                dy = abs(y - py)
-                if np.sqrt(dx*dx + dy*dy) < size * 2:
-                    too_close = True
-                    break
-            
-            if too_close:
+            # Check if area is suitable for plateau (distances wrap around
+            # in longitude)
+            if not placed.accept(y, x, size * 2):
                 continue
                 
             # Add plateau with different shapes (circle, oval, irregular)
-            shape_type = np.random.choice(['circle', 'oval', 'irregular'])
+            shape_type = rng.choice(['circle', 'oval', 'irregular'])
             
             if shape_type == 'circle':
                 # Simple circular plateau
@@ -1048,19 +1678,19 @@ class TerrainGenerator:
                             plateau_map[ny, nx] = original * (1.0 - edge_falloff) + plateau_height * edge_falloff
                         else:
                             # Flat top with minor variations for realism
-                            variation = (np.random.random() - 0.5) * 0.02
+                            variation = (rng.random() - 0.5) * 0.02
                             plateau_map[ny, nx] = plateau_height + variation
                             
             elif shape_type == 'oval':
                 # Oval/elliptical plateau
                 # Random orientation angle
-                angle = np.random.random() * np.pi
+                angle = rng.random() * np.pi
                 cos_angle = np.cos(angle)
                 sin_angle = np.sin(angle)
                 
                 # Random aspect ratio
                 a = size
-                b = size * np.random.uniform(0.5, 0.8)
+                b = size * rng.uniform(0.5, 0.8)
                 
                 for dy in range(-size, size+1):
                     for dx in range(-size, size+1):
@@ -1091,12 +1721,18 @@ class TerrainGenerator:
                             plateau_map[ny, nx] = original * (1.0 - edge_falloff) + plateau_height * edge_falloff
                         else:
                             # Flat top with minor variations
-                            variation = (np.random.random() - 0.5) * 0.02
+                            variation = (rng.random() - 0.5) * 0.02
                             plateau_map[ny, nx] = plateau_height + variation
                             
             else:  # irregular
                 # Create an irregular plateau with Perlin noise boundary
-                noise_gen = OpenSimplex(seed=self.seed + plateaus_added)
+                noise_gen = FractalNoise(seed=self.seed + plateaus_added)
+                
+                # Boundary noise by direction from the center, for the
+                # whole patch at once
+                offsets = np.arange(-size, size + 1)
+                angles = np.arctan2(offsets[:, np.newaxis], offsets[np.newaxis, :])
+                boundary_noise = noise_gen.noise2(np.cos(angles), np.sin(angles)) * 0.2
                 
                 for dy in range(-size, size+1):
                     for dx in range(-size, size+1):
@@ -1106,8 +1742,7 @@ class TerrainGenerator:
                             continue
                             
                         # Add noise to the boundary
-                        angle = np.arctan2(dy, dx)
-                        noise_val = noise_gen.noise2(np.cos(angle), np.sin(angle)) * 0.2
+                        noise_val = boundary_noise[dy + size, dx + size]
                         
                         # Check if inside the irregular boundary
                         if base_dist > 0.9 + noise_val:
@@ -1131,7 +1766,7 @@ class TerrainGenerator:
                             plateau_map[ny, nx] = original * (1.0 - edge_falloff) + plateau_height * edge_falloff
                         else:
                             # Flat top with minor variations
-                            variation = (np.random.random() - 0.5) * 0.02
+                            variation = (rng.random() - 0.5) * 0.02
                             plateau_map[ny, nx] = plateau_height + variation
             
             plateaus_added += 1
@@ -1140,7 +1775,9 @@ class TerrainGenerator:
         self.heightmap = plateau_map
         return plateau_map
 
-    def add_rivers(self, river_count: int = 30, min_length: int = 15, meander_factor: float = 0.3):
+    @profiled
+    def add_rivers(self, river_count: int = 30, min_length: int = 15, meander_factor: float = 0.3,
+                   rng: Optional[np.random.Generator] = None):
         """Add rivers flowing from high elevation to the sea with reliable pathing.
         
         Creates scientifically plausible river systems that reliably reach water bodies
@@ -1150,20 +1787,25 @@ class TerrainGenerator:
             river_count: Number of major rivers to generate
             min_length: Minimum length for a valid river
             meander_factor: Amount of randomness in river paths (0.0-1.0)
+            rng: Random generator (defaults to the stage's own stream,
+                see ``stage_rng``)
             
         Returns:
-            River mask as a 2D numpy array
+            Boolean river mask as a 2D numpy array
         """
         if self.heightmap is None:
             raise ValueError("Heightmap must be generated before adding rivers")
+        self._require_in_memory("River generation")
+        rng = rng if rng is not None else self.stage_rng("add_rivers")
 
         print(f"Generating {river_count} major rivers...")
 
-        # Create a river mask (1 where rivers exist, 0 elsewhere)
-        river_mask = np.zeros_like(self.heightmap)
+        # Create a river mask (1 where rivers exist, 0 elsewhere), in uint8
+        # for the river walk kernel
+        river_mask = np.zeros(self.heightmap.shape, dtype=np.uint8)
         
-        # Store river paths for potential later use
-        river_paths = []
+        # Store river paths and their confluences for later use
+        network = RiverNetwork(self.size)
         
         # Adjust the heightmap for river generation - ensure we have a 0-1 range
         river_heightmap = self.heightmap.copy()
@@ -1172,40 +1814,11 @@ class TerrainGenerator:
             river_heightmap = river_heightmap - np.min(river_heightmap)
             river_heightmap = river_heightmap / np.max(river_heightmap)
 
-        # Flow accumulation map - helps identify natural drainage patterns
-        flow_accumulation = np.zeros_like(river_heightmap)
-        
-        # Calculate simple flow directions for each cell (8 directions)
-        # This simulates water flow across the terrain to find natural channels
+        # Flow accumulation map - helps identify natural drainage patterns.
+        # The upstream contributing area is log-scaled so drainage stays
+        # comparable to the elevation terms of the river scores.
         print("Calculating terrain drainage patterns...")
-        for y in range(1, self.size - 1):
-            for x in range(1, self.size - 1):
-                if river_heightmap[y, x] <= 0:  # Skip ocean areas
-                    continue
-                    
-                # Find lowest neighbor
-                lowest_dir = None
-                lowest_h = river_heightmap[y, x]
-                
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        if dy == 0 and dx == 0:
-                            continue
-                        
-                        # Handle wrap-around for longitude (x) and clamp latitude (y)
-                        nx = (x + dx) % self.size
-                        ny = max(0, min(self.size - 1, y + dy))
-                        
-                        if river_heightmap[ny, nx] < lowest_h:
-                            lowest_h = river_heightmap[ny, nx]
-                            lowest_dir = (dy, dx)
-                
-                # If we found a downhill path, add to that cell's flow accumulation
-                if lowest_dir:
-                    dy, dx = lowest_dir
-                    ny = max(0, min(self.size - 1, y + dy))
-                    nx = (x + dx) % self.size
-                    flow_accumulation[ny, nx] += 1
+        flow_accumulation = np.log1p(self.flow_field().accumulation)
 
         # Step 1: Create forced river paths from coastlines inland
         # This ensures major rivers will reach the ocean
@@ -1241,7 +1854,7 @@ class TerrainGenerator:
         # Choose a sample of coastline points as river mouths
         if coastline_points:
             num_river_mouths = min(len(coastline_points), river_count // 2)
-            river_mouths = np.random.choice(len(coastline_points), size=num_river_mouths, replace=False)
+            river_mouths = rng.choice(len(coastline_points), size=num_river_mouths, replace=False)
             
             # From each river mouth, try to force a path inland and upward
             for mouth_idx in river_mouths:
@@ -1298,7 +1911,7 @@ class TerrainGenerator:
                     # Choose a neighbor, with preference for gentler slopes
                     higher_neighbors.sort(key=lambda n: n[2], reverse=True)
                     # Add some randomness in selection
-                    select_idx = min(int(np.random.random() * min(3, len(higher_neighbors))), len(higher_neighbors) - 1)
+                    select_idx = min(int(rng.random() * min(3, len(higher_neighbors))), len(higher_neighbors) - 1)
                     y, x, _ = higher_neighbors[select_idx]
         
                     # Stop if we've reached an existing river cell
@@ -1316,25 +1929,9 @@ class TerrainGenerator:
                     # Rivers flow downstream, but we built the path upstream
                     river_path.reverse()
                     
-                    # Store the river path
-                    river_paths.append(river_path)
-                
-                    # Draw the river with increasing width
-                    for i, (py, px) in enumerate(river_path):
-                        position_factor = i / len(river_path)
-                        river_width = 2 + int(position_factor * 3)
-                        river_width = min(river_width, 5)
-                    
-                        # Apply river with circular brush
-                        radius = river_width // 2
-                        for wy in range(max(0, py-radius), min(self.size, py+radius+1)):
-                            for wx in range(max(0, px-radius), min(self.size, px+radius+1)):
-                                wrapped_wx = wx % self.size
-                            
-                                dy = wy - py
-                                dx = min(abs(wrapped_wx - px), self.size - abs(wrapped_wx - px))
-                                if (dy*dy + dx*dx) <= radius*radius:
-                                    river_mask[wy, wrapped_wx] = 1
+                    # Store the river path and draw it with increasing width
+                    wy, wx, _ = network.footprint(network.add(river_path))
+                    river_mask[wy, wx] = 1
                 
                     forced_rivers_added += 1
                 
@@ -1377,8 +1974,8 @@ class TerrainGenerator:
             print("Warning: No suitable high points found for river sources")
             # Fall back to random high points if needed
             for _ in range(50):
-                y = np.random.randint(border, self.size - border)
-                x = np.random.randint(border, self.size - border)
+                y = rng.integers(border, self.size - border)
+                x = rng.integers(border, self.size - border)
                 if river_heightmap[y, x] > 0.3:
                     high_point_candidates.append((y, x, river_heightmap[y, x]))
         
@@ -1388,197 +1985,48 @@ class TerrainGenerator:
         # Ensure spatial diversity - don't want all rivers starting in same area
         diverse_sources = []
         min_distance = self.size / 15  # Minimum distance between sources
+        source_index = PointIndex(self.size, min_distance)
         
         for y, x, _ in high_point_candidates:
-            # Check if this point is far enough from already selected sources
-            too_close = False
-            for sy, sx, _ in diverse_sources:
-                # Calculate distance with wrap-around for longitude
-                dx = min(abs(x - sx), self.size - abs(x - sx))
-                dy = abs(y - sy)
-                distance = np.sqrt(dx*dx + dy*dy)
-            
-                if distance < min_distance:
-                    too_close = True
-                    break
-        
-            if not too_close:
+            # Accept points far enough from already selected sources
+            # (distances wrap around in longitude)
+            if source_index.accept(y, x, min_distance):
                 diverse_sources.append((y, x, river_heightmap[y, x]))
-            
-                # Stop once we have enough diverse sources
-                if len(diverse_sources) >= river_count:
-                    break
-
-        rivers_created = 0
-
-        # Step 3: Generate each river from source to sea
-        for y, x, _ in diverse_sources:
-            river_path = [(y, x)]
-            path_length = 0
-            
-            # Track cells visited to avoid loops
-            visited = set([(y, x)])
-            
-            # Maximum attempts to break through difficult terrain
-            punch_through_attempts = 5  # Increased from typical 2 to handle difficult terrain
-            has_reached_water = False
-
-            # Generate the river by following the steepest descent
-            for _ in range(self.size * 2):  # Maximum river length
-                # Find steepest descent neighbor with randomness for meandering
-                neighbor_options = []
-                current_height = river_heightmap[y, x]
-                
-                # Check all 8 neighboring cells
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        if dy == 0 and dx == 0:
-                            continue
-                
-                        # Handle wrap-around for x (longitude)
-                        nx = (x + dx) % self.size
-                        # Clamp y to valid range (latitude)
-                        ny = max(0, min(self.size - 1, y + dy))
-                        
-                        # Skip if already visited (prevents loops)
-                        if (ny, nx) in visited:
-                            continue
-                
-                        # Scoring system based on multiple factors
-                        score = 0
-                        
-                        # Prefer downhill flow (most important factor)
-                        if river_heightmap[ny, nx] < current_height:
-                            # More points for steeper downhill (but don't penalize very steep drops)
-                            height_diff = current_height - river_heightmap[ny, nx]
-                            # Cap the height difference bonus to prevent avoiding very steep drops
-                            capped_diff = min(height_diff, 0.2)
-                            score += 10 + (capped_diff * 30)
-                        else:
-                            # Allow slightly more uphill movement
-                            height_diff = river_heightmap[ny, nx] - current_height
-                            if height_diff < 0.08:  # Increased from typical 0.05
-                                score -= 5 + (height_diff * 80)  # Reduced penalty
-                            else:
-                                continue  # Skip significant uphills
-                        
-                        # Prefer high flow accumulation cells (natural drainage)
-                        score += flow_accumulation[ny, nx] * 0.1
-                        
-                        # Add randomness for meandering
-                        score += np.random.random() * meander_factor * 5
-                        
-                        # Avoid diagonal moves slightly (rivers tend to follow cardinal directions more)
-                        if dx != 0 and dy != 0:
-                            score -= 0.5
-                        
-                        # Add to options if overall score is positive
-                        if score > 0:
-                            neighbor_options.append((ny, nx, score))
-                
-                # No viable options found using regular criteria
-                if not neighbor_options:
-                    # Try punch-through if we have attempts left (allows crossing difficult terrain)
-                    if punch_through_attempts > 0:
-                        punch_through_attempts -= 1
-                        
-                        # Look for ANY lower neighbor within extended range
-                        for r in range(1, 6):  # Increased search radius (6 instead of 4)
-                            found_exit = False
-                            for dy in range(-r, r+1):
-                                for dx in range(-r, r+1):
-                                    if dy == 0 and dx == 0:
-                                        continue
-                                    
-                                    if abs(dy) == r or abs(dx) == r:  # Only check perimeter
-                                        ny = max(0, min(self.size - 1, y + dy))
-                                        nx = (x + dx) % self.size
-                                        
-                                        # Skip if already visited
-                                        if (ny, nx) in visited:
-                                            continue
-                                        
-                                        # Accept ANY lower terrain
-                                        if river_heightmap[ny, nx] < current_height:
-                                            # Mark all cells along the path
-                                            # This simulates the river cutting through or having waterfalls
-                                            path_points = self.generate_line_points(y, x, ny, nx)
-                                            for py, px in path_points:
-                                                px = px % self.size  # Handle wrapping
-                                                py = max(0, min(self.size - 1, py))
-                                                visited.add((py, px))
-                                                river_path.append((py, px))
-                                            
-                                            # Carve a channel into the terrain for this segment
-                                            # This ensures future rivers can flow through this path
-                                            self.carve_river_segment(path_points, river_heightmap)
-                                            
-                                            y, x = ny, nx
-                                            found_exit = True
-                                            break
-                                if found_exit:
-                                    break
-                            if found_exit:
-                                break
-                        
-                        if found_exit:
-                            continue
-                    
-                    # If punch-through failed or we're out of attempts, end the river
-                    break
-                
-                # Choose the best option based on scores
-                neighbor_options.sort(key=lambda n: n[2], reverse=True)
-                
-                # Usually take best path but occasionally take second-best for variety
-                choice_idx = 0
-                if len(neighbor_options) > 1 and np.random.random() < meander_factor * 0.5:
-                    choice_idx = 1
-                
-                y, x, _ = neighbor_options[choice_idx]
-                visited.add((y, x))
-                river_path.append((y, x))
-                path_length += 1
-                
-                # Check if we've reached water (existing river, lake, or ocean)
-                if (river_mask[y, x] > 0 or 
-                    river_heightmap[y, x] <= 0.05 or 
-                    self.heightmap[y, x] < 0):
-                    has_reached_water = True
-                    break
-                
-                # Stop if we've reached the edge of the map (except for x which wraps)
-                if y <= 1 or y >= self.size - 2:
+            
+                # Stop once we have enough diverse sources
+                if len(diverse_sources) >= river_count:
                     break
 
+        rivers_created = 0
+
+        # Step 3: Generate each river from source to sea
+        max_steps = self.size * 2  # Maximum river length
+        visited = np.zeros((self.size, self.size), dtype=np.int64)
+        path_y = np.empty(max_steps + 64, dtype=np.int64)
+        path_x = np.empty(max_steps + 64, dtype=np.int64)
+        river_heightmap = np.ascontiguousarray(river_heightmap, dtype=np.float64)
+        terrain_heightmap = np.ascontiguousarray(self.heightmap, dtype=np.float64)
+
+        for stamp, (y, x, _) in enumerate(diverse_sources, start=1):
+            # Meander noise for each neighbour plus the second-best choice
+            randoms = rng.random((max_steps, 9))
+
+            # Follow the steepest descent with punch-through (compiled kernel)
+            count, path_length, has_reached_water = self.kernels.river_walk(
+                river_heightmap, terrain_heightmap, river_mask,
+                flow_accumulation, visited, stamp, y, x, meander_factor,
+                randoms, path_y, path_x)
+            river_path = np.column_stack((path_y[:count], path_x[:count]))
+
             # Add river to the mask if it's either long enough or reached water
             valid_river = (path_length >= min_length) or (path_length >= min_length//2 and has_reached_water)
             if valid_river:
                 rivers_created += 1
                 
-                # Store the river path
-                river_paths.append(river_path)
-            
-                # Make rivers wider as they progress downstream
-                for i, (py, px) in enumerate(river_path):
-                    # Rivers get wider the further downstream they go
-                    position_factor = i / len(river_path)
-                    # Increase minimum width to 2 for better visibility
-                    river_width = 2 + int(position_factor * 3)  # Start with width of 2
-                    river_width = min(river_width, 5)  # Max width of 5
-                
-                    # Apply width with a circular brush
-                    radius = river_width // 2
-                    for wy in range(max(0, py-radius), min(self.size, py+radius+1)):
-                        for wx in range(max(0, px-radius), min(self.size, px+radius+1)):
-                            # Handle x wrap-around
-                            wrapped_wx = wx % self.size
-                        
-                            # Use circular distance check
-                            dy = wy - py
-                            dx = min(abs(wrapped_wx - px), self.size - abs(wrapped_wx - px))
-                            if (dy*dy + dx*dx) <= radius*radius:
-                                river_mask[wy, wrapped_wx] = 1
+                # Store the river path and make it wider as it progresses
+                # downstream
+                wy, wx, _ = network.footprint(network.add(river_path))
+                river_mask[wy, wx] = 1
 
         # Step 4: Add springs and minor streams in appropriate areas
         springs_added = 0
@@ -1614,36 +2062,30 @@ class TerrainGenerator:
         # Ensure spatial diversity of springs
         min_spring_distance = self.size / 20
         diverse_springs = []
+        spring_index = PointIndex(self.size, min_spring_distance)
+
+        # Springs keep half that distance from the rivers: one distance
+        # transform covers the rivers drawn so far (x wraps), the spring
+        # and stream cells drawn below go into an index of their own
+        river_reach = min_spring_distance * 0.5
+        if np.any(river_mask):
+            river_distance, _, _ = wrapped_distance(river_mask > 0,
+                                                    int(np.ceil(river_reach)))
+        else:
+            river_distance = np.full(river_mask.shape, np.inf)
+        stream_index = PointIndex(self.size, river_reach)
         
         for y, x, _ in spring_candidates:
             # Check if this spring is far enough from other water features
-            too_close = False
-            
-            # Check distance to rivers
-            for ry in range(max(0, y-10), min(self.size, y+11)):
-                for rx in range(max(0, x-10), min(self.size, x+11)):
-                    rx_wrapped = rx % self.size
-                    if river_mask[ry, rx_wrapped] > 0:
-                        dy = abs(ry - y)
-                        dx = min(abs(rx_wrapped - x), self.size - abs(rx_wrapped - x))
-                        distance = np.sqrt(dy*dy + dx*dx)
-                        if distance < min_spring_distance * 0.5:  # Springs can be closer to each other
-                            too_close = True
-                            break
-                if too_close:
-                    break
+            too_close = (river_distance[y, x] < river_reach
+                         or stream_index.near(y, x, river_reach))
                     
             # Check distance to other springs
             if not too_close:
-                for sy, sx, _ in diverse_springs:
-                    dx = min(abs(x - sx), self.size - abs(x - sx))
-                    dy = abs(y - sy)
-                    distance = np.sqrt(dx*dx + dy*dy)
-                    if distance < min_spring_distance:
-                        too_close = True
-                        break
+                too_close = spring_index.near(y, x, min_spring_distance)
             
             if not too_close:
+                spring_index.add(y, x)
                 diverse_springs.append((y, x, flow_accumulation[y, x]))
                 
                 # Create the spring
@@ -1652,9 +2094,10 @@ class TerrainGenerator:
                     for wx in range(max(0, x-radius), min(self.size, x+radius+1)):
                         wrapped_wx = wx % self.size
                         river_mask[wy, wrapped_wx] = 1
+                        stream_index.add(wy, wrapped_wx)
                 
                 # Extend the spring downhill
-                stream_length = np.random.randint(3, 8)  # Variable length
+                stream_length = rng.integers(3, 8)  # Variable length
                 sy, sx = y, x
                 stream_path = [(sy, sx)]
                 
@@ -1684,6 +2127,7 @@ class TerrainGenerator:
                     
                     # Mark the stream on the mask
                     river_mask[sy, sx] = 1
+                    stream_index.add(sy, sx)
                     
                     # Stop if we hit water
                     if self.heightmap[sy, sx] < 0 or river_mask[sy, sx] > 0:
@@ -1695,8 +2139,8 @@ class TerrainGenerator:
                 if springs_added >= river_count:
                     break
 
-        # Store the river paths for later use
-        self.river_paths = river_paths
+        # Store the river network for later use
+        self.river_network = network
 
         # Verify we have enough water features and add more if needed
         total_water_features = rivers_created + springs_added + forced_rivers_added
@@ -1711,8 +2155,8 @@ class TerrainGenerator:
                 # Choose random point in mid-elevations
                 attempts = 0
                 while attempts < 20:
-                    y = np.random.randint(5, self.size - 5)
-                    x = np.random.randint(5, self.size - 5)
+                    y = rng.integers(5, self.size - 5)
+                    x = rng.integers(5, self.size - 5)
                     
                     # Check if this is a reasonable location for water
                     if (0.2 < river_heightmap[y, x] < 0.7 and 
@@ -1728,7 +2172,7 @@ class TerrainGenerator:
                         
                         # Simple downhill path
                         cy, cx = y, x
-                        for _ in range(np.random.randint(2, 6)):
+                        for _ in range(rng.integers(2, 6)):
                             # Find any lower neighbor
                             options = []
                             for dy in [-1, 0, 1]:
@@ -1743,7 +2187,7 @@ class TerrainGenerator:
                                         options.append((ny, nx))
                             
                             if options:
-                                ny, nx = options[np.random.randint(0, len(options))]
+                                ny, nx = options[rng.integers(0, len(options))]
                                 river_mask[ny, nx] = 1
                                 cy, cx = ny, nx
                             else:
@@ -1761,13 +2205,13 @@ class TerrainGenerator:
         
         # Apply the river channels to the actual terrain
         # This ensures rivers have properly carved channels in the heightmap
-        if river_paths:
-            self.carve_river_channels(river_paths)
+        if len(network):
+            self.carve_river_channels(network)
         
         total_water_features = rivers_created + springs_added + forced_rivers_added
         print(f"Successfully created {rivers_created} rivers from sources, {forced_rivers_added} rivers from coastlines, and {springs_added} springs")
         print(f"Total water features: {total_water_features}")
-        return river_mask
+        return river_mask.view(bool)
 
     def generate_line_points(self, y0, x0, y1, x1):
         """Generate points in a line between (y0,x0) and (y1,x1) using Bresenham's algorithm.
@@ -1850,592 +2294,430 @@ class TerrainGenerator:
             # Lower the terrain to create the channel
             heightmap[y, x] = target_height
 
+    @profiled
     def carve_river_channels(self, river_paths):
         """Physically carve river channels into the terrain.
         
         Creates realistic river valleys that ensure water flows correctly.
+        Every path is rasterized onto one centerline raster, and all
+        channels are carved at once from a distance transform to it (see
+        ``rivers.carve_channels``).
         
         Args:
-            river_paths: List of river paths, each containing (y, x) coordinates
+            river_paths: RiverNetwork, or list of river paths each containing
+                (y, x) coordinates
         """
-        if not river_paths:
+        if not isinstance(river_paths, RiverNetwork):
+            river_paths = RiverNetwork.from_paths(self.size, river_paths)
+        if len(river_paths) == 0:
             return
-            
-        # Create a copy of the heightmap
-        carved_heightmap = self.heightmap.copy()
-        
-        for path in river_paths:
-            # Skip very short paths
-            if len(path) < 3:
-                continue
-                
-            # Process each point in the river path
-            for i, (y, x) in enumerate(path):
-                # Skip ocean cells
-                if carved_heightmap[y, x] < 0:
-                    continue
-                
-                # Calculate downstream progression (0 at source, 1 at mouth)
-                downstream_factor = i / (len(path) - 1)
-                
-                # Channel gets wider and deeper downstream
-                # Width ranges from 1-5 cells
-                width = 1 + int(downstream_factor * 4)
-                
-                # Depth ranges from slight to significant
-                depth_factor = 0.05 + (downstream_factor * 0.15)
-                
-                # Carve the channel at this point
-                for dy in range(-width, width+1):
-                    for dx in range(-width, width+1):
-                        # Calculate distance from river center
-                        dist = np.sqrt(dy*dy + dx*dx)
-                        if dist > width:
-                            continue
-                        
-                        ny = max(0, min(self.size-1, y+dy))
-                        nx = (x+dx) % self.size
-                        
-                        # Skip ocean cells
-                        if carved_heightmap[ny, nx] < 0:
-                            continue
-                        
-                        # Calculate depth factor based on distance from center
-                        # Center is deepest, edges are higher
-                        center_factor = 1.0 - (dist / width)
-                        cell_depth = depth_factor * center_factor
-                        
-                        # Apply the carving (make sure river flows downhill)
-                        if downstream_factor < 0.05:
-                            # Near source: maintain some height
-                            carved_heightmap[ny, nx] = min(carved_heightmap[ny, nx], 
-                                                      carved_heightmap[ny, nx] * (1.0 - cell_depth * 0.5))
-                        else:
-                            # Ensure larger rivers carve deeper channels
-                            target_height = carved_heightmap[y, x] - (cell_depth * 0.05)
-                            carved_heightmap[ny, nx] = min(carved_heightmap[ny, nx], target_height)
-                            
-                            # Extra smoothing for channel banks
-                            if dist > width * 0.7:
-                                # Look for adjacent high points and smooth them
-                                for bdy in range(-1, 2):
-                                    for bdx in range(-1, 2):
-                                        bny = max(0, min(self.size-1, ny+bdy))
-                                        bnx = (nx+bdx) % self.size
-                                        
-                                        # If significant height difference, smooth it
-                                        if carved_heightmap[bny, bnx] > carved_heightmap[ny, nx] + 0.1:
-                                            carved_heightmap[bny, bnx] = carved_heightmap[ny, nx] + 0.05
-        
-        # Update the heightmap
-        self.heightmap = carved_heightmap
 
+        # Channels widen (1-5 cells) and deepen downstream
+        heightmap = np.asarray(self.heightmap, dtype=np.float64)
+        self.heightmap = carve_channels(heightmap,
+                                        *river_paths.centerline(heightmap))
+
+    @profiled
     def add_lakes(self, count: int = 20, min_size: int = 8, max_size: int = 80,
-                  ocean_mask: Optional[np.ndarray] = None) -> np.ndarray:
+                  ocean_mask: Optional[np.ndarray] = None,
+                  rng: Optional[np.random.Generator] = None) -> np.ndarray:
         """Add inland lakes to depressions in the terrain with improved placement.
+
+        Lakes fill the closed basins found by priority-flood depression
+        filling, largest water volume first. Each lake rises from the basin's
+        lowest cell towards its spill point until it reaches ``max_size``.
         
         Args:
             count: Number of lakes to generate
             min_size: Minimum size for lakes
             max_size: Maximum size for lakes
             ocean_mask: Optional mask of ocean areas to avoid
+            rng: Random generator (defaults to the stage's own stream,
+                see ``stage_rng``)
             
         Returns:
-            Lake mask as a 2D numpy array
+            Boolean lake mask as a 2D numpy array
         """
         if self.heightmap is None:
             raise ValueError("Heightmap must be generated before adding lakes")
+        self._require_in_memory("Lake generation")
+        rng = rng if rng is not None else self.stage_rng("add_lakes")
 
         print("Generating inland lakes...")
 
         # Create a lake mask
-        lake_mask = np.zeros_like(self.heightmap)
-
-        # Find local minima and suitable lake locations in the terrain
-        lake_candidates = []
-        
-        # First look for depressions (local minima)
-        for y in range(1, self.size - 1):
-            for x in range(1, self.size - 1):
-                # Skip ocean areas if mask is provided
-                if ocean_mask is not None and ocean_mask[y, x] > 0:
-                    continue
-
-                # Skip very low areas (likely ocean) or too high areas
-                if self.heightmap[y, x] < 0 or self.heightmap[y, x] > 0.65:
-                    continue
-
-                # Check if lower than neighbors - true local minimum
-                is_minimum = True
-                height = self.heightmap[y, x]
-
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        if dy == 0 and dx == 0:
-                            continue
-
-                        # Handle wrap-around for x (longitude)
-                        nx = (x + dx) % self.size
-                        # Clamp y to valid range (latitude)
-                        ny = max(0, min(self.size - 1, y + dy))
-
-                        if height > self.heightmap[ny, nx]:
-                            is_minimum = False
-                            break
-                    if not is_minimum:
-                        break
-
-                if is_minimum:
-                    # Score by local flatness (better for larger lakes)
-                    flatness = 0.0
-                    for dy in range(-3, 4):
-                        for dx in range(-3, 4):
-                            ny = max(0, min(self.size - 1, y + dy))
-                            nx = (x + dx) % self.size
-                            
-                            if abs(self.heightmap[ny, nx] - height) <.02:
-                                flatness += 1.0
-                                
-                    # Store as (y, x, height, score)
-                    lake_candidates.append((y, x, height, flatness))
-                    
-        # Also look for plateaus and valleys that could hold lakes
-        for y in range(1, self.size - 1):
-            for x in range(1, self.size - 1):
-                # Skip ocean areas if mask is provided
-                if ocean_mask is not None and ocean_mask[y, x] > 0:
-                    continue
-
-                # Look for plateau/valley areas (relatively flat terrain)
-                if self.heightmap[y, x] < 0.2 or self.heightmap[y, x] > 0.6:
-                    continue
+        lake_mask = np.zeros(self.heightmap.shape, dtype=bool)
 
-                # Check if approximately flat compared to neighbors
-                height = self.heightmap[y, x]
-                flat_neighbors = 0
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        if dy == 0 and dx == 0:
-                            continue
+        # Closed depressions that do not drain to the ocean
+        heightmap = np.ascontiguousarray(self.heightmap, dtype=np.float64)
+        outlets = heightmap < 0
+        if ocean_mask is not None:
+            outlets |= ocean_mask > 0
+        basins = DepressionBasins(heightmap, outlets, self.kernels)
 
-                        # Handle wrap-around for x (longitude)
-                        nx = (x + dx) % self.size
-                        # Clamp y to valid range (latitude)
-                        ny = max(0, min(self.size - 1, y + dy))
+        # Skip basins that are too high, too small or have no real depth
+        pit_height = heightmap.ravel()[basins.pit]
+        suitable = ((pit_height >= 0) & (pit_height <= 0.65)
+                    & (basins.area >= min_size) & (basins.depth > 0))
 
-                        # If height difference is small, count as flat
-                        if abs(height - self.heightmap[ny, nx]) < 0.01:
-                            flat_neighbors += 1
-
-                # Need at least 5 flat neighbors to be considered a plateau/valley
-                if flat_neighbors >= 5:
-                    # Also check that we're not near an existing minimum
-                    too_close = False
-                    for ly, lx, _, _ in lake_candidates:
-                        # Handle wrap-around for x (longitude)
-                        dx = min(abs(x - lx), self.size - abs(x - lx))
-                        dy = abs(y - ly)
-                        distance = np.sqrt(dx*dx + dy*dy)
-
-                        if distance < 5:  # Too close to another minimum
-                            too_close = True
-                            break
+        # Largest water volumes first - these make the best lakes
+        candidates = np.flatnonzero(suitable)
+        candidates = candidates[np.argsort(-basins.volume[candidates],
+                                           kind="stable")]
 
-                    if not too_close:
-                        # Add as potential lake location with flatness score
-                        lake_candidates.append((y, x, height, flat_neighbors * 0.5))
+        lake_members = np.zeros((self.size, self.size), dtype=np.int64)
+        lake_cells = np.empty(max_size, dtype=np.int64)
 
-        # Sort by score (higher scores first - these make better lakes)
-        lake_candidates.sort(key=lambda m: m[3], reverse=True)
-        
-        # Try to create lakes at each potential location
+        # Try to create a lake in each basin
         lakes_created = 0
         min_lake_distance = self.size / 15  # Minimum distance between lake centers
-        created_lake_centers = []
-        
-        for y, x, height, _ in lake_candidates:
-            # Skip if too close to another lake
-            too_close = False
-            for ly, lx in created_lake_centers:
-                dx = min(abs(x - lx), self.size - abs(x - lx))
-                dy = abs(y - ly)
-                distance = np.sqrt(dx*dx + dy*dy)
-                
-                if distance < min_lake_distance:
-                    too_close = True
-                    break
-                    
-            if too_close:
-                continue
-                
-            # Skip if this area already has a lake
-            if lake_mask[y, x] == 1:
-                continue
-
-            # Use flood fill to create the lake
-            queue = [(y, x)]
-            lake_cells = set([(y, x)])
-
-            # Random target size for this lake
-            target_size = np.random.randint(min_size, max_size)
-
-            # Maximum height for this lake (higher = larger lake)
-            # More variance in lake sizes
-            if np.random.random() < 0.3:  # 30% chance of a larger lake
-                height_threshold = height + np.random.uniform(0.03, 0.06)
-            else:
-                height_threshold = height + np.random.uniform(0.01, 0.04)
+        lake_centers = PointIndex(self.size, min_lake_distance)
 
-            while queue and len(lake_cells) < target_size:
-                cy, cx = queue.pop(0)
+        for basin in candidates:
+            pit = int(basins.pit[basin])
+            y, x = divmod(pit, self.size)
 
-                # Add neighbors if they're below the threshold
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        # Handle wrap-around for x (longitude)
-                        nx = (cx + dx) % self.size
-                        # Clamp y to valid range (latitude)
-                        ny = max(0, min(self.size - 1, cy + dy))
-
-                        if (ny, nx) in lake_cells:
-                            continue
+            # Skip if too close to another lake
+            if lake_centers.near(y, x, min_lake_distance):
+                continue
 
-                        # Skip if out of bounds
-                        if not (0 <= ny < self.size):
-                            continue
+            # Raise the water level from the pit until the basin is full or
+            # the lake reaches its maximum size
+            cell_count, water_level = self.kernels.fill_basin(
+                heightmap, basins.labels, basin + 1, pit,
+                min(int(basins.area[basin]), max_size), lake_members,
+                basin + 1, lake_cells)
 
-                        # Skip if this is ocean
-                        if ocean_mask is not None and ocean_mask[ny, nx] > 0:
-                            continue
+            # Only create the lake if it's large enough
+            if cell_count < min_size:
+                continue
 
-                        if self.heightmap[ny, nx] <= height_threshold:
-                            lake_cells.add((ny, nx))
-                            queue.append((ny, nx))
+            cells = np.unravel_index(lake_cells[:cell_count], heightmap.shape)
+            lake_mask[cells] = True
 
-            # Only create the lake if it's large enough
-            if len(lake_cells) >= min_size:
-                for ly, lx in lake_cells:
-                    lake_mask[ly, lx] = 1
+            # Level the lake surface at the height the water rose to
+            heightmap[cells] = water_level
 
-                    # Set the heightmap value to a consistent level for the lake
-                    self.heightmap[ly, lx] = max(0, height - 0.01)
+            lakes_created += 1
+            lake_centers.add(y, x)
 
-                lakes_created += 1
-                created_lake_centers.append((y, x))
+            # Stop if we've created enough lakes
+            if lakes_created >= count:
+                break
 
-                # Stop if we've created enough lakes
-                if lakes_created >= count:
-                    break
-                    
         # If we didn't create enough lakes, add some smaller ones in valleys
         if lakes_created < count * 0.75:
             # Find valley bottoms from the valley mask if available
             if hasattr(self, 'valley_mask') and self.valley_mask is not None:
-                valley_points = []
-                for y in range(1, self.size - 1):
-                    for x in range(1, self.size - 1):
-                        if (self.valley_mask[y, x] > 0.4 and 
-                            self.heightmap[y, x] > 0 and 
-                            self.heightmap[y, x] < 0.5 and
-                            lake_mask[y, x] == 0):
-                            
-                            # Check if not too close to existing lakes
-                            too_close = False
-                            for ly, lx in created_lake_centers:
-                                dx = min(abs(x - lx), self.size - abs(x - lx))
-                                dy = abs(y - ly)
-                                distance = np.sqrt(dx*dx + dy*dy)
-                                
-                                if distance < min_lake_distance * 0.5:
-                                    too_close = True
-                                    break
-                                    
-                            if not too_close:
-                                valley_points.append((y, x))
-                
+                valley = ((self.valley_mask > 0.4) & (heightmap > 0)
+                          & (heightmap < 0.5) & ~lake_mask)
+                valley[[0, -1], :] = False
+                valley[:, [0, -1]] = False
+                valley_y, valley_x = np.nonzero(valley)
+                near = lake_centers.near_many(valley_y, valley_x,
+                                              min_lake_distance * 0.5)
+                valley_points = list(zip(valley_y[~near], valley_x[~near]))
+
                 # Add some small valley lakes
-                np.random.shuffle(valley_points)
+                rng.shuffle(valley_points)
                 for y, x in valley_points[:count - lakes_created]:
                     # Create small lake (3-7 cells radius)
-                    radius = np.random.randint(3, 8)
-                    
-                    for dy in range(-radius, radius+1):
-                        for dx in range(-radius, radius+1):
-                            dist = np.sqrt(dy*dy + dx*dx)
-                            if dist > radius:
-                                continue
-                                
-                            ny = max(0, min(self.size - 1, y + dy))
-                            nx = (x + dx) % self.size
-                            
-                            # Check if on land
-                            if self.heightmap[ny, nx] <= 0:
-                                continue
-                                
-                            lake_mask[ny, nx] = 1
-                            # Level the lake surface
-                            self.heightmap[ny, nx] = max(0, self.heightmap[y, x] - 0.01)
-                    
-                    created_lake_centers.append((y, x))
+                    radius = rng.integers(3, 8)
+                    offsets = np.arange(-radius, radius + 1)
+                    dy, dx = np.meshgrid(offsets, offsets, indexing="ij")
+                    disc = dy * dy + dx * dx <= radius * radius
+                    ny = np.clip(y + dy[disc], 0, self.size - 1)
+                    nx = (x + dx[disc]) % self.size
+
+                    # Only flood land cells
+                    land = heightmap[ny, nx] > 0
+                    ny, nx = ny[land], nx[land]
+                    lake_mask[ny, nx] = True
+                    # Level the lake surface
+                    heightmap[ny, nx] = max(0, heightmap[y, x] - 0.01)
+
+                    lake_centers.add(y, x)
                     lakes_created += 1
-                    
+
                     if lakes_created >= count:
                         break
 
+        # Lake surfaces were levelled in place
+        self.heightmap = heightmap
+
         print(f"Created {lakes_created} inland lakes")
         return lake_mask
 
-    def generate_complete_terrain(self) -> np.ndarray:
+    @profiled
+    def generate_complete_terrain(
+            self, stage_params: Optional[Dict[str, dict]] = None) -> np.ndarray:
         """Generate a complete terrain with all features applied.
         
         This is the primary method to call for generating a full terrain map.
+        With a stage cache, stages whose inputs and parameters are unchanged
+        are loaded from disk instead of being recomputed. Not available in
+        tiled mode, where the feature, erosion and water stages cannot run;
+        call the stages in ``TILED_STAGES`` directly instead.
+        
+        Args:
+            stage_params: Optional parameter overrides per stage, keyed by
+                stage name (e.g. ``{"add_lakes": {"count": 30}}``)
         
         Returns:
             Complete heightmap with all features
+
+        Raises:
+            ValueError: If a stage name is unknown or the generator is in
+                tiled mode
         """
+        self._require_in_memory("generate_complete_terrain")
+        stage_params = dict(stage_params or {})
+        unknown = set(stage_params) - set(PIPELINE_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown terrain stages {sorted(unknown)}, "
+                             f"expected names from {PIPELINE_STAGES}")
+
         print("\n=== Generating Complete Terrain ===")
         
         # Step 1: Generate the continental mask with improved distribution
         print("\n1. Generating continental landmasses with improved distribution...")
-        self.create_continental_mask(continent_size=0.35)  # 35% land coverage
+        self._run_stage("create_continental_mask", self.create_continental_mask,
+                        stage_params, continent_size=0.35)  # 35% land coverage
         
         # Step 2: Generate base heightmap
         print("\n2. Generating base terrain heightmap...")
-        self.generate_heightmap()
+        self._run_stage("generate_heightmap", self.generate_heightmap,
+                        stage_params)
         
         # Step 3: Generate valley patterns
         print("\n3. Adding dramatic valleys...")
-        self.generate_valley_mask()
+        self._run_stage("generate_valley_mask", self.generate_valley_mask,
+                        stage_params)
         
         # Step 4: Add mountains with deep valleys
         print("\n4. Adding mountain ranges with dramatic relief...")
-        self.add_mountains(epic_factor=1.8)
+        self._run_stage("add_mountains", self.add_mountains, stage_params,
+                        epic_factor=1.8)
         
         # Step 5: Add ridges and canyons
         print("\n5. Adding ridge lines and canyons...")
-        self.add_ridges_and_canyons()
+        self._run_stage("add_ridges_and_canyons", self.add_ridges_and_canyons,
+                        stage_params)
         
         # Step 6: Add plateau features
         print("\n6. Adding plateau features...")
-        self.add_plateaus()
+        self._run_stage("add_plateaus", self.add_plateaus, stage_params)
         
         # Step 7: Apply erosion to make terrain more realistic
         print("\n7. Applying erosion simulation...")
-        self.apply_erosion(iterations=30)
+        self._run_stage("apply_erosion", self.apply_erosion, stage_params,
+                        iterations=30, mode="batched")
         
         # Step 8: Generate water bodies
         print("\n8. Generating oceans and seas...")
-        self.generate_water_bodies(water_coverage=0.65)
+        self._run_stage("generate_water_bodies", self.generate_water_bodies,
+                        stage_params, water_coverage=0.65)
         
         # Determine ocean mask for other water features
-        ocean_mask = np.zeros_like(self.heightmap)
-        ocean_mask[self.heightmap < 0] = 1
+        ocean_mask = self.heightmap < 0
         
         # Step 9: Add rivers
         print("\n9. Generating river networks...")
-        river_mask = self.add_rivers(river_count=30)
+        river_mask = self._run_stage("add_rivers", self.add_rivers,
+                                     stage_params, river_count=30)
         
         # Step 10: Add lakes
         print("\n10. Adding lakes in depressions and valleys...")
-        lake_mask = self.add_lakes(count=20, ocean_mask=ocean_mask)
+        lake_mask = self._run_stage("add_lakes", self.add_lakes, stage_params,
+                                    count=20, ocean_mask=ocean_mask)
         
         # Final pass of erosion for smoother transitions
         print("\n11. Applying final terrain smoothing...")
-        self.apply_erosion(iterations=10, erosion_strength=0.1)
+        self._run_stage("final_erosion", self.apply_erosion, stage_params,
+                        iterations=10, erosion_strength=0.1, mode="batched",
+                        rng=self.stage_rng("final_erosion"))
         
         print("\nTerrain generation complete!")
         return self.heightmap
 
-    def apply_erosion(self, iterations: int = 50, drop_rate: float = 0.05,
-                      erosion_strength: float = 0.3) -> np.ndarray:
-        """Apply enhanced hydraulic and thermal erosion to the heightmap.
+    def _run_stage(self, name: str, stage, stage_params: Dict[str, dict],
+                   **params):
+        """Run a pipeline stage, reusing its cached result when possible.
+
+        The cache key covers the seed, the constructor arguments, the stage
+        name and parameters, and the generator state the stage reads (world
+        arrays and river network); randomness comes from per-stage streams
+        derived from the seed (see ``stage_rng``). A cached stage restores
+        the state it left behind, so later stages see exactly what they
+        would have seen after running it.
 
         Args:
-            iterations: Number of erosion iterations
-            drop_rate: Rate at which water drops are applied
-            erosion_strength: Strength of the erosion effect
+            name: Stage name
+            stage: Bound method implementing the stage
+            stage_params: Parameter overrides per stage name
+            **params: Default keyword arguments for the stage
 
         Returns:
-            Eroded heightmap as a 2D numpy array
+            The stage's return value
         """
-        if self.heightmap is None:
-            raise ValueError("Heightmap must be generated before applying erosion")
-
-        print(f"Applying enhanced erosion with {iterations} iterations...")
-
-        eroded_map = self.heightmap.copy()
-
-        # Generate flow direction map (pointing to lowest neighbor)
-        flow_dir = np.zeros((self.size, self.size, 2), dtype=int)
-        for y in range(1, self.size - 1):
-            for x in range(1, self.size - 1):
-                # Skip ocean areas (negative values)
-                if eroded_map[y, x] < 0:
-                    continue
-
-                # Find steepest descent neighbor
-                min_height = eroded_map[y, x]
-                min_dir = (0, 0)
-
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        if dy == 0 and dx == 0:
-                            continue
-
-                        ny, nx = y + dy, x + dx
-
-                        # Handle wrap-around for longitude (east-west)
-                        if nx < 0:
-                            nx = self.size - 1
-                        elif nx >= self.size:
-                            nx = 0
+        params.update(stage_params.get(name, {}))
+        if self.cache is None:
+            return stage(**params)
+
+        config = (self.size, self.octaves, self.persistence,
+                  self.lacunarity, self.earth_scale, self.dtype.str)
+        key = stage_key(self.seed, config, name, params, self._stage_state())
+        entry = self.cache.get(key)
+        if entry is not None:
+            count_event("stage_cache.hits")
+            state, result = entry
+            self._restore_stage_state(state)
+            print(f"Loaded stage '{name}' from cache")
+            return result
+
+        count_event("stage_cache.misses")
+        result = stage(**params)
+        self.cache.put(key, (self._stage_state(), result))
+        return result
+
+    def _stage_state(self) -> Dict[str, object]:
+        """Snapshot of the generator state read and written by the stages."""
+        return {
+            "heightmap": self.heightmap,
+            "continental_mask": self.continental_mask,
+            "valley_mask": self.valley_mask,
+            "river_network": self.river_network.arrays(),
+        }
 
-                        # Clamp latitude (north-south)
-                        ny = max(0, min(self.size - 1, ny))
+    def _restore_stage_state(self, state: Dict[str, object]) -> None:
+        """Restore a snapshot taken by ``_stage_state``."""
+        self.heightmap = state["heightmap"]
+        self.continental_mask = state["continental_mask"]
+        self.valley_mask = state["valley_mask"]
+        self.river_network = RiverNetwork.from_arrays(state["river_network"])
 
-                        if eroded_map[ny, nx] < min_height:
-                            min_height = eroded_map[ny, nx]
-                            min_dir = (dy, dx)
+    def _droplet_erosion(self, eroded_map: np.ndarray, iterations: int,
+                         drop_rate: float, erosion_strength: float,
+                         mode: str, flow_refresh: int,
+                         rng: np.random.Generator) -> None:
+        """Run the hydraulic droplet phase of apply_erosion in place.
 
-                flow_dir[y, x] = min_dir
+        Args:
+            eroded_map: C-contiguous float64 heightmap being eroded
+            iterations: Number of erosion iterations
+            drop_rate: Rate at which water drops are applied
+            erosion_strength: Strength of the erosion effect
+            mode: "droplet" or "batched"
+            flow_refresh: In batched mode, recompute the flow directions
+                every this many iterations
+            rng: Random generator for the droplet start positions
+        """
+        # Flow direction map (pointing to lowest neighbor), none over ocean
+        flow_dir = self.flow_field().offsets
+        flow_dir[eroded_map < 0] = 0
 
-        # Hydraulic erosion phase
-        for _ in range(iterations):
-            # Random water drops
+        for iteration in range(iterations):
+            # Random water drops as (y, x) start positions
             num_drops = int(self.size * self.size * drop_rate)
-            for _ in range(num_drops):
-                x, y = (np.random.randint(1, self.size - 1),
-                        np.random.randint(1, self.size - 1))
-
-                # Skip ocean areas
-                if eroded_map[y, x] < 0:
-                    continue
-
-                # Water carries sediment
-                sediment = 0.0
-                path = []
+            drops = rng.integers(1, self.size - 1, size=(num_drops, 2),
+                                      dtype=np.int64)
+            count_event("erosion.droplets", num_drops)
+
+            if mode == "droplet":
+                # Follow each droplet downhill, eroding and depositing sediment
+                self.kernels.droplet_erosion(eroded_map, flow_dir, drops,
+                                             float(erosion_strength))
+                continue
 
-                # Simulate water flow path
-                for _ in range(30):  # Maximum path length
-                    path.append((y, x))
+            # Let the drainage follow the eroded terrain
+            if iteration > 0 and flow_refresh > 0 \
+                    and iteration % flow_refresh == 0:
+                flow_dir = FlowField(eroded_map, kernels=self.kernels).offsets
+                flow_dir[eroded_map < 0] = 0
 
-                    dy, dx = flow_dir[y, x]
-                    if dy == 0 and dx == 0:
-                        break
+            batched_droplet_erosion(eroded_map, flow_dir, drops,
+                                    float(erosion_strength))
 
-                    # Handle wrap-around for x
-                    nx = (x + dx) % self.size
-                    # Clamp y to valid range
-                    ny = max(0, min(self.size - 1, y + dy))
-
-                    # Calculate height difference
-                    h_diff = eroded_map[y, x] - eroded_map[ny, nx]
-
-                    # Erode proportional to slope
-                    if h_diff > 0:
-                        # Erode more on steeper slopes
-                        erode_amount = min(h_diff * erosion_strength, 0.01)
-                        eroded_map[y, x] -= erode_amount
-                        sediment += erode_amount
-                    else:
-                        # Deposit some sediment when slope decreases
-                        deposit = sediment * 0.5
-                        eroded_map[y, x] += deposit
-                        sediment -= deposit
-
-                    # Move to next position
-                    x, y = nx, ny
-
-                    # Stop at ocean or local minimum
-                    if eroded_map[y, x] < 0:
-                        break
+    @profiled
+    def apply_erosion(self, iterations: int = 50, drop_rate: float = 0.05,
+                      erosion_strength: float = 0.3, mode: str = "droplet",
+                      flow_refresh: int = 5,
+                      rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Apply enhanced hydraulic and thermal erosion to the heightmap.
 
-                # Deposit remaining sediment along path
-                if sediment > 0 and path:
-                    deposit_per_cell = sediment / len(path)
-                    for py, px in path:
-                        eroded_map[py, px] += deposit_per_cell
-
-        # Thermal weathering phase
-        for _ in range(iterations // 2):
-            for y in range(1, self.size - 1):
-                for x in range(1, self.size - 1):
-                    # Skip ocean areas
-                    if eroded_map[y, x] < 0:
-                        continue
-
-                    # Calculate max slope to neighbors
-                    max_slope = 0
-                    max_slope_dir = (0, 0)
-
-                    for dy, dx in [(-1,0), (1,0), (0,-1), (0,1)]:
-                        # Handle wrap-around for x
-                        nx = (x + dx) % self.size
-                        # Clamp y to valid range
-                        ny = max(0, min(self.size - 1, y + dy))
+        Args:
+            iterations: Number of erosion iterations
+            drop_rate: Rate at which water drops are applied
+            erosion_strength: Strength of the erosion effect
+            mode: "droplet" follows the droplets one at a time, "batched"
+                advances all droplets of an iteration together as arrays,
+                "stream_power" runs implicit landscape-evolution time steps
+                (``iterations`` is then the maximum number of steps)
+            flow_refresh: In batched mode, recompute the flow directions
+                from the eroded terrain every this many iterations
+            rng: Random generator (defaults to the stage's own stream,
+                see ``stage_rng``)
 
-                        slope = eroded_map[y, x] - eroded_map[ny, nx]
-                        if slope > max_slope:
-                            max_slope = slope
-                            max_slope_dir = (dy, dx)
+        Returns:
+            Eroded heightmap as a 2D numpy array
+        """
+        if self.heightmap is None:
+            raise ValueError("Heightmap must be generated before applying erosion")
+        self._require_in_memory("Erosion")
+        if mode not in EROSION_MODES:
+            raise ValueError(f"Unknown erosion mode '{mode}', "
+                             f"expected one of {EROSION_MODES}")
+        rng = rng if rng is not None else self.stage_rng("apply_erosion")
 
-                    # If slope exceeds talus angle, apply thermal erosion
-                    talus_angle = 0.05  # Threshold for slope stability
-                    if max_slope > talus_angle:
-                        # Calculate material to move
-                        move_amount = (max_slope - talus_angle) * 0.5
+        print(f"Applying enhanced erosion with {iterations} iterations...")
 
-                        # Remove material from current cell
-                        eroded_map[y, x] -= move_amount
+        eroded_map = np.array(self.heightmap, dtype=np.float64, order="C")
+
+        if mode == "stream_power":
+            # Landscape evolution towards a steady state, with hillslope
+            # diffusion in place of thermal weathering
+            uplift = (np.maximum(eroded_map, 0) * erosion_strength
+                      * STREAM_POWER_UPLIFT)
+            steps = stream_power_erosion(
+                eroded_map, iterations, self.kernels, erosion_strength,
+                uplift, STREAM_POWER_DIFFUSIVITY, STREAM_POWER_TIME_STEP)
+            print(f"Stream-power erosion finished after {steps} steps")
+            count_event("erosion.stream_power_steps", steps)
+        else:
+            # Hydraulic erosion phase
+            self._droplet_erosion(eroded_map, iterations, drop_rate,
+                                  erosion_strength, mode, flow_refresh, rng)
 
-                        # Deposit at downslope neighbor
-                        dy, dx = max_slope_dir
-                        ny = max(0, min(self.size - 1, y + dy))
-                        nx = (x + dx) % self.size
-                        eroded_map[ny, nx] += move_amount
+            # Thermal weathering phase
+            sweeps = thermal_weathering(eroded_map, iterations // 2)
+            count_event("erosion.thermal_sweeps", sweeps)
 
         # Apply additional smoothing to create more gradual transitions
         smoothed_map = eroded_map.copy()
-        for y in range(1, self.size-1):
-            for x in range(1, self.size-1):
-                # Skip water
-                if eroded_map[y, x] < 0:
-                    continue
-                    
-                # Calculate local average
-                local_sum = 0
-                local_count = 0
-                max_diff = 0
-                
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        if dy == 0 and dx == 0:
-                            continue
-                            
-                        ny = max(0, min(self.size-1, y+dy))
-                        nx = (x+dx) % self.size
-                        
-                        # Skip water neighbors
-                        if eroded_map[ny, nx] < 0:
-                            continue
-                            
-                        local_sum += eroded_map[ny, nx]
-                        local_count += 1
-                        
-                        # Track maximum elevation difference
-                        diff = abs(eroded_map[y, x] - eroded_map[ny, nx])
-                        max_diff = max(max_diff, diff)
-                
-                if local_count == 0:
-                    continue
-                    
-                local_avg = local_sum / local_count
-                
-                # Apply stronger smoothing to cells with large elevation differences
-                if max_diff > 0.1:
-                    # More aggressive smoothing for steep transitions
-                    smoothing_strength = min(0.3, max_diff)
-                    smoothed_map[y, x] = eroded_map[y, x] * (1-smoothing_strength) + local_avg * smoothing_strength
+        land = eroded_map >= 0
+        local_sum = np.zeros_like(eroded_map)
+        local_count = np.zeros_like(eroded_map)
+        max_diff = np.zeros_like(eroded_map)
+        for dy, dx in D8_OFFSETS:
+            # Skip water neighbors
+            neighbour = shift(eroded_map, dy, dx)
+            neighbour_land = neighbour >= 0
+            local_sum += np.where(neighbour_land, neighbour, 0.0)
+            local_count += neighbour_land
+
+            # Track maximum elevation difference
+            diff = np.where(neighbour_land, np.abs(eroded_map - neighbour), 0.0)
+            np.maximum(max_diff, diff, out=max_diff)
+
+        # Apply stronger smoothing to cells with large elevation differences
+        # (land cells away from the map border only)
+        steep = land & (local_count > 0) & (max_diff > 0.1)
+        steep[[0, -1], :] = False
+        steep[:, [0, -1]] = False
+        local_avg = local_sum[steep] / local_count[steep]
+        smoothing_strength = np.minimum(0.3, max_diff[steep])
+        smoothed_map[steep] = (eroded_map[steep] * (1 - smoothing_strength)
+                               + local_avg * smoothing_strength)
 
         # Normalize if needed
         if np.min(smoothed_map) < -0.5 or np.max(smoothed_map) > 1.0:
@@ -2462,10 +2744,12 @@ class TerrainGenerator:
         self.heightmap = smoothed_map
         return smoothed_map
 
+    @profiled
     def generate_water_bodies(self, water_coverage: float = 0.65) -> Tuple[np.ndarray, np.ndarray]:
         """Generate water bodies (oceans, lakes) based on the heightmap."""
         if self.heightmap is None:
             raise ValueError("Heightmap must be generated before creating water bodies")
+        self._require_in_memory("Water body generation")
 
         print(f"Generating water bodies with {water_coverage:.0%} water coverage...")
 
@@ -2480,14 +2764,13 @@ class TerrainGenerator:
 
         print(f"Calculated sea level threshold: {sea_level:.4f}")
 
-        # Create water mask (1 where water exists, 0 elsewhere)
-        water_mask = np.zeros_like(water_heightmap)
-        water_mask[water_heightmap < sea_level] = 1
+        # Create water mask (True where water exists)
+        water_mask = water_heightmap < sea_level
 
         # Lower terrain below sea level to create negative values for oceans
         for y in range(self.size):
             for x in range(self.size):
-                if water_mask[y, x] > 0:
+                if water_mask[y, x]:
                     # Normalize depths
                     depth_factor = (sea_level - water_heightmap[y, x]) / sea_level
                     # Make ocean depths negative - but not too extreme
@@ -2502,85 +2785,142 @@ class TerrainGenerator:
 
         return self.heightmap, water_mask
 
+    def _render_level(self, region: Optional[Tuple[float, float, float, float]],
+                      resolution: int) -> PyramidLevel:
+        """Level to draw a map region from.
+
+        With a pyramid from ``generate_progressive`` this is the coarsest
+        level with at least ``resolution`` cells across the region, otherwise
+        the full-resolution heightmap.
+
+        Args:
+            region: (top, bottom, left, right) map fractions in [0, 1], or
+                None for the whole map
+            resolution: Number of pixels across the rendered region
+
+        Returns:
+            Uncropped level
+        """
+        if self.pyramid is not None:
+            return self.pyramid.level_for(resolution, region)
+        return PyramidLevel(self.size, self.heightmap, self.continental_mask,
+                            self.valley_mask)
+
+    def _render_view(self, region: Optional[Tuple[float, float, float, float]],
+                     resolution: int,
+                     water_mask: Optional[np.ndarray] = None
+                     ) -> Tuple[PyramidLevel, Optional[np.ndarray], np.ndarray]:
+        """Select the fields to draw for a map region (see ``_render_level``).
+
+        Args:
+            region: (top, bottom, left, right) map fractions in [0, 1], or
+                None for the whole map
+            resolution: Number of pixels across the rendered region
+            water_mask: Optional full-resolution water mask
+
+        Returns:
+            Tuple of (level cropped to the region, water mask resampled to
+            the level and cropped, latitude of each row in degrees)
+        """
+        level = self._render_level(region, resolution)
+        size = level.size
+        if water_mask is not None and water_mask.shape[0] != size:
+            # Nearest full-resolution cell of every level cell
+            cells = np.arange(size) * water_mask.shape[0] // size
+            water_mask = water_mask[np.ix_(cells, cells)]
+
+        latitudes = 90 - (np.arange(size) / (size - 1) * 180)
+        crop = HeightmapPyramid.crop
+        rows = crop(latitudes[:, np.newaxis], (region[0], region[1], 0.0, 1.0)
+                    if region is not None else None)[:, 0]
+        view = PyramidLevel(
+            size, crop(level.heightmap, region),
+            None if level.continental_mask is None
+            else crop(level.continental_mask, region),
+            None if level.valley_mask is None
+            else crop(level.valley_mask, region))
+        return (view, None if water_mask is None
+                else crop(water_mask, region), rows)
+
     def visualize(self, water_mask: Optional[np.ndarray] = None,
                   title: str = "Terrain Heightmap",
-                  show_grid: bool = False):
+                  show_grid: bool = False,
+                  region: Optional[Tuple[float, float, float, float]] = None,
+                  resolution: int = 1024):
         """Visualize the current heightmap with improved water representation.
 
         Args:
             water_mask: Optional mask indicating water bodies
             title: Title for the plot
             show_grid: Whether to show a grid indicating cell sizes
+            region: Optional (top, bottom, left, right) map fractions in
+                [0, 1] to zoom into
+            resolution: Number of pixels across the shown region, used to
+                pick the pyramid level after ``generate_progressive``
         """
         if self.heightmap is None:
             raise ValueError("No heightmap to visualize")
 
+        view, water_mask, latitudes = self._render_view(region, resolution,
+                                                        water_mask)
+        km_per_cell = self.km_per_cell * self.size / view.size
+        rows, cols = view.heightmap.shape
+
         plt.figure(figsize=(12, 10))
 
         # Create a custom colormap that handles negative values for ocean
         if water_mask is not None:
-            # Create a copy to avoid modifying the original
-            terrain_vis = self.heightmap.copy()
-
-            # Create a visually appealing terrain map
-            terrain_rgb = np.zeros((self.size, self.size, 4))
-
-            for y in range(self.size):
-                for x in range(self.size):
-                    # Get current latitude for information
-                    latitude = self.latitudes[y]
-                    
-                    if water_mask[y, x] > 0:
-                        # Ocean depth (negative values)
-                        # Map -0.5-0 to blues (darker for deeper)
-                        depth = terrain_vis[y, x]
-                        if depth >= 0:
-                            # Shallow water (light blue)
-                            terrain_rgb[y, x] = [0.6, 0.8, 1.0, 1.0]
-                        else:
-                            # Normalize depth to 0-1 (deeper = higher value)
-                            norm_depth = min(1.0, -depth / 0.5)
-                            # Darker blue for deeper water
-                            blue = 0.7 - norm_depth * 0.5
-                            terrain_rgb[y, x] = [0.0, 0.2 + blue * 0.3, 0.5 + blue * 0.5, 1.0]
-                    else:
-                        # Land elevation (positive values)
-                        height = terrain_vis[y, x]
-                        
-                        # Polar regions (snow-capped)
-                        if abs(latitude) > 70 and height > 0.3:
-                            # Brighter white for higher elevations
-                            snow_factor = min(1.0, (height - 0.3) * 3.0)
-                            white_base = 0.8 + snow_factor * 0.2
-                            terrain_rgb[y, x] = [white_base, white_base, white_base + 0.05, 1.0]
-                            
-                        elif height < 0.1:
-                            # Coast/Beach (tan/yellow)
-                            terrain_rgb[y, x] = [0.9, 0.8, 0.6, 1.0]
-                        elif height < 0.3:
-                            # Lowlands (green)
-                            norm_height = (height - 0.1) / 0.2
-                            terrain_rgb[y, x] = [0.2 + norm_height * 0.4, 0.7 - norm_height * 0.2, 0.2, 1.0]
-                        elif height < 0.7:
-                            # Hills/Highlands (brown/tan)
-                            norm_height = (height - 0.3) / 0.4
-                            terrain_rgb[y, x] = [0.6 + norm_height * 0.2, 0.5 - norm_height * 0.2, 0.2, 1.0]
-                        else:
-                            # Mountains (white/gray)
-                            norm_height = (height - 0.7) / 0.3
-                            white = 0.7 + norm_height * 0.3
-                            terrain_rgb[y, x] = [white, white, white, 1.0]
+            height = view.heightmap
+            latitude = latitudes[:, np.newaxis]
+            water = water_mask > 0
+
+            # Ocean depth (negative values): map -0.5-0 to blues (darker for
+            # deeper), shallow water (at or above zero) is light blue
+            norm_depth = np.minimum(1.0, -height / 0.5)
+            blue = 0.7 - norm_depth * 0.5
+            deep_water = np.stack([np.zeros_like(blue), 0.2 + blue * 0.3,
+                                   0.5 + blue * 0.5], axis=-1)
+
+            # Polar regions (snow-capped), brighter white for higher
+            # elevations
+            snow_factor = np.minimum(1.0, (height - 0.3) * 3.0)
+            white_base = 0.8 + snow_factor * 0.2
+            snow = np.stack([white_base, white_base, white_base + 0.05],
+                            axis=-1)
+
+            # Lowlands (green) and hills/highlands (brown/tan)
+            norm_low = (height - 0.1) / 0.2
+            lowland = np.stack([0.2 + norm_low * 0.4, 0.7 - norm_low * 0.2,
+                                np.full_like(height, 0.2)], axis=-1)
+            norm_hill = (height - 0.3) / 0.4
+            hills = np.stack([0.6 + norm_hill * 0.2, 0.5 - norm_hill * 0.2,
+                              np.full_like(height, 0.2)], axis=-1)
+
+            # Mountains (white/gray)
+            white = 0.7 + (height - 0.7) / 0.3 * 0.3
+            mountains = np.stack([white, white, white], axis=-1)
+
+            colour = np.select(
+                [c[..., np.newaxis] for c in (
+                    water & (height >= 0), water,
+                    (np.abs(latitude) > 70) & (height > 0.3),
+                    height < 0.1, height < 0.3, height < 0.7)],
+                [np.array([0.6, 0.8, 1.0]), deep_water, snow,
+                 np.array([0.9, 0.8, 0.6]), lowland, hills],
+                default=mountains)
+            terrain_rgb = np.concatenate(
+                [colour, np.ones((rows, cols, 1))], axis=-1)
 
             plt.imshow(terrain_rgb)
         else:
             # Use a standard colormap if no water mask
-            plt.imshow(self.heightmap, cmap="terrain")
+            plt.imshow(view.heightmap, cmap="terrain")
 
         # Show scale information
         scale_text = f"World Scale: {self.earth_scale:.2%} of Earth\n"
-        scale_text += f"Grid Cell: {self.km_per_cell:.1f} km × "
-        scale_text += f"{self.km_per_cell:.1f} km\n"
-        scale_text += f"Cell Area: {self.area_per_cell_sqmiles:.1f} sq miles"
+        scale_text += f"Grid Cell: {km_per_cell:.1f} km × "
+        scale_text += f"{km_per_cell:.1f} km\n"
+        scale_text += f"Cell Area: {km_per_cell ** 2 * 0.386102:.1f} sq miles"
 
         # Place scale info in the upper left
         plt.annotate(scale_text,
@@ -2594,23 +2934,25 @@ class TerrainGenerator:
                               alpha=0.8))
 
         # If requested, add grid for scale reference
-        if show_grid and self.size > 20:
+        if show_grid and min(rows, cols) > 20:
             # Draw grid lines every 20% of the way across
-            grid_step = max(1, self.size // 5)
-            for i in range(0, self.size + 1, grid_step):
+            grid_step = max(1, min(rows, cols) // 5)
+            for i in range(0, rows + 1, grid_step):
                 plt.axhline(i, color="white", alpha=0.3, linestyle=":")
+            for i in range(0, cols + 1, grid_step):
                 plt.axvline(i, color="white", alpha=0.3, linestyle=":")
 
             # Label a few key points
-            for i in range(0, self.size + 1, grid_step):
-                plt.text(i, -5, f"{int(i * self.km_per_cell)} km",
+            for i in range(0, cols + 1, grid_step):
+                plt.text(i, -5, f"{int(i * km_per_cell)} km",
                         color="black", ha="center", fontsize=8)
-                plt.text(-5, i, f"{int(i * self.km_per_cell)} km",
+            for i in range(0, rows + 1, grid_step):
+                plt.text(-5, i, f"{int(i * km_per_cell)} km",
                         color="black", va="center", fontsize=8)
                 
                 # Also show latitude labels
-                lat_val = self.latitudes[min(i, self.size-1)] if i < self.size else -90
-                plt.text(self.size + 5, i, f"{lat_val:.0f}°",
+                lat_val = latitudes[i] if i < rows else latitudes[-1]
+                plt.text(cols + 5, i, f"{lat_val:.0f}°",
                         color="black", va="center", fontsize=8)
 
         # Add a custom colorbar that shows both ocean depths and land heights
@@ -2636,7 +2978,7 @@ class TerrainGenerator:
         plt.tight_layout()
         plt.show()
 
-    def visualize_water_system(self, water_systems: Dict[str, np.ndarray],
+    def visualize_water_system(self, water_systems: Mapping[str, np.ndarray],
                           title: str = "Complete Water System"):
         """Visualize water systems with different colors for each type."""
         if self.heightmap is None:
@@ -2658,27 +3000,15 @@ class TerrainGenerator:
 
         # Apply ocean/sea (deep blue)
         if "ocean" in water_systems:
-            for y in range(self.size):
-                for x in range(self.size):
-                    if water_systems["ocean"][y, x] > 0:
-                        # Deep blue for oceans
-                        rgb_image[y, x] = [0.0, 0.1, 0.5, 1.0]
+            rgb_image[np.asarray(water_systems["ocean"]) > 0] = [0.0, 0.1, 0.5, 1.0]
 
         # Apply lakes (lighter blue)
         if "lakes" in water_systems:
-            for y in range(self.size):
-                for x in range(self.size):
-                    if water_systems["lakes"][y, x] > 0:
-                        # Lighter blue for lakes
-                        rgb_image[y, x] = [0.2, 0.4, 0.8, 1.0]
+            rgb_image[np.asarray(water_systems["lakes"]) > 0] = [0.2, 0.4, 0.8, 1.0]
 
         # Apply rivers last (bright blue with higher contrast for visibility)
         if "rivers" in water_systems:
-            for y in range(self.size):
-                for x in range(self.size):
-                    if water_systems["rivers"][y, x] > 0:
-                        # Brighter, more distinct blue for rivers
-                        rgb_image[y, x] = [0.0, 0.7, 1.0, 1.0]  # More vibrant blue
+            rgb_image[np.asarray(water_systems["rivers"]) > 0] = [0.0, 0.7, 1.0, 1.0]
 
         plt.imshow(rgb_image)
 
@@ -2713,76 +3043,73 @@ class TerrainGenerator:
         plt.tight_layout()
         plt.show()
     
-    def visualize_feature_map(self, title: str = "Terrain Feature Map"):
-        """Visualize a colored map showing different terrain features."""
+    def visualize_feature_map(self, title: str = "Terrain Feature Map",
+                              region: Optional[Tuple[float, float, float, float]] = None,
+                              resolution: int = 1024):
+        """Visualize a colored map showing different terrain features.
+
+        Args:
+            title: Title for the plot
+            region: Optional (top, bottom, left, right) map fractions in
+                [0, 1] to zoom into
+            resolution: Number of pixels across the shown region, used to
+                pick the pyramid level after ``generate_progressive``
+        """
         if self.heightmap is None:
             raise ValueError("No heightmap to visualize")
-            
+
+        # Local slopes are computed on the whole level so the wrap-around
+        # and pole neighbours are the same as without zooming
+        level = self._render_level(region, resolution)
+        km_per_cell = self.km_per_cell * self.size / level.size
+
         plt.figure(figsize=(12, 10))
-        
-        # Create a feature classification map
-        feature_map = np.zeros((self.size, self.size, 3))
-        
+
         # Feature detection based on heightmap and derivatives
-        for y in range(self.size):
-            for x in range(self.size):
-                height = self.heightmap[y, x]
-                
-                # Calculate local slope
-                local_slope = 0
-                neighbor_count = 0
-                
-                for dy in [-1, 0, 1]:
-                    for dx in [-1, 0, 1]:
-                        if dy == 0 and dx == 0:
-                            continue
-                            
-                        ny = max(0, min(self.size - 1, y + dy))
-                        nx = (x + dx) % self.size
-                        
-                        local_slope += abs(height - self.heightmap[ny, nx])
-                        neighbor_count += 1
-                
-                avg_slope = local_slope / neighbor_count if neighbor_count > 0 else 0
-                
-                # Feature classification
-                if height < 0:
-                    # Ocean - darker blue for deeper
-                    depth_factor = min(1.0, -height / 0.5)
-                    feature_map[y, x] = [0.0, 0.1 + (0.2 * (1-depth_factor)), 0.4 + (0.3 * (1-depth_factor))]
-                    
-                elif height < 0.05:
-                    # Beaches/coastlines - yellow
-                    feature_map[y, x] = [0.95, 0.85, 0.55]
-                    
-                elif height < 0.3:
-                    if avg_slope < 0.01:
-                        # Plains - light green
-                        feature_map[y, x] = [0.4, 0.8, 0.4]
-                    else:
-                        # Rolling hills - darker green
-                        feature_map[y, x] = [0.2, 0.6, 0.3]
-                        
-                elif height < 0.6:
-                    if avg_slope > 0.04:
-                        # Rugged highlands - brown
-                        feature_map[y, x] = [0.6, 0.4, 0.2]
-                    elif hasattr(self, 'valley_mask') and self.valley_mask is not None and self.valley_mask[y, x] > 0.3:
-                        # Valleys - olive green
-                        feature_map[y, x] = [0.5, 0.5, 0.2]
-                    else:
-                        # Hills - light brown
-                        feature_map[y, x] = [0.7, 0.5, 0.3]
-                        
-                elif height < 0.8:
-                    # Low mountains - dark gray
-                    feature_map[y, x] = [0.4, 0.4, 0.4]
-                    
-                else:
-                    # High mountains - white to gray based on height
-                    white_factor = (height - 0.8) / 0.2  # 0 to 1
-                    base_color = 0.6 + (white_factor * 0.4)  # 0.6 to 1.0
-                    feature_map[y, x] = [base_color, base_color, base_color]
+        heightmap = level.heightmap
+        local_slope = np.zeros(heightmap.shape)
+        for dy in [-1, 0, 1]:
+            for dx in [-1, 0, 1]:
+                if dy == 0 and dx == 0:
+                    continue
+                local_slope += np.abs(heightmap - shift(heightmap, dy, dx))
+        avg_slope = HeightmapPyramid.crop(local_slope / 8, region)
+        height = HeightmapPyramid.crop(heightmap, region)
+        valleys = (HeightmapPyramid.crop(level.valley_mask, region) > 0.3
+                   if level.valley_mask is not None
+                   else np.zeros(height.shape, dtype=bool))
+
+        # Ocean - darker blue for deeper
+        depth_factor = np.minimum(1.0, -height / 0.5)
+        ocean = np.stack([np.zeros_like(height),
+                          0.1 + (0.2 * (1 - depth_factor)),
+                          0.4 + (0.3 * (1 - depth_factor))], axis=-1)
+
+        # High mountains - white to gray based on height
+        white_factor = (height - 0.8) / 0.2  # 0 to 1
+        base_color = 0.6 + (white_factor * 0.4)  # 0.6 to 1.0
+        peaks = np.stack([base_color, base_color, base_color], axis=-1)
+
+        # Feature classification
+        feature_map = np.select(
+            [c[..., np.newaxis] for c in (
+                height < 0,
+                height < 0.05,
+                (height < 0.3) & (avg_slope < 0.01),
+                height < 0.3,
+                (height < 0.6) & (avg_slope > 0.04),
+                (height < 0.6) & valleys,
+                height < 0.6,
+                height < 0.8)],
+            [ocean,
+             np.array([0.95, 0.85, 0.55]),  # Beaches/coastlines - yellow
+             np.array([0.4, 0.8, 0.4]),     # Plains - light green
+             np.array([0.2, 0.6, 0.3]),     # Rolling hills - darker green
+             np.array([0.6, 0.4, 0.2]),     # Rugged highlands - brown
+             np.array([0.5, 0.5, 0.2]),     # Valleys - olive green
+             np.array([0.7, 0.5, 0.3]),     # Hills - light brown
+             np.array([0.4, 0.4, 0.4])],    # Low mountains - dark gray
+            default=peaks)
         
         plt.imshow(feature_map)
         
@@ -2802,9 +3129,9 @@ class TerrainGenerator:
         
         # Show scale information
         scale_text = f"World Scale: {self.earth_scale:.2%} of Earth\n"
-        scale_text += f"Grid Cell: {self.km_per_cell:.1f} km × "
-        scale_text += f"{self.km_per_cell:.1f} km\n"
-        scale_text += f"Cell Area: {self.area_per_cell_sqmiles:.1f} sq miles"
+        scale_text += f"Grid Cell: {km_per_cell:.1f} km × "
+        scale_text += f"{km_per_cell:.1f} km\n"
+        scale_text += f"Cell Area: {km_per_cell ** 2 * 0.386102:.1f} sq miles"
 
         plt.annotate(scale_text, (0.02, 0.98), xycoords="figure fraction",
                     verticalalignment="top", color="black",
@@ -2842,12 +3169,12 @@ class TerrainGenerator:
         print(f"Heightmap loaded from {filename}")
         return self.heightmap
         
+    @profiled
     def generate_complete_water_system(self,
                                        ocean_coverage: float = 0.65,
                                        river_count: int = 25,
-                                       lake_count: int = 15) -> Tuple[np.ndarray,
-                                                                      Dict[str,
-                                                                           np.ndarray]]:
+                                       lake_count: int = 15
+                                       ) -> Tuple[np.ndarray, WaterBodies]:
         """Generate a complete water system with oceans, rivers, and lakes.
 
         Args:
@@ -2856,13 +3183,15 @@ class TerrainGenerator:
             lake_count: Number of lakes to generate
 
         Returns:
-            Tuple of (combined water mask, individual water feature masks)
+            Tuple of (combined boolean water mask, water body label raster,
+            which maps "ocean", "rivers" and "lakes" to their masks)
         """
         print("\n=== Generating Complete Water System ===")
 
         # Apply erosion before adding water
         print("\n1. Applying realistic erosion to terrain...")
-        self.apply_erosion(iterations=30, erosion_strength=0.2)
+        self.apply_erosion(iterations=30, erosion_strength=0.2,
+                           mode="batched")
 
         # Generate oceans and seas
         print("\n2. Generating oceans and seas...")
@@ -2879,20 +3208,19 @@ class TerrainGenerator:
 
         # Apply a final erosion pass to smooth out all features
         print("\n5. Applying final terrain smoothing...")
-        self.apply_erosion(iterations=10, erosion_strength=0.1)
-
-        # Update the ocean mask based on current heightmap
-        ocean_mask = np.zeros_like(self.heightmap)
-        ocean_mask[self.heightmap < 0] = 1
+        self.apply_erosion(iterations=10, erosion_strength=0.1,
+                           mode="batched")
 
-        # Combine all water features
-        combined_water_mask = np.zeros_like(self.heightmap)
-        combined_water_mask[ocean_mask > 0] = 1
-        combined_water_mask[river_mask > 0] = 1
-        combined_water_mask[lake_mask > 0] = 1
+        # Label the water bodies, with the ocean taken from the current
+        # heightmap
+        water_systems = WaterBodies.from_masks(ocean=self.heightmap < 0,
+                                               rivers=river_mask,
+                                               lakes=lake_mask)
+        ocean_mask = water_systems["ocean"]
+        combined_water_mask = water_systems.water
 
         # Calculate actual water coverage
-        total_water = np.sum(combined_water_mask)
+        total_water = np.count_nonzero(combined_water_mask)
         water_percentage = total_water / combined_water_mask.size
 
         print("\nWater System Statistics:")
@@ -2902,12 +3230,8 @@ class TerrainGenerator:
         print(f"  Lake cells: {np.sum(lake_mask)} "
               f"({np.sum(lake_mask) / lake_mask.size:.2%})")
         print(f"  Total water coverage: {water_percentage:.2%}")
+        print(f"  Water bodies: {water_systems.count}")
 
-        # Return the combined mask and individual feature masks
-        water_systems = {
-            "ocean": ocean_mask,
-            "rivers": river_mask,
-            "lakes": lake_mask
-        }
-
+        # Return the combined mask and the label raster, which also yields
+        # the individual feature masks
         return combined_water_mask, water_systems
\ No newline at end of file
@@ -0,0 +1,383 @@
+"""Out-of-core tile storage for EmergenWorld terrain generation.
+
+Worlds larger than RAM keep their full-size arrays in ``.npy`` files that are
+memory-mapped from a working directory and processed one tile at a time.
+Tiles are horizontal bands of rows spanning the full longitude range, so the
+east-west wrap that the terrain stencils rely on (``x % size``) holds inside
+every tile without any seam handling. Stencil operations read a tile together
+with a halo of neighbouring rows; at the poles the halo is clamped (or
+reflected) exactly like the in-memory code paths clamp the latitude.
+
+Whole-array reductions (minimum/maximum, percentiles) and the Euclidean
+distance transform are computed exactly with multi-pass tile algorithms, so a
+tiled world matches the in-memory world for the same seed.
+
+Mapped pages stay resident until they are released: every ``max_tiles`` tile
+reads or writes, the store writes the dirty pages back and drops all mapped
+pages from memory, so the mapped part of the resident memory stays bounded
+by the tile budget.
+"""
+
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+# Number of histogram bins used to locate order statistics
+PERCENTILE_BINS = 4096
+
+
+class Tile(NamedTuple):
+    """A band of rows ``[y0, y1)`` spanning the full map width."""
+
+    index: int
+    y0: int
+    y1: int
+
+    @property
+    def rows(self) -> int:
+        """Number of rows in the tile."""
+        return self.y1 - self.y0
+
+
+class TileStore:
+    """Memory-mapped world arrays processed in row-band tiles.
+
+    After ``max_tiles`` tiles have been read or written, the mapped files
+    are flushed to disk and their pages released, so peak memory is bounded
+    by the tile size and tile count rather than by the world size.
+    """
+
+    def __init__(self, size: int, kernels, tile_rows: int = 256,
+                 max_tiles: int = 4, workdir: Optional[str] = None,
+                 dtype=np.float64):
+        """Initialize the tile store.
+
+        Args:
+            size: World size (arrays are size x size)
+            kernels: Kernel backend used for the distance transform
+            tile_rows: Number of rows in each tile
+            max_tiles: Number of tiles read or written before the mapped
+                pages are flushed and released
+            workdir: Directory holding the array files (a temporary
+                directory is created and removed on ``close`` if omitted)
+            dtype: Default data type of the arrays
+        """
+        if tile_rows < 1:
+            raise ValueError("tile_rows must be at least 1")
+        if max_tiles < 1:
+            raise ValueError("max_tiles must be at least 1")
+
+        self.size = size
+        self.kernels = kernels
+        self.dtype = np.dtype(dtype)
+        self.tile_rows = min(tile_rows, size)
+        self.max_tiles = max_tiles
+        self._cleanup = None
+        if workdir is None:
+            workdir = tempfile.mkdtemp(prefix="emergenworld_tiles_")
+            # Remove the temporary files once the store is garbage collected
+            self._cleanup = weakref.finalize(self, shutil.rmtree, workdir,
+                                             True)
+        else:
+            os.makedirs(workdir, exist_ok=True)
+        self.workdir = workdir
+        self._arrays: Dict[str, np.memmap] = {}
+        self._pending_tiles = 0
+
+    def path(self, name: str) -> str:
+        """Return the file path backing an array."""
+        return os.path.join(self.workdir, f"{name}.npy")
+
+    def array(self, name: str, dtype=None) -> np.memmap:
+        """Create (or recreate) a memory-mapped size x size array.
+
+        Args:
+            name: Array name, used as the file name
+            dtype: Array data type (the store's default if omitted)
+
+        Returns:
+            Writable memory-mapped array
+        """
+        self.release(name)
+        array = open_memmap(self.path(name), mode="w+",
+                            dtype=dtype if dtype is not None else self.dtype,
+                            shape=(self.size, self.size))
+        self._arrays[name] = array
+        return array
+
+    def remove(self, name: str) -> None:
+        """Release an array and delete its file.
+
+        Callers drop their own references to the array first: the file of a
+        mapped array cannot be deleted on Windows.
+        """
+        self.release(name)
+        if os.path.exists(self.path(name)):
+            os.remove(self.path(name))
+
+    def release(self, name: str) -> None:
+        """Flush an array and drop the store's reference to its mapping."""
+        array = self._arrays.pop(name, None)
+        if array is not None:
+            array.flush()
+
+    def tiles(self) -> Iterator[Tile]:
+        """Iterate over the tiles from north to south."""
+        for index, y0 in enumerate(range(0, self.size, self.tile_rows)):
+            yield Tile(index, y0, min(y0 + self.tile_rows, self.size))
+
+    def read(self, array: np.ndarray, tile: Tile, halo: int = 0,
+             mode: str = "clamp") -> np.ndarray:
+        """Load a tile (plus halo rows) into memory.
+
+        Args:
+            array: Source array
+            tile: Tile to read
+            halo: Number of extra rows above and below the tile
+            mode: How rows beyond the poles are filled: "clamp" repeats the
+                edge row, "reflect" mirrors the rows (scipy's "reflect")
+
+        Returns:
+            In-memory array of shape (tile.rows + 2 * halo, size)
+        """
+        if halo == 0:
+            values = np.array(array[tile.y0:tile.y1])
+        else:
+            rows = np.arange(tile.y0 - halo, tile.y1 + halo)
+            if mode == "clamp":
+                rows = np.clip(rows, 0, self.size - 1)
+            elif mode == "reflect":
+                rows = np.where(rows < 0, -rows - 1, rows)
+                rows = np.where(rows >= self.size,
+                                2 * self.size - rows - 1, rows)
+            else:
+                raise ValueError(f"Unknown halo mode '{mode}'")
+            values = np.array(array[rows])
+        self._touch()
+        return values
+
+    def write(self, array: np.ndarray, tile: Tile, values: np.ndarray) -> None:
+        """Store a processed tile, flushing once enough tiles are buffered.
+
+        Args:
+            array: Destination array
+            tile: Tile to write
+            values: Tile values of shape (tile.rows, size)
+        """
+        array[tile.y0:tile.y1] = values
+        self._touch()
+
+    def _touch(self) -> None:
+        """Count one tile of mapped pages, flushing once enough are resident."""
+        self._pending_tiles += 1
+        if self._pending_tiles >= self.max_tiles:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered tiles back to their files and release them.
+
+        The dirty pages are written to disk first, then dropped from the
+        mappings (where the platform supports it), so they no longer count
+        towards resident memory; the arrays stay usable and fault their
+        pages back in from the files on the next access.
+        """
+        for array in self._arrays.values():
+            array.flush()
+            mapping = getattr(array, "_mmap", None)
+            if mapping is not None and hasattr(mmap, "MADV_DONTNEED"):
+                mapping.madvise(mmap.MADV_DONTNEED)
+        self._pending_tiles = 0
+
+    def minmax(self, array: np.ndarray,
+               select: Optional[Callable[[np.ndarray], np.ndarray]] = None
+               ) -> Tuple[float, float]:
+        """Return the minimum and maximum of an array, tile by tile.
+
+        Args:
+            array: Source array
+            select: Optional function mapping tile values to a boolean mask
+                of the cells to include
+
+        Returns:
+            Tuple of (minimum, maximum), or (nan, nan) if no cell is selected
+        """
+        low = np.inf
+        high = -np.inf
+        for tile in self.tiles():
+            values = self.read(array, tile)
+            if select is not None:
+                values = values[select(values)]
+                if values.size == 0:
+                    continue
+            low = min(low, np.min(values))
+            high = max(high, np.max(values))
+        if low > high:
+            return np.nan, np.nan
+        return low, high
+
+    def percentile(self, array: np.ndarray, q: float,
+                   select: Optional[Callable[[np.ndarray], np.ndarray]] = None
+                   ) -> float:
+        """Exact ``np.percentile(values, q)`` computed out of core.
+
+        Args:
+            array: Source array
+            q: Percentile in range [0, 100]
+            select: Optional function mapping tile values to a boolean mask
+                of the cells to include (all cells if omitted)
+
+        Returns:
+            The percentile value (linear interpolation), nan if no cell is
+            selected
+        """
+        low, high = self.minmax(array, select)
+        count = 0
+        for tile in self.tiles():
+            if select is None:
+                count += tile.rows * self.size
+            else:
+                values = self.read(array, tile)
+                count += int(np.count_nonzero(select(values)))
+        if count == 0:
+            return np.nan
+
+        # Virtual index of the linear method, as computed by numpy
+        virtual_index = (count - 1) * np.true_divide(q, 100)
+        previous_index = int(np.floor(virtual_index))
+        next_index = min(previous_index + 1, count - 1)
+        # A Python float, so the interpolation stays in the array's dtype
+        gamma = float(virtual_index - previous_index)
+
+        if high == low:
+            return low
+
+        previous = self._order_statistic(array, previous_index, low, high,
+                                         select)
+        following = (previous if next_index == previous_index else
+                     self._order_statistic(array, next_index, low, high,
+                                           select))
+
+        # Linear interpolation exactly as numpy's _lerp
+        diff = following - previous
+        if gamma >= 0.5:
+            return following - diff * (1 - gamma)
+        return previous + diff * gamma
+
+    def _order_statistic(self, array: np.ndarray, rank: int, low: float,
+                         high: float,
+                         select: Optional[Callable[[np.ndarray], np.ndarray]]
+                         ):
+        """Value of the given rank (0-based) among the selected cells.
+
+        Each histogram pass narrows the value range to the bin holding the
+        rank, until the values left in range fit into one tile; those are
+        then collected and sorted. Memory stays bounded by the histogram and
+        one tile, however the values are distributed.
+
+        Args:
+            array: Source array
+            rank: Rank of the value in ascending order
+            low: Minimum of the selected values
+            high: Maximum of the selected values
+            select: Optional function selecting the cells to include
+
+        Returns:
+            The value, in the array's dtype
+        """
+        limit = self.tile_rows * self.size
+        below = 0  # Selected values under the current range
+
+        def in_range(values):
+            if select is None:
+                values = values.ravel()
+            else:
+                values = values[select(values)]
+            return values[(values >= low) & (values <= high)]
+
+        while True:
+            edges = np.linspace(low, high, PERCENTILE_BINS + 1)
+            counts = np.zeros(PERCENTILE_BINS, dtype=np.int64)
+            for tile in self.tiles():
+                values = in_range(self.read(array, tile))
+                bins = np.clip(np.searchsorted(edges, values, side="right") - 1,
+                               0, PERCENTILE_BINS - 1)
+                counts += np.bincount(bins, minlength=PERCENTILE_BINS)
+            cumulative = np.cumsum(counts)
+            if cumulative[-1] <= limit:
+                break
+
+            # Narrow the range to the bin holding the rank
+            index = int(np.searchsorted(cumulative, rank - below,
+                                        side="right"))
+            if index > 0:
+                below += int(cumulative[index - 1])
+            bin_low, bin_high = edges[index], edges[index + 1]
+            if index < PERCENTILE_BINS - 1:
+                # Bins exclude their upper edge, except for the last one
+                bin_high = np.nextafter(bin_high, -np.inf)
+            if bin_low >= bin_high:
+                # The bin holds a single value
+                return array.dtype.type(bin_low)
+            low, high = bin_low, bin_high
+
+        selected = np.sort(np.concatenate(
+            [in_range(self.read(array, tile)) for tile in self.tiles()]))
+        return selected[rank - below]
+
+    def distance_transform(self, features: np.ndarray,
+                           name: str) -> Tuple[np.memmap, float]:
+        """Exact Euclidean distance to the nearest feature cell, out of core.
+
+        Equivalent to ``distance_transform_edt(features == 0)``: the column
+        pass sweeps the tiles from north to south and back, carrying one row
+        of running distances between tiles; the row pass runs on each tile
+        as soon as the return sweep has finished it.
+
+        Args:
+            features: Array that is nonzero at feature cells
+            name: Name of the array receiving the distances
+
+        Returns:
+            Tuple of (distance array, maximum distance), both in the store's
+            dtype
+        """
+        # The row pass needs the exact float64 column distances
+        column_distance = self.array(f"{name}_columns", dtype=np.float64)
+        carry = np.full(self.size, np.inf)
+        for tile in self.tiles():
+            band = np.ascontiguousarray(self.read(features, tile) != 0,
+                                        dtype=np.uint8)
+            out = np.empty(band.shape)
+            self.kernels.distance_columns(band, carry, out, False)
+            self.write(column_distance, tile, out)
+
+        distance = self.array(name)
+        max_distance = 0.0
+        carry = np.full(self.size, np.inf)
+        for tile in reversed(list(self.tiles())):
+            band = np.ascontiguousarray(self.read(features, tile) != 0,
+                                        dtype=np.uint8)
+            columns = self.read(column_distance, tile)
+            self.kernels.distance_columns(band, carry, columns, True)
+            out = np.empty((tile.rows, self.size))
+            self.kernels.distance_rows(columns, out)
+            max_distance = max(max_distance, np.max(out))
+            self.write(distance, tile, out)
+
+        del column_distance
+        self.remove(f"{name}_columns")
+        return distance, distance.dtype.type(max_distance)
+
+    def close(self) -> None:
+        """Flush all arrays and remove the working directory if temporary."""
+        for name in list(self._arrays):
+            self.release(name)
+        if self._cleanup is not None:
+            self._cleanup()
+
@@ -0,0 +1,52 @@
+"""Keys and LRU eviction of the on-disk stage cache."""
+
+import os
+
+import numpy as np
+
+from src.world_generation import cache as cache_module
+from src.world_generation.cache import StageCache, stage_key
+
+
+def test_stage_key_distinguishes_values():
+    array = np.arange(6, dtype=np.float64)
+    key = stage_key(1, {"a": array, "b": (1, 2)}, "stage")
+    assert key == stage_key(1, {"b": (1, 2), "a": array.copy()}, "stage")
+    assert key != stage_key(1, {"a": array.astype(np.float32),
+                                "b": (1, 2)}, "stage")
+    assert key != stage_key(1, {"a": array.reshape(2, 3),
+                                "b": (1, 2)}, "stage")
+    assert key != stage_key(1, {"a": array, "b": [1, 2]}, "stage")
+
+    rng = np.random.default_rng(3)
+    before = stage_key(rng)
+    rng.random()
+    assert stage_key(rng) != before
+
+
+def test_stage_key_covers_the_cache_version(monkeypatch):
+    key = stage_key(1, "stage")
+    monkeypatch.setattr(cache_module, "CACHE_VERSION",
+                        cache_module.CACHE_VERSION + 1)
+    assert stage_key(1, "stage") != key
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path):
+    value = np.zeros(1000)
+    cache = StageCache(str(tmp_path))
+    cache.put("probe", value)
+    entry_size = cache.size()
+    cache.clear()
+
+    cache = StageCache(str(tmp_path), max_bytes=3 * entry_size)
+    for age, key in enumerate(("a", "b", "c")):
+        cache.put(key, value)
+        # Spread the last use times, file times can be coarse
+        os.utime(cache.path(key), (age, age))
+    assert cache.get("a") is not None  # "a" becomes the most recent
+
+    cache.put("d", value)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+    assert cache.size() <= cache.max_bytes
+    assert cache.hits == 4 and cache.misses == 1
@@ -0,0 +1,106 @@
+"""Thermal weathering and stream-power solver of the erosion module."""
+
+import numpy as np
+import pytest
+
+from src.world_generation.erosion import (THERMAL_OFFSETS, implicit_diffusion,
+                                          stream_power_erosion,
+                                          thermal_weathering)
+from src.world_generation.hydrology import shift
+from src.world_generation.kernels import get_kernels
+
+SIZE = 32
+SEED = 7
+
+
+def _terrain() -> np.ndarray:
+    rng = np.random.default_rng(SEED)
+    heightmap = rng.random((SIZE, SIZE))
+    heightmap[:4] = -0.5  # Ocean along the north pole
+    return heightmap
+
+
+def test_thermal_weathering_conserves_material():
+    heightmap = _terrain()
+    total = heightmap.sum()
+    thermal_weathering(heightmap, sweeps=10)
+    np.testing.assert_allclose(heightmap.sum(), total)
+
+
+def test_thermal_weathering_reaches_the_talus_angle():
+    heightmap = _terrain()
+    talus_angle, tolerance = 0.05, 1e-4
+    sweeps = thermal_weathering(heightmap, sweeps=5000,
+                                talus_angle=talus_angle, tolerance=tolerance)
+    assert sweeps < 5000
+
+    slopes = np.stack([heightmap - shift(heightmap, dy, dx)
+                       for dy, dx in THERMAL_OFFSETS])
+    land = heightmap >= 0
+    assert np.max(slopes.max(axis=0)[land]) < talus_angle + tolerance
+
+
+def test_thermal_weathering_is_independent_of_the_longitude_origin():
+    # Synchronous sweeps treat every column alike, so rotating the map
+    # around the globe only rotates the result
+    heightmap = _terrain()
+    rotated = np.roll(heightmap, 11, axis=1)
+    thermal_weathering(heightmap, sweeps=20)
+    thermal_weathering(rotated, sweeps=20)
+    np.testing.assert_allclose(rotated, np.roll(heightmap, 11, axis=1),
+                               rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("n", [1.0, 2.0])
+def test_stream_power_step_solves_the_implicit_equation(n):
+    # A single channel draining west into a fixed outlet at cell 0
+    cells = 12
+    initial = np.linspace(0.0, 1.1, cells)
+    elevation = initial.copy()
+    receivers = np.maximum(np.arange(cells) - 1, 0)
+    area = np.arange(cells, 0, -1, dtype=np.float64)
+    fixed = np.zeros(cells, dtype=np.uint8)
+    fixed[0] = 1
+    k_dt, m = 0.3, 0.5
+
+    get_kernels("python").stream_power_step(elevation, receivers, area,
+                                            fixed, k_dt, m, n)
+
+    assert elevation[0] == initial[0]
+    drop = elevation[1:] - elevation[receivers[1:]]
+    residual = (elevation[1:] - initial[1:]
+                + k_dt * area[1:] ** m * drop ** n)
+    np.testing.assert_allclose(residual, 0.0, atol=1e-10)
+
+
+def test_implicit_diffusion_solves_the_backward_euler_step():
+    rows, cols, coefficient = 6, 8, 2.5
+    heightmap = np.random.default_rng(SEED).random((rows, cols))
+    diffused = implicit_diffusion(heightmap, coefficient)
+
+    # Five-point Laplacian, wrapped in x and mirrored (zero flux) in y
+    laplacian = (shift(diffused, -1, 0) + shift(diffused, 1, 0)
+                 + shift(diffused, 0, -1) + shift(diffused, 0, 1)
+                 - 4 * diffused)
+    np.testing.assert_allclose(diffused - coefficient * laplacian, heightmap,
+                               atol=1e-12)
+    np.testing.assert_allclose(diffused.mean(), heightmap.mean())
+
+
+def test_stream_power_erosion_reaches_a_steady_state():
+    heightmap = _terrain()
+    ocean = heightmap < 0
+    before = heightmap.copy()
+    kernels = get_kernels("python")
+    steps = stream_power_erosion(heightmap, 500, kernels, erodibility=0.05,
+                                 uplift=0.01, diffusivity=0.1,
+                                 time_step=10.0, tolerance=1e-6)
+    assert steps < 500
+    np.testing.assert_array_equal(heightmap[ocean], before[ocean])
+    assert np.all(heightmap[~ocean] >= 0)
+
+    # Another step changes nothing
+    settled = heightmap.copy()
+    stream_power_erosion(heightmap, 1, kernels, erodibility=0.05,
+                         uplift=0.01, diffusivity=0.1, time_step=10.0)
+    np.testing.assert_allclose(heightmap, settled, atol=1e-5)
@@ -0,0 +1,72 @@
+"""Flow routing and accumulation of the hydrology engine."""
+
+import numpy as np
+import pytest
+
+from src.world_generation.hydrology import (D8_OFFSETS, NO_FLOW, FlowField,
+                                            d8_directions, shift)
+
+SIZE = 24
+SEED = 7
+
+
+def _heightmap() -> np.ndarray:
+    return np.random.default_rng(SEED).random((SIZE, SIZE))
+
+
+def test_shift_wraps_longitude_and_clamps_latitude():
+    array = np.arange(SIZE * SIZE).reshape(SIZE, SIZE)
+    shifted = shift(array, -1, 1)
+    assert shifted[0, 0] == array[0, 1]  # Clamped at the north pole
+    assert shifted[5, SIZE - 1] == array[4, 0]  # Wrapped at the date line
+
+
+def test_d8_matches_per_cell_scan():
+    heightmap = _heightmap()
+    expected = np.full((SIZE, SIZE), NO_FLOW)
+    for y in range(SIZE):
+        for x in range(SIZE):
+            lowest = heightmap[y, x]
+            for code, (dy, dx) in enumerate(D8_OFFSETS):
+                ny = max(0, min(SIZE - 1, y + dy))
+                neighbour = heightmap[ny, (x + dx) % SIZE]
+                if neighbour < lowest:
+                    lowest = neighbour
+                    expected[y, x] = code
+    np.testing.assert_array_equal(d8_directions(heightmap), expected)
+
+
+def test_d8_accumulation_counts_upstream_cells():
+    # Every row of a plane tilted towards the south drains into the row
+    # below it, so a cell collects all cells above it in its column
+    heightmap = np.repeat(np.arange(SIZE, 0, -1.0)[:, np.newaxis], SIZE,
+                          axis=1)
+    flow = FlowField(heightmap, method="d8")
+    expected = np.repeat(np.arange(1.0, SIZE + 1)[:, np.newaxis], SIZE,
+                         axis=1)
+    np.testing.assert_array_equal(flow.accumulation, expected)
+    assert flow.sinks[-1].all() and not flow.sinks[:-1].any()
+
+
+@pytest.mark.parametrize("method", ["d8", "dinf"])
+def test_accumulation_conserves_water(method):
+    flow = FlowField(_heightmap(), method=method)
+    # All water ends up in the sinks
+    np.testing.assert_allclose(flow.accumulation[flow.sinks].sum(),
+                               SIZE * SIZE)
+    outflow = flow.fractions.sum(axis=0)
+    np.testing.assert_allclose(outflow[~flow.sinks.ravel()], 1.0)
+    assert not outflow[flow.sinks.ravel()].any()
+
+
+def test_dinf_splits_flow_between_facet_neighbours():
+    # A plane falling towards the south-south-east: flow is split between
+    # the southern and south-eastern neighbours
+    y, x = np.mgrid[0:SIZE, 0:SIZE].astype(np.float64)
+    heightmap = -(2.0 * y + 1.0 * x)
+    flow = FlowField(heightmap, method="dinf")
+    cell = (SIZE // 2) * SIZE + SIZE // 2
+    receivers = set(flow.receivers[:, cell])
+    assert receivers == {cell + SIZE, cell + SIZE + 1}
+    np.testing.assert_allclose(flow.fractions[:, cell].sum(), 1.0)
+    assert np.all(flow.fractions[:, cell] > 0)
@@ -0,0 +1,95 @@
+"""Spans, counters and exports of the profiler."""
+
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from src.world_generation import instrumentation
+from src.world_generation.instrumentation import (Profiler, count, profiled,
+                                                  span)
+
+
+@profiled
+def _outer(size):
+    count("test.calls")
+    return _inner(size) + 1
+
+
+@profiled(name="test.inner")
+def _inner(size):
+    count("test.cells", size)
+    return np.ones(size).sum()
+
+
+def test_disabled_instrumentation_only_calls_through():
+    assert instrumentation.active_profiler() is None
+    assert _outer(4) == 5.0
+    with span("ignored"):
+        count("ignored")
+
+
+def test_spans_nest_and_collect_counters():
+    with Profiler() as profiler:
+        _outer(10)
+        _outer(20)
+    assert instrumentation.active_profiler() is None
+
+    stats = profiler.stats()
+    assert stats["_outer"]["calls"] == 2
+    assert stats["test.inner"]["calls"] == 2
+    assert stats["_outer"]["total"] >= stats["test.inner"]["total"]
+    assert profiler.counters == {"test.calls": 2, "test.cells": 30}
+
+    inner = [r for r in profiler.spans if r["name"] == "test.inner"]
+    assert [r["depth"] for r in inner] == [1, 1]
+    assert [r["counters"] for r in inner] == [{"test.cells": 10},
+                                              {"test.cells": 20}]
+    assert "peak_bytes" not in inner[0]
+
+
+def test_exports(tmp_path):
+    with Profiler() as profiler:
+        _outer(10)
+
+    profiler.save_json(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json", encoding="utf-8") as f:
+        summary = json.load(f)
+    assert summary["counters"] == {"test.calls": 1, "test.cells": 10}
+    assert set(summary["stats"]) == {"_outer", "test.inner"}
+
+    profiler.save_chrome_trace(str(tmp_path / "trace.json"))
+    with open(tmp_path / "trace.json", encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in spans] == ["_outer", "test.inner"]
+    assert spans[0]["dur"] >= spans[1]["dur"]
+    assert {e["name"] for e in events if e["ph"] == "C"} == {"test.calls",
+                                                            "test.cells"}
+
+    report = profiler.report()
+    assert "_outer" in report and "test.cells: 10" in report
+    assert "peak MiB" not in report
+
+
+@pytest.mark.parametrize("reset_peak", [True, False])
+def test_memory_and_retained_arrays(monkeypatch, reset_peak):
+    if not reset_peak:
+        # Python 3.8 has no tracemalloc.reset_peak
+        monkeypatch.delattr(tracemalloc, "reset_peak", raising=False)
+    kept = []
+
+    @profiled(name="test.allocate")
+    def allocate():
+        np.ones(1 << 20).sum()  # 8 MiB, freed before returning
+        kept.extend(np.zeros(1000) for _ in range(3))
+
+    with Profiler(arrays=True) as profiler:
+        allocate()
+    assert not tracemalloc.is_tracing()
+
+    entry = profiler.stats()["test.allocate"]
+    assert entry["peak_bytes"] >= 8 * 2**20
+    assert entry["retained_arrays"] == 3
+    assert "retained arrays" in profiler.report()
@@ -0,0 +1,60 @@
+"""Packed masks and the water-body label raster."""
+
+import numpy as np
+import pytest
+
+from src.world_generation.masks import (LAKE, OCEAN, RIVER, WaterBodies,
+                                        label_wrapped, pack_mask)
+
+
+@pytest.mark.parametrize("shape", [(7,), (5, 13), (3, 4, 5)])
+def test_pack_mask_round_trips(shape):
+    mask = np.random.default_rng(7).random(shape) < 0.3
+    packed = pack_mask(mask)
+    assert packed.bits.nbytes == -(-mask.size // 8)
+    unpacked = packed.unpack()
+    assert unpacked.dtype == bool
+    np.testing.assert_array_equal(unpacked, mask)
+
+
+def test_label_wrapped_joins_areas_across_the_date_line():
+    mask = np.zeros((5, 10), dtype=bool)
+    mask[1, :2] = mask[1, -2:] = True  # One area split by the date line
+    mask[3, 4:6] = True
+    labels, count = label_wrapped(mask)
+    assert count == 2
+    assert labels.dtype == np.int32
+    assert labels[1, 0] == labels[1, -1] != labels[3, 4]
+    assert set(np.unique(labels[mask])) == {1, 2}
+
+
+def test_water_bodies_label_each_type():
+    ocean = np.zeros((6, 12), dtype=bool)
+    ocean[0, :] = True
+    lakes = np.zeros_like(ocean)
+    lakes[3, 2:4] = True
+    lakes[3, 8:10] = True
+    rivers = np.zeros_like(ocean)
+    rivers[1:5, 3] = True  # Flows from the ocean through a lake
+
+    bodies = WaterBodies.from_masks(ocean, rivers, lakes)
+
+    np.testing.assert_array_equal(bodies["ocean"], ocean)
+    np.testing.assert_array_equal(bodies["rivers"], rivers)
+    np.testing.assert_array_equal(bodies["lakes"], lakes)
+    np.testing.assert_array_equal(bodies.water, ocean | rivers | lakes)
+    assert dict(bodies).keys() == {"ocean", "rivers", "lakes"}
+    assert bodies.kinds[3, 3] == RIVER | LAKE
+
+    # One ocean, two lakes, and the river split in two by the lake
+    assert bodies.count == 5
+    assert list(bodies.body_kinds[1:]) == [OCEAN, LAKE, LAKE, RIVER, RIVER]
+    np.testing.assert_array_equal(bodies.bodies_of("lakes"), [2, 3])
+    # Overlapping cells belong to the lake
+    assert bodies.labels[3, 3] == bodies.labels[3, 2]
+    np.testing.assert_array_equal(bodies.body(1), ocean)
+    assert bodies.labels.dtype == np.int16
+    assert bodies.nbytes == ocean.size * 3 + bodies.body_kinds.size
+
+    with pytest.raises(KeyError):
+        bodies["swamps"]  # pylint: disable=pointless-statement
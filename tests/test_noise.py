@@ -0,0 +1,82 @@
+"""Batched noise engine against per-point OpenSimplex calls."""
+
+import numpy as np
+import pytest
+from opensimplex import OpenSimplex
+
+from src.world_generation.noise import (FractalNoise, cylindrical_coordinates,
+                                        grid_coordinates)
+
+SEED = 7
+
+
+def _points(count=200):
+    rng = np.random.default_rng(SEED)
+    return rng.uniform(-50.0, 50.0, size=(3, count))
+
+
+def test_single_octave_matches_opensimplex():
+    reference = OpenSimplex(seed=SEED)
+    noise = FractalNoise(SEED)
+    x, y, z = _points()
+
+    expected2 = [reference.noise2(a, b) for a, b in zip(x, y)]
+    expected3 = [reference.noise3(a, b, c) for a, b, c in zip(x, y, z)]
+    np.testing.assert_array_equal(noise.noise2(x, y), expected2)
+    np.testing.assert_array_equal(noise.noise3(x, y, z), expected3)
+    assert noise.noise2(x[0], y[0]) == expected2[0]
+
+
+@pytest.mark.parametrize("ridged", [False, True])
+def test_fractal2_matches_octave_loop(ridged):
+    reference = OpenSimplex(seed=SEED)
+    noise = FractalNoise(SEED)
+    x, y, _ = _points()
+    octaves, persistence, lacunarity = 5, 0.5, 2.0
+
+    expected = []
+    for a, b in zip(x, y):
+        value, amplitude, frequency = 0.0, 1.0, 1.0
+        for _ in range(octaves):
+            n = reference.noise2(a * frequency, b * frequency)
+            if ridged:
+                n = (1.0 - abs(n)) ** 2
+            value += n * amplitude
+            amplitude *= persistence
+            frequency *= lacunarity
+        expected.append(value)
+
+    result = noise.fractal2(x, y, octaves=octaves, persistence=persistence,
+                            lacunarity=lacunarity, ridged=ridged)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1e-12)
+
+
+def test_octave_bands_sum_to_the_full_fractal():
+    noise = FractalNoise(SEED)
+    x, y, z = _points()
+    full = noise.fractal3(x, y, z, octaves=6)
+    low = noise.fractal3(x, y, z, octaves=2)
+    high = noise.fractal3(x, y, z, octaves=6, first_octave=2)
+    np.testing.assert_allclose(low + high, full, rtol=0, atol=1e-12)
+
+
+def test_cylindrical_noise_wraps_east_west():
+    size = 32
+    noise = FractalNoise(SEED)
+    y, x = grid_coordinates(size, size + 1)
+    values = noise.cylindrical(x, y, size, scale=2.0)
+    # Column ``size`` is the same longitude as column 0 (up to the rounding
+    # of sin(2π) and cos(2π))
+    np.testing.assert_allclose(values[:, size], values[:, 0], atol=1e-4)
+
+    lon, lat = cylindrical_coordinates(x, y, size)
+    assert lon[0, 0] == 0.0 and lat[0, 0] == -np.pi / 2
+
+
+def test_dtype_rounds_the_float64_sum():
+    noise = FractalNoise(SEED)
+    x, y, _ = _points()
+    single = noise.fractal2(x, y, octaves=4, dtype=np.float32)
+    assert single.dtype == np.float32
+    np.testing.assert_array_equal(
+        single, noise.fractal2(x, y, octaves=4).astype(np.float32))
@@ -0,0 +1,153 @@
+"""Sun positions and solar fields of the planetary system."""
+
+import numpy as np
+import pytest
+
+from src.world_generation import PlanetarySystem
+from src.world_generation.instrumentation import Profiler
+
+# Odd, so that the equator and the prime meridian fall on grid cells
+SIZE = 37
+
+
+def _planet(**kwargs) -> PlanetarySystem:
+    return PlanetarySystem(world_size=SIZE, **kwargs)
+
+
+def test_day_night_mask_is_where_the_sun_shines():
+    planet = _planet()
+    for _ in range(6):
+        planet.advance_time(5.0)
+        np.testing.assert_array_equal(planet.day_night_mask,
+                                      planet.solar_radiation > 0)
+        assert 0 < planet.day_night_mask.sum() < SIZE * SIZE
+
+
+def test_subsolar_cell_gets_the_inverse_square_radiation():
+    planet = _planet(dtype=np.float64)
+    y, x = 10, 25
+    planet.subsolar = (np.radians(planet.latitudes[y, x]),
+                       np.radians(planet.longitudes[y, x]))
+    planet.orbital_distance = 0.98
+    planet._update_solar_fields()  # pylint: disable=protected-access
+
+    np.testing.assert_allclose(planet.solar_radiation[y, x], 1 / 0.98 ** 2)
+    assert planet.solar_radiation.max() == planet.solar_radiation[y, x]
+
+
+def test_noon_on_the_prime_meridian_offsets_by_the_equation_of_time():
+    planet = _planet()
+    positions = planet.get_sun_positions(np.arange(0, 365, 30) + 0.5)
+    np.testing.assert_allclose(positions.longitude,
+                               -positions.equation_of_time, atol=1e-12)
+    # The equation of time of an Earth-like orbit stays within ~17 minutes
+    assert np.abs(positions.equation_of_time).max() < np.radians(17 / 4)
+
+
+def test_solar_climatology_is_loaded_from_the_cache(tmp_path):
+    with Profiler() as profiler:
+        first = _planet(cache_dir=str(tmp_path))
+        expected = first.get_day_length(np.array([-70.0, 0.0, 70.0]), 30.0)
+    assert profiler.counters["solar_climatology.computed"] == 1
+
+    with Profiler() as profiler:
+        second = _planet(cache_dir=str(tmp_path))
+        lengths = second.get_day_length(np.array([-70.0, 0.0, 70.0]), 30.0)
+    assert "solar_climatology.computed" not in profiler.counters
+    assert second.cache.hits == 1
+    np.testing.assert_array_equal(lengths, expected)
+
+    # Another orbit gets its own table
+    with Profiler() as profiler:
+        _planet(cache_dir=str(tmp_path),
+                axial_tilt_degrees=10.0).get_day_length(70.0, 30.0)
+    assert profiler.counters["solar_climatology.computed"] == 1
+
+
+def test_daily_insolation_is_the_mean_of_a_day_of_hourly_frames():
+    planet = _planet(start_day=100, dtype=np.float64)
+    insolation = planet.get_daily_insolation()
+    assert insolation.shape == (SIZE, SIZE)
+    assert not insolation.flags.writeable
+    with pytest.raises(ValueError):
+        insolation[0, 0] = 1.0
+
+    frames = planet.advance_time_series_array(hours=1.0, steps=24)
+    # Averaged over the hours and the longitudes of each row; the rest is
+    # the hourly sampling and the declination drifting during the day
+    np.testing.assert_allclose(frames.radiation.mean(axis=(0, 2)),
+                               insolation[:, 0], atol=5e-4)
+
+
+def _stepped_frames(planet: PlanetarySystem, hours: float, steps: int):
+    """Frames of calling advance_time step by step."""
+    frames = []
+    for _ in range(steps):
+        planet.advance_time(hours)
+        frames.append((planet.current_day, planet.current_hour,
+                       planet.day_night_mask.copy(),
+                       planet.solar_radiation.copy()))
+    return frames
+
+
+def test_time_series_matches_stepping_advance_time():
+    # 1.5 hour steps cross a day boundary; 7 frames per chunk do not
+    # divide the 40 steps
+    expected = _stepped_frames(_planet(start_day=364), 1.5, 40)
+
+    planet = _planet(start_day=364)
+    start = 0
+    for chunk in planet.advance_time_series(1.5, 40, chunk_size=7):
+        stop = start + len(chunk.days)
+        assert len(chunk.days) == min(7, 40 - start)
+        for index, (day, hour, day_night, radiation) in enumerate(
+                expected[start:stop]):
+            assert (chunk.days[index], chunk.hours[index]) == (day, hour)
+            np.testing.assert_array_equal(chunk.day_night[index], day_night)
+            np.testing.assert_array_equal(chunk.radiation[index], radiation)
+
+        # The planet is left at the chunk's last frame
+        day, hour, day_night, radiation = expected[stop - 1]
+        assert planet.get_current_date() == (day, hour)
+        np.testing.assert_array_equal(planet.day_night_mask, day_night)
+        np.testing.assert_array_equal(planet.solar_radiation, radiation)
+        start = stop
+    assert start == 40
+
+
+def test_time_series_array_writes_memory_mapped_frames(tmp_path):
+    expected = _stepped_frames(_planet(), 1.5, 20)
+
+    planet = _planet()
+    frames = planet.advance_time_series_array(1.5, 20, chunk_size=6,
+                                              memmap_dir=str(tmp_path))
+    np.testing.assert_array_equal(frames.day_night,
+                                  [frame[2] for frame in expected])
+    np.testing.assert_array_equal(frames.radiation,
+                                  [frame[3] for frame in expected])
+    assert planet.get_current_date() == expected[-1][:2]
+
+    stored = np.load(tmp_path / "solar_radiation.npy")
+    np.testing.assert_array_equal(stored, frames.radiation)
+    np.testing.assert_array_equal(np.load(tmp_path / "day_night.npy"),
+                                  frames.day_night)
+    np.testing.assert_array_equal(np.load(tmp_path / "hours.npy"),
+                                  [frame[1] for frame in expected])
+    np.testing.assert_array_equal(np.load(tmp_path / "days.npy"),
+                                  [frame[0] for frame in expected])
+
+
+def test_time_series_of_zero_steps_leaves_the_planet_unchanged(tmp_path):
+    planet = _planet()
+    before = planet.solar_radiation.copy()
+    assert not list(planet.advance_time_series(1.5, 0))
+
+    frames = planet.advance_time_series_array(1.5, 0)
+    assert frames.radiation.shape == (0, SIZE, SIZE)
+    assert frames.days.size == frames.hours.size == 0
+    frames = planet.advance_time_series_array(1.5, 0,
+                                              memmap_dir=str(tmp_path))
+    assert frames.day_night.shape == (0, SIZE, SIZE)
+
+    assert planet.get_current_date() == (0, 0.0)
+    np.testing.assert_array_equal(planet.solar_radiation, before)
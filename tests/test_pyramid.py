@@ -0,0 +1,66 @@
+"""Heightmap pyramid and progressive terrain generation."""
+
+import numpy as np
+import pytest
+
+from src.world_generation import TerrainGenerator
+from src.world_generation.pyramid import HeightmapPyramid, upsample
+
+SEED = 7
+
+
+def _pyramid(*sizes) -> HeightmapPyramid:
+    pyramid = HeightmapPyramid()
+    for size in sizes:
+        field = np.zeros((size, size))
+        pyramid.add(field, field, field)
+    return pyramid
+
+
+def test_upsample_keeps_coarse_samples_and_wraps():
+    field = np.random.default_rng(SEED).random((4, 4))
+    fine = upsample(field, 8)
+    np.testing.assert_allclose(fine[::2, ::2], field)
+    # Halfway between the last and the first column across the date line
+    np.testing.assert_allclose(fine[0, 7], (field[0, 3] + field[0, 0]) / 2)
+    # Beyond the last row the field is clamped
+    np.testing.assert_allclose(fine[7], fine[6])
+    np.testing.assert_array_equal(upsample(field, 4), field)
+
+
+def test_level_for_picks_the_coarsest_sufficient_level():
+    pyramid = _pyramid(256, 64, 1024)
+    assert pyramid.sizes == [64, 256, 1024]
+    assert pyramid.level_for(50).size == 64
+    assert pyramid.level_for(200).size == 256
+    # A quarter of the map needs four times the resolution
+    assert pyramid.level_for(50, (0.0, 0.25, 0.0, 0.25)).size == 256
+    # Regions crossing the date line measure their width across it
+    assert pyramid.level_for(50, (0.0, 0.1, 0.9, 0.1)).size == 256
+    assert pyramid.level_for(5000).size == 1024
+    with pytest.raises(KeyError):
+        pyramid.level(128)
+
+
+def test_crop_crosses_the_date_line():
+    field = np.arange(64).reshape(8, 8)
+    region = HeightmapPyramid.crop(field, (0.0, 0.25, 0.75, 0.25))
+    np.testing.assert_array_equal(region, field[:2][:, [6, 7, 0, 1]])
+    assert HeightmapPyramid.crop(field, None) is field
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+def test_progressive_levels_share_the_world_dtype(dtype):
+    terrain = TerrainGenerator(size=128, seed=SEED, dtype=dtype)
+    finished = []
+    pyramid = terrain.generate_progressive(levels=[32, 64],
+                                           callback=finished.append)
+
+    assert [level.size for level in finished] == [32, 64, 128]
+    assert pyramid.sizes == [32, 64, 128]
+    assert pyramid.finest.heightmap is terrain.heightmap
+    for size in pyramid.sizes:
+        level = pyramid.level(size)
+        assert level.heightmap.shape == (size, size)
+        assert level.heightmap.dtype == np.dtype(dtype)
+        assert level.continental_mask.dtype == np.dtype(dtype)
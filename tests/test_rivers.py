@@ -0,0 +1,104 @@
+"""River network storage, its confluence graph and channel carving."""
+
+import numpy as np
+
+from src.world_generation.rivers import (MAX_CHANNEL_WIDTH, NO_RIVER,
+                                         RiverNetwork, carve_channels,
+                                         wrapped_distance)
+
+SIZE = 40
+
+
+def _network() -> RiverNetwork:
+    main = [(y, 10) for y in range(30)]
+    east = [(10, x) for x in range(20, 10, -1)]
+    west = [(10, x) for x in range(0, 10)]
+    return RiverNetwork.from_paths(SIZE, [main, east, west])
+
+
+def test_tributaries_join_at_the_nearest_cell():
+    network = _network()
+    assert len(network) == 3
+    np.testing.assert_array_equal(network.parent, [NO_RIVER, 0, 0])
+    np.testing.assert_array_equal(network.junction, [NO_RIVER, 10, 10])
+    np.testing.assert_array_equal(network.offsets, [0, 30, 40, 50])
+    np.testing.assert_array_equal(network.children(0), [1, 2])
+    assert network.path(1).tolist()[0] == [10, 20]
+    assert network.river_at(5, 10) == 0
+    assert network.river_at(10, 15) == 1
+
+
+def test_segments_carry_strahler_order_and_discharge():
+    network = _network()
+    segments = network.segments()
+    np.testing.assert_array_equal(segments.river, [0, 0, 1, 2])
+    np.testing.assert_array_equal(segments.start, [0, 10, 30, 40])
+    np.testing.assert_array_equal(segments.stop, [10, 30, 40, 50])
+    # Two first-order tributaries meet the first-order upper main river
+    np.testing.assert_array_equal(segments.order, [1, 2, 1, 1])
+    np.testing.assert_array_equal(segments.discharge, [10, 50, 10, 10])
+    np.testing.assert_array_equal(network.strahler_order(), [2, 1, 1])
+
+
+def test_add_matches_concatenated_paths():
+    rng = np.random.default_rng(7)
+    paths = [rng.integers(0, SIZE, size=(int(length), 2))
+             for length in rng.integers(1, 20, size=300)]
+    network = RiverNetwork(SIZE)
+    for path in paths:
+        network.add(path)
+
+    assert len(network) == len(paths)
+    np.testing.assert_array_equal(network.points, np.concatenate(paths))
+    np.testing.assert_array_equal(
+        network.offsets, np.cumsum([0] + [len(path) for path in paths]))
+    for river, path in enumerate(paths):
+        np.testing.assert_array_equal(network.path(river), path)
+
+
+def test_arrays_round_trip_and_keep_growing():
+    network = _network()
+    restored = RiverNetwork.from_arrays(network.arrays())
+    assert restored.paths() == network.paths()
+    np.testing.assert_array_equal(restored.ids, network.ids)
+
+    extra = [(25, x) for x in range(30, 10, -1)]
+    assert network.add(extra) == restored.add(extra) == 3
+    assert restored.paths() == network.paths()
+    np.testing.assert_array_equal(restored.parent, network.parent)
+    assert restored.parent[3] == 0
+
+
+def test_wrapped_distance_crosses_the_date_line():
+    features = np.zeros((5, SIZE), dtype=bool)
+    features[2, 1] = True
+    distance, near_y, near_x = wrapped_distance(features, 4)
+    assert distance[2, SIZE - 2] == 3.0
+    assert (near_y[2, SIZE - 2], near_x[2, SIZE - 2]) == (2, 1)
+
+
+def test_carve_channels_lowers_only_the_cells_near_the_river():
+    # A river running south along the date line over flat land
+    heightmap = np.full((SIZE, SIZE), 0.5)
+    network = RiverNetwork.from_paths(SIZE, [[(y, 0) for y in range(SIZE)]])
+    centerline, level = network.centerline(heightmap)
+    carved = carve_channels(heightmap, centerline, level)
+
+    assert np.all(carved <= heightmap)
+    # Both banks are carved, the western one across the date line
+    assert carved[SIZE // 2, 1] < 0.5 and carved[SIZE // 2, SIZE - 1] < 0.5
+    # The center is the deepest and the channel has a limited width
+    row = carved[SIZE // 2]
+    assert row[0] == row.min()
+    far = MAX_CHANNEL_WIDTH + 2
+    np.testing.assert_array_equal(row[far:SIZE - far], 0.5)
+
+
+def test_carve_channels_leaves_the_ocean_alone():
+    heightmap = np.full((SIZE, SIZE), 0.5)
+    heightmap[:, 20:] = -0.2
+    network = RiverNetwork.from_paths(SIZE, [[(10, x) for x in range(5, 25)]])
+    centerline, level = network.centerline(heightmap)
+    carved = carve_channels(heightmap, centerline, level)
+    np.testing.assert_array_equal(carved[:, 20:], heightmap[:, 20:])
+    assert carved[10, 10] < 0.5
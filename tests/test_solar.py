@@ -0,0 +1,96 @@
+"""Kepler solver, orbital ephemeris and climatology of the solar module."""
+
+import numpy as np
+import pytest
+
+from src.world_generation.solar import (OrbitalEphemeris, SolarClimatology,
+                                        solve_kepler)
+
+# Earth-like orbit
+TILT = np.radians(23.44)
+ECCENTRICITY = 0.0167
+PERIHELION_DAY = 3.0
+YEAR = 365.25
+DAY_HOURS = 24.0
+
+
+def _earth(**kwargs) -> OrbitalEphemeris:
+    params = {"axial_tilt": TILT, "eccentricity": ECCENTRICITY,
+              "perihelion_day": PERIHELION_DAY, "year_length_days": YEAR}
+    params.update(kwargs)
+    return OrbitalEphemeris(**params)
+
+
+@pytest.mark.parametrize("eccentricity", [0.0, 0.3, 0.9])
+def test_kepler_solution_satisfies_keplers_equation(eccentricity):
+    # Includes mean anomalies of later and earlier orbits
+    mean_anomaly = np.linspace(-5 * np.pi, 7 * np.pi, 1001)
+    anomaly = solve_kepler(mean_anomaly, eccentricity)
+    np.testing.assert_allclose(
+        anomaly - eccentricity * np.sin(anomaly), mean_anomaly, atol=1e-10)
+
+
+def test_earth_declination_and_distance():
+    orbit = _earth()
+    solstice = orbit.positions(172.0)
+    np.testing.assert_allclose(np.degrees(solstice.latitude), 23.44,
+                               atol=0.05)
+    np.testing.assert_allclose(orbit.positions(orbit.equinox_day).latitude,
+                               0.0, atol=1e-12)
+    np.testing.assert_allclose(orbit.positions(PERIHELION_DAY).distance,
+                               1 - ECCENTRICITY)
+
+
+def test_untilted_planet_has_no_seasons():
+    orbit = _earth(axial_tilt=0.0)
+    days = np.linspace(0, YEAR, 97)
+    np.testing.assert_allclose(orbit.positions(days).latitude, 0.0,
+                               atol=1e-12)
+
+
+def test_eccentricity_out_of_range_is_rejected():
+    with pytest.raises(ValueError):
+        _earth(eccentricity=1.0)
+
+
+def test_climatology_lookup_keeps_the_argument_shape():
+    table = SolarClimatology.compute(_earth(), DAY_HOURS)
+    value = table.lookup("day_length", 45.0, 100.0)
+    assert isinstance(value, float)
+
+    latitudes = np.linspace(-60, 60, 7)
+    values = table.lookup("day_length", latitudes[:, np.newaxis],
+                          np.array([10.0, 100.0, 200.0]))
+    assert isinstance(values, np.ndarray)
+    assert values.shape == (7, 3)
+    assert values[3, 1] == pytest.approx(table.lookup("day_length", 0, 100))
+
+
+def test_climatology_day_length():
+    table = SolarClimatology.compute(_earth(), DAY_HOURS)
+    days = np.arange(0, 365, 5.0)
+    np.testing.assert_allclose(table.lookup("day_length", 0.0, days), 12.0)
+    # Northern summer solstice: polar day in the north, night in the south
+    assert table.lookup("day_length", 85.0, 172.0) == DAY_HOURS
+    assert table.lookup("day_length", -85.0, 172.0) == 0.0
+    assert table.lookup("noon_altitude", -85.0, 172.0) < 0.0
+
+
+def test_climatology_day_axis_wraps_a_fractional_year():
+    table = SolarClimatology.compute(_earth(), DAY_HOURS)
+    assert table.days[-1] == YEAR
+    for field in SolarClimatology.FIELDS:
+        # The last column, day 365.25, is day 0 of the next year
+        np.testing.assert_allclose(table.tables[field][:, -1],
+                                   table.tables[field][:, 0], atol=1e-12)
+        assert table.lookup(field, 50.0, YEAR + 10.0) == pytest.approx(
+            table.lookup(field, 50.0, 10.0))
+        assert table.lookup(field, 50.0, -1.0) == pytest.approx(
+            table.lookup(field, 50.0, YEAR - 1.0))
+
+    # Between day 365 and the end of the year the lookup stays between
+    # the neighbouring columns
+    before, after = (table.lookup("day_length", 50.0, day)
+                     for day in (365.0, 0.0))
+    within = table.lookup("day_length", 50.0, 365.1)
+    assert min(before, after) <= within <= max(before, after)
@@ -0,0 +1,50 @@
+"""Wrap-aware distances of PointIndex."""
+
+import numpy as np
+
+from src.world_generation.spatial import PointIndex
+
+SIZE = 100
+
+
+def test_near_wraps_in_longitude():
+    index = PointIndex(SIZE, 10)
+    index.add(50, 1)
+    # 3 columns apart across the date line
+    assert index.near(50, 98, 4)
+    assert not index.near(50, 98, 3)
+    # Straight across the grid is 50 columns either way
+    assert not index.near(50, 51, 50)
+    assert index.near(50, 51, 50.5)
+
+
+def test_near_does_not_wrap_in_latitude():
+    index = PointIndex(SIZE, 10)
+    index.add(1, 50)
+    assert not index.near(98, 50, 10)
+    assert index.near(4, 54, 5.1)  # sqrt(3^2 + 4^2) = 5
+
+
+def test_accept_keeps_separation():
+    index = PointIndex(SIZE, 10)
+    assert index.accept(10, 99, 10)
+    assert not index.accept(10, 3, 10)  # 4 columns away across the wrap
+    assert index.accept(10, 20, 10)
+    assert len(index) == 2
+    np.testing.assert_array_equal(index.points, [[10, 99], [10, 20]])
+
+
+def test_near_many_matches_near():
+    rng = np.random.default_rng(7)
+    index = PointIndex(SIZE, 8)
+    for y, x in rng.integers(0, SIZE, size=(30, 2)):
+        index.add(int(y), int(x))
+    ys, xs = rng.integers(0, SIZE, size=(2, 500))
+
+    expected = [index.near(int(y), int(x), 8) for y, x in zip(ys, xs)]
+    np.testing.assert_array_equal(index.near_many(ys, xs, 8), expected)
+
+
+def test_near_many_on_empty_index():
+    index = PointIndex(SIZE, 8)
+    assert not index.near_many(np.array([1, 2]), np.array([3, 4]), 5).any()
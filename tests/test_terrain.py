@@ -0,0 +1,119 @@
+"""Stage cache, per-stage random streams and lakes of TerrainGenerator."""
+
+import numpy as np
+from scipy import ndimage
+
+from src.world_generation import TerrainGenerator
+from src.world_generation.hydrology import DepressionBasins
+from src.world_generation.terrain import PIPELINE_STAGES
+
+SIZE = 48
+SEED = 7
+
+
+def test_stage_rng_is_reproducible_and_independent():
+    terrain = TerrainGenerator(size=SIZE, seed=SEED)
+    first = terrain.stage_rng("add_rivers").random(8)
+    # Drawing from another stage does not shift the stream
+    terrain.stage_rng("add_lakes").random(100)
+    np.testing.assert_array_equal(terrain.stage_rng("add_rivers").random(8),
+                                  first)
+    assert not np.array_equal(terrain.stage_rng("add_lakes").random(8), first)
+
+    other = TerrainGenerator(size=SIZE, seed=SEED + 1)
+    assert not np.array_equal(other.stage_rng("add_rivers").random(8), first)
+
+
+def test_stage_result_does_not_depend_on_earlier_stages():
+    # add_plateaus draws from its own stream, so running the ridge stage
+    # (which consumes random numbers) before it only changes its input
+    results = []
+    for run_ridges in (False, True):
+        terrain = TerrainGenerator(size=SIZE, seed=SEED)
+        terrain.generate_heightmap()
+        if run_ridges:
+            terrain.stage_rng("add_ridges_and_canyons").random(1000)
+        results.append(terrain.add_plateaus())
+    np.testing.assert_array_equal(results[0], results[1])
+
+
+def test_complete_terrain_is_deterministic():
+    heightmaps = [
+        TerrainGenerator(size=SIZE, seed=SEED).generate_complete_terrain()
+        for _ in range(2)
+    ]
+    np.testing.assert_array_equal(heightmaps[0], heightmaps[1])
+
+
+def test_depression_basins_fill_to_the_spill_point():
+    # A bowl whose rim is lowest (0.5) at one cell, in land draining to an
+    # ocean row in the south
+    heightmap = np.ones((9, 9))
+    heightmap[-1] = -1.0
+    heightmap[2:5, 2:5] = 0.2
+    heightmap[3, 3] = 0.1
+    heightmap[5, 3] = 0.5
+    heightmap[6:8, 3] = 0.4
+    basins = DepressionBasins(heightmap)
+
+    assert len(basins) == 1
+    assert basins.spill[0] == 0.5
+    assert basins.pit[0] == 3 * 9 + 3
+    assert basins.area[0] == 9
+    np.testing.assert_allclose(basins.volume[0], 8 * 0.3 + 0.4)
+    np.testing.assert_allclose(basins.depth[0], 0.4)
+    np.testing.assert_array_equal(basins.filled[2:5, 2:5], 0.5)
+    assert (basins.labels == 1).sum() == 9
+
+
+def test_lakes_fill_their_basin_to_a_level_surface():
+    terrain = TerrainGenerator(size=SIZE, seed=SEED)
+    terrain.generate_heightmap()
+    terrain.add_mountains()
+    before = terrain.heightmap.copy()
+    lakes = terrain.add_lakes(count=5, ocean_mask=terrain.heightmap < 0)
+
+    labels, count = ndimage.label(lakes)
+    assert count > 0
+    for lake in range(1, count + 1):
+        cells = labels == lake
+        surface = terrain.heightmap[cells]
+        # Flat water surface, not below the lake's original lowest point
+        assert surface.min() == surface.max()
+        assert surface[0] >= before[cells].min()
+
+
+def test_stage_cache_hits_on_rerun(tmp_path):
+    uncached = TerrainGenerator(size=SIZE, seed=SEED)
+    reference = uncached.generate_complete_terrain()
+
+    first = TerrainGenerator(size=SIZE, seed=SEED, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(first.generate_complete_terrain(), reference)
+    assert first.cache.hits == 0
+
+    second = TerrainGenerator(size=SIZE, seed=SEED, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(second.generate_complete_terrain(), reference)
+    assert second.cache.hits == len(PIPELINE_STAGES)
+    assert second.cache.misses == 0
+
+
+def test_stage_cache_invalidates_changed_and_later_stages(tmp_path):
+    TerrainGenerator(size=SIZE, seed=SEED,
+                     cache_dir=str(tmp_path)).generate_complete_terrain()
+
+    params = {"add_lakes": {"count": 3}}
+    cached = TerrainGenerator(size=SIZE, seed=SEED, cache_dir=str(tmp_path))
+    heightmap = cached.generate_complete_terrain(params)
+
+    # Only add_lakes and the final erosion after it are recomputed
+    later = PIPELINE_STAGES[PIPELINE_STAGES.index("add_lakes"):]
+    assert cached.cache.misses == len(later)
+    assert cached.cache.hits == len(PIPELINE_STAGES) - len(later)
+    uncached = TerrainGenerator(size=SIZE, seed=SEED)
+    expected = uncached.generate_complete_terrain(params)
+    np.testing.assert_array_equal(heightmap, expected)
+
+    # A different seed shares no stage
+    other = TerrainGenerator(size=SIZE, seed=SEED + 1, cache_dir=str(tmp_path))
+    other.generate_complete_terrain()
+    assert other.cache.hits == 0
@@ -0,0 +1,102 @@
+"""Tiled (out-of-core) terrain generation against the in-memory path."""
+
+import numpy as np
+import pytest
+from scipy.ndimage import distance_transform_edt
+
+from src.world_generation import TerrainGenerator
+from src.world_generation.kernels import default_backend, get_kernels
+from src.world_generation.terrain import TILED_STAGES
+from src.world_generation.tiling import TileStore
+
+SIZE = 48
+SEED = 7
+
+
+def _store(tmp_path, tile_rows=5, dtype=np.float64) -> TileStore:
+    return TileStore(SIZE, get_kernels(default_backend()),
+                     tile_rows=tile_rows, max_tiles=2,
+                     workdir=str(tmp_path), dtype=dtype)
+
+
+def _run_tiled_stages(terrain: TerrainGenerator) -> TerrainGenerator:
+    """Run the stages of generate_complete_terrain that tiled mode supports."""
+    terrain.create_continental_mask(continent_size=0.35)
+    terrain.generate_heightmap()
+    terrain.generate_valley_mask()
+    terrain.add_mountains(epic_factor=1.8)
+    return terrain
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float64"])
+@pytest.mark.parametrize("tile_rows", [1, 7, SIZE])
+def test_tiled_terrain_matches_in_memory(tmp_path, dtype, tile_rows):
+    in_memory = _run_tiled_stages(
+        TerrainGenerator(size=SIZE, seed=SEED, dtype=dtype))
+    tiled = TerrainGenerator(size=SIZE, seed=SEED, dtype=dtype, tiled=True,
+                             tile_rows=tile_rows, workdir=str(tmp_path))
+    heightmap = _run_tiled_stages(tiled).heightmap
+
+    assert isinstance(heightmap, np.memmap)
+    np.testing.assert_array_equal(heightmap, in_memory.heightmap)
+    np.testing.assert_array_equal(tiled.continental_mask,
+                                  in_memory.continental_mask)
+    np.testing.assert_array_equal(tiled.valley_mask, in_memory.valley_mask)
+
+
+def test_tiled_mode_refuses_whole_world_stages(tmp_path):
+    terrain = _run_tiled_stages(TerrainGenerator(
+        size=SIZE, seed=SEED, tiled=True, workdir=str(tmp_path)))
+    assert TILED_STAGES[-1] == "add_mountains"
+    for stage in ("add_ridges_and_canyons", "add_plateaus", "apply_erosion",
+                  "generate_water_bodies", "add_rivers", "add_lakes",
+                  "generate_complete_terrain"):
+        with pytest.raises(ValueError, match="tiled mode"):
+            getattr(terrain, stage)()
+
+
+def test_tiled_stages_delete_their_intermediate_files(tmp_path):
+    _run_tiled_stages(TerrainGenerator(size=SIZE, seed=SEED, tiled=True,
+                                       workdir=str(tmp_path)))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "continental_mask.npy", "heightmap.npy", "valley_mask.npy"]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+@pytest.mark.parametrize("q", [0, 0.5, 35, 50, 80, 99.9, 100])
+def test_percentile_matches_numpy(tmp_path, dtype, q):
+    store = _store(tmp_path, dtype=dtype)
+    rng = np.random.default_rng(SEED)
+    array = store.array("values")
+    # Mostly one value, so the histogram has to be refined to find the
+    # order statistics
+    array[...] = np.where(rng.random((SIZE, SIZE)) < 0.8, 0.25,
+                          rng.normal(size=(SIZE, SIZE)))
+
+    assert store.percentile(array, q) == np.percentile(np.asarray(array), q)
+    selected = np.asarray(array)[np.asarray(array) > 0]
+    assert (store.percentile(array, q, select=lambda values: values > 0)
+            == np.percentile(selected, q))
+
+
+def test_percentile_of_empty_selection_is_nan(tmp_path):
+    store = _store(tmp_path)
+    array = store.array("values")
+    array[...] = 1.0
+    assert np.isnan(store.percentile(array, 50, select=lambda v: v > 2))
+
+
+@pytest.mark.parametrize("tile_rows", [1, 5, SIZE])
+def test_distance_transform_matches_scipy(tmp_path, tile_rows):
+    store = _store(tmp_path, tile_rows=tile_rows)
+    rng = np.random.default_rng(SEED)
+    features = rng.random((SIZE, SIZE)) < 0.01
+    features[:, 3] = False  # A column without features
+    array = store.array("features", dtype=np.uint8)
+    array[...] = features
+
+    distance, max_distance = store.distance_transform(array, "distance")
+
+    expected = distance_transform_edt(~features)
+    np.testing.assert_array_equal(distance, expected)
+    assert max_distance == expected.max()